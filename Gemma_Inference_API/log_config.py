@@ -0,0 +1,132 @@
+from contextvars import ContextVar
+from logging.handlers import QueueHandler,QueueListener
+from typing import Dict,Optional
+import json,logging,os,queue,random,sys,uuid
+
+# Copy of structured_logging/logger.py for the embedding server, which is built from this directory only. Records are prepared
+# in the calling thread and written to stderr by a background listener thread, a full queue drops records instead of blocking.
+#   LOG_LEVEL -> root level, default INFO.
+#   LOG_LEVELS -> per logger levels, e.g. "app.agent=DEBUG,setupAPI.utils=WARNING".
+#   LOG_FORMAT -> "json" (default) or "text".
+#   LOG_MAX_FIELD_CHARS -> longest message or extra field kept, longer values are cut with their length noted, default 500.
+#   LOG_DEBUG_SAMPLE_RATE -> fraction of DEBUG records kept when DEBUG is enabled, default 1.0.
+#   LOG_QUEUE_SIZE -> records waiting for the writer thread before new ones are dropped, default 10000.
+
+request_id: ContextVar[Optional[str]] = ContextVar("request_id", default=None)
+thread_id: ContextVar[Optional[str]] = ContextVar("thread_id", default=None)
+
+_RESERVED = set(logging.LogRecord("", 0, "", 0, "", None, None).__dict__) | {"message", "asctime", "service", "request_id", "thread_id"}
+_listener: Optional[QueueListener] = None
+
+def new_request_id(value: Optional[str] = None) -> str:
+    """ Set the request id of the current context (an incoming X-Request-ID or a new one) and return it. """
+    value = (value or uuid.uuid4().hex)[:64]
+    request_id.set(value)
+    return value
+
+def truncate(value, limit: int):
+    if isinstance(value, str) and len(value) > limit:
+        return f"{value[:limit]}... [{len(value)} chars]"
+    return value
+
+
+class _PreparingQueueHandler(QueueHandler):
+    """ Queue handler that samples DEBUG records, truncates payloads and drops records when the writer falls behind. """
+    def __init__(self, records: queue.Queue, service: str, max_chars: int, debug_sample_rate: float):
+        super().__init__(records)
+        self.service = service
+        self.max_chars = max_chars
+        self.debug_sample_rate = debug_sample_rate
+        self.dropped = 0
+
+    def prepare(self, record: logging.LogRecord) -> logging.LogRecord:
+        record.msg = truncate(record.getMessage(), self.max_chars)
+        record.args = None
+        if record.exc_info:
+            record.exc_text = logging.Formatter().formatException(record.exc_info)
+            record.exc_info = None
+        for key, value in list(record.__dict__.items()):
+            if key not in _RESERVED:
+                record.__dict__[key] = truncate(value if isinstance(value, (str, int, float, bool, type(None))) else repr(value), self.max_chars)
+        record.service = self.service
+        record.request_id = request_id.get()
+        record.thread_id = thread_id.get()
+        return record
+
+    def handle(self, record: logging.LogRecord) -> bool:
+        if record.levelno < logging.INFO and self.debug_sample_rate < 1.0 and random.random() >= self.debug_sample_rate:
+            return False
+        return super().handle(record)
+
+    def enqueue(self, record: logging.LogRecord):
+        try:
+            self.queue.put_nowait(record)
+        except queue.Full:
+            self.dropped += 1
+
+
+class JsonFormatter(logging.Formatter):
+    """ One JSON object per line, extra fields passed to the log call are included as keys. """
+    def format(self, record: logging.LogRecord) -> str:
+        entry = {
+            "ts": self.formatTime(record, "%Y-%m-%dT%H:%M:%S"),
+            "level": record.levelname,
+            "service": getattr(record, "service", None),
+            "logger": record.name,
+            "msg": record.getMessage(),
+        }
+        for key in ("request_id", "thread_id"):
+            if getattr(record, key, None):
+                entry[key] = getattr(record, key)
+        entry.update({key: value for key, value in record.__dict__.items() if key not in _RESERVED})
+        if record.exc_text:
+            entry["exc"] = record.exc_text
+        return json.dumps(entry, default=str)
+
+
+class TextFormatter(logging.Formatter):
+    """ Human readable lines for local development. """
+    def format(self, record: logging.LogRecord) -> str:
+        ids = " ".join(f"{key}={getattr(record, key)}" for key in ("request_id", "thread_id") if getattr(record, key, None))
+        extra = " ".join(f"{key}={value}" for key, value in record.__dict__.items() if key not in _RESERVED)
+        line = f"{self.formatTime(record, '%H:%M:%S')} {record.levelname:<7} {record.name}: {record.getMessage()}"
+        line = " ".join(part for part in (line, extra, ids and f"[{ids}]") if part)
+        return f"{line}\n{record.exc_text}" if record.exc_text else line
+
+
+def _parse_levels(value: str) -> Dict[str, str]:
+    levels = {}
+    for item in value.split(","):
+        if "=" in item:
+            name, level = item.split("=", 1)
+            levels[name.strip()] = level.strip().upper()
+    return levels
+
+def configure_logging(service: str, level: Optional[str] = None):
+    """ Method to route every logger of the process through the queue handler, call once at process start up. """
+    global _listener
+    if _listener is not None:
+        return
+    records: queue.Queue = queue.Queue(maxsize=int(os.getenv("LOG_QUEUE_SIZE", 10000)))
+    stream = logging.StreamHandler(sys.stderr)
+    stream.setFormatter(TextFormatter() if os.getenv("LOG_FORMAT", "json").lower() == "text" else JsonFormatter())
+    handler = _PreparingQueueHandler(
+        records,
+        service=service,
+        max_chars=int(os.getenv("LOG_MAX_FIELD_CHARS", 500)),
+        debug_sample_rate=float(os.getenv("LOG_DEBUG_SAMPLE_RATE", 1.0)),
+    )
+    root = logging.getLogger()
+    root.handlers = [handler]
+    root.setLevel((level or os.getenv("LOG_LEVEL", "INFO")).upper())
+    for name, module_level in _parse_levels(os.getenv("LOG_LEVELS", "")).items():
+        logging.getLogger(name).setLevel(module_level)
+    _listener = QueueListener(records, stream, respect_handler_level=False)
+    _listener.start()
+
+def shutdown_logging():
+    """ Method to flush queued records, call on process shutdown. """
+    global _listener
+    if _listener is not None:
+        _listener.stop()
+        _listener = None
@@ -0,0 +1,6 @@
+from typing import Iterable
+import numpy as np
+
+def vectors_payload(embeddings: Iterable[np.ndarray]) -> dict:
+    """ Response body of /vectors, one list of floats per input text. """
+    return {"vectors": [emb.tolist() for emb in embeddings]}
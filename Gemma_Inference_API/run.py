@@ -1,8 +1,39 @@
-from flask import Flask,jsonify,request
+from flask import Flask,jsonify,request,Response,g
 from service import embedding_document_model,embedding_query_model
+from prometheus_client import Counter,Histogram,generate_latest,CONTENT_TYPE_LATEST
+from log_config import configure_logging,new_request_id
+from profiler import ProfileStore,profile_request
+from payload import vectors_payload
+from contextlib import nullcontext
+import hmac,logging,os,time
+
+configure_logging("embedder")
+logger = logging.getLogger(__name__)
 
 app = Flask(__name__)
 
+# Prometheus metrics, served by GET /metrics.
+EMBED_SECONDS = Histogram("tatvix_embed_seconds", "Latency of /vectors requests.", ["embed_type"], buckets=(0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10, 30))
+EMBED_BATCH = Histogram("tatvix_embed_batch_size", "Texts per /vectors request.", ["embed_type"], buckets=(1, 2, 4, 8, 16, 32, 64, 128))
+EMBED_ERRORS = Counter("tatvix_embed_errors_total", "Failed /vectors requests.", ["embed_type"])
+
+# /vectors requests are profiled when they carry X-Profile: <PROFILE_TOKEN>, nothing is profiled while PROFILE_TOKEN is unset.
+PROFILE_TOKEN = os.getenv("PROFILE_TOKEN")
+PROFILE_INTERVAL = float(os.getenv("PROFILE_INTERVAL_MS", 5)) / 1000
+profile_store = ProfileStore(max_profiles=int(os.getenv("PROFILE_MAX_STORED", 20)), directory=os.getenv("PROFILE_DIR") or None)
+
+def _profile_authorized() -> bool:
+    return bool(PROFILE_TOKEN) and hmac.compare_digest(request.headers.get("X-Profile", "").encode(), PROFILE_TOKEN.encode())
+
+@app.before_request
+def _request_context():
+    """ Tag the log records of a request with its id, taken from X-Request-ID when the caller sends one. """
+    g.request_id = new_request_id(request.headers.get("X-Request-ID"))
+
+@app.after_request
+def _echo_request_id(response):
+    response.headers["X-Request-ID"] = g.get("request_id", "")
+    return response
 
 @app.route("/v1/.well-known/ready", methods=["GET"]) #For Health checks of flask app.
 @app.route("/.well-known/ready", methods=["GET"])
@@ -28,23 +59,45 @@ def embed():
     try:
         body = request.get_json(force=True) #getting weaviates post data from population batch.
         embed_type = request.args.get('embed_type')
-        print("Received /vectors payload:", body)
         texts = body.get("text",[]) #Extracting text according to weaviates request.
         if not texts or not isinstance(texts,list):
             return jsonify({"error": "Invalid or missing 'text' key"}), 400
-        if embed_type == "document":
-            embeddings = embedding_document_model(texts=texts)
-        
-        elif embed_type == "query":
-            embeddings = embedding_query_model(texts=texts)
+        started = time.perf_counter()
+        profiling = profile_request(profile_store, g.request_id, PROFILE_INTERVAL, embed_type=embed_type, texts=len(texts)) if _profile_authorized() else nullcontext()
+        with profiling:
+            if embed_type == "document":
+                embeddings = embedding_document_model(texts=texts)
+            
+            elif embed_type == "query":
+                embeddings = embedding_query_model(texts=texts)
+        EMBED_SECONDS.labels(str(embed_type)).observe(time.perf_counter() - started)
+        EMBED_BATCH.labels(str(embed_type)).observe(len(texts))
+        logger.debug("Embedded batch", extra={"embed_type": embed_type, "texts": len(texts), "chars": sum(len(t) for t in texts)})
 
-        return jsonify({
-            "vectors":[emb.tolist() for emb in embeddings]
-        }),200
+        return jsonify(vectors_payload(embeddings)),200
 
     except Exception as e:
+        logger.exception("Embedding request failed", extra={"embed_type": request.args.get('embed_type')})
+        EMBED_ERRORS.labels(str(request.args.get('embed_type'))).inc()
         return jsonify({"error":str(e)}),500
 
+@app.route("/profiles/<profile_id>", methods=["GET"])
+def get_profile(profile_id):
+    """ A stored /vectors profile by request id, needs X-Profile: <PROFILE_TOKEN>. ?format=folded returns only the folded stacks. """
+    if not _profile_authorized():
+        return jsonify({"error": "Forbidden"}), 403
+    profile = profile_store.get(profile_id)
+    if profile is None:
+        return jsonify({"error": "Profile not found"}), 404
+    if request.args.get("format") == "folded":
+        return Response(profile["folded"], mimetype="text/plain")
+    return jsonify(profile), 200
+
+@app.route("/metrics", methods=["GET"])
+def metrics():
+    """ Prometheus metrics: embedding latency and batch sizes per embed_type. """
+    return Response(generate_latest(), mimetype=CONTENT_TYPE_LATEST)
+
 
 if __name__ == "__main__":
     app.run(host="0.0.0.0", port=8081)
\ No newline at end of file
@@ -0,0 +1,51 @@
+from weaviate import WeaviateAsyncClient
+from McpServer.weaviate_client import get_weaviate_client
+from McpServer.vector_store import get_vector_store,vector_backend
+from typing import Optional
+import httpx
+import os
+
+class ServerClients():
+    """
+    Long lived clients shared by all MCP tool calls, opened on server startup and closed on shutdown.
+    Pooled http clients keep connections alive to the embedding server and the search API instead of a new TCP/TLS handshake per call.
+    """
+    def __init__(self):
+        self.embedding_http: Optional[httpx.AsyncClient] = None
+        self.search_http: Optional[httpx.AsyncClient] = None
+        self.weaviate: Optional[WeaviateAsyncClient] = None
+        self.vector_store = None
+
+    @staticmethod
+    def _limits() -> httpx.Limits:
+        """ Connection pool limits per http client. """
+        return httpx.Limits(
+            max_connections=int(os.getenv("HTTP_MAX_CONNECTIONS", 50)),
+            max_keepalive_connections=int(os.getenv("HTTP_MAX_KEEPALIVE_CONNECTIONS", 20)),
+            keepalive_expiry=float(os.getenv("HTTP_KEEPALIVE_EXPIRY", 30)),
+        )
+
+    async def start(self):
+        """ Method to open every shared client. """
+        self.embedding_http = httpx.AsyncClient(
+            limits=self._limits(),
+            timeout=httpx.Timeout(float(os.getenv("EMBEDDING_TIMEOUT", 30)), connect=5.0),
+        )
+        self.search_http = httpx.AsyncClient(
+            limits=self._limits(),
+            timeout=httpx.Timeout(float(os.getenv("SEARCH_TIMEOUT", 10)), connect=5.0),
+        )
+        if vector_backend() == "weaviate": #The numpy backend needs no server, skip the connection retries.
+            self.weaviate = await get_weaviate_client()
+        self.vector_store = get_vector_store(self.weaviate)
+
+    async def close(self):
+        """ Method to release every shared client, safe to call if start() did not finish. """
+        if self.embedding_http is not None:
+            await self.embedding_http.aclose()
+        if self.search_http is not None:
+            await self.search_http.aclose()
+        if self.weaviate is not None:
+            await self.weaviate.close()
+
+clients = ServerClients()
@@ -1,76 +1,196 @@
 from fastmcp import FastMCP
-import weaviate,requests
-from McpServer.weaviate_client import get_weaviate_client
-from weaviate.classes.query import MetadataQuery
+from McpServer.clients import clients
 from dotenv import load_dotenv
 import os
 from collections import defaultdict
 from McpServer.utils.query_structure import SearchResponse,SearchResult
+from McpServer.utils.search_cache import SearchCache
+from McpServer.utils.snippets import extract_snippets
+from McpServer.utils.metrics import ToolMetricsMiddleware,track_outbound,register_search_cache
+from McpServer.utils.log_context import LogContextMiddleware
+from McpServer.utils.profiling import ProfileMiddleware,profile_store,is_authorized
+from structured_logging.logger import configure_logging,propagation_headers,shutdown_logging
+from McpServer.vector_store import vector_backend
+from prometheus_client import generate_latest,CONTENT_TYPE_LATEST
+from starlette.requests import Request
+from starlette.responses import JSONResponse,PlainTextResponse,Response
 from pathlib import Path
+from typing import Optional,List
+from contextlib import asynccontextmanager
+import asyncio,logging
 
 env_path = Path(__file__).resolve().parent / ".mcp.env"
 load_dotenv(env_path, override=True)
+configure_logging("mcp")
+logger = logging.getLogger(__name__)
 
 WEAVIATE_SERVER=os.getenv("WEAVIATE_SERVER")
 GOOGLE_SEARCH_KEY=os.getenv("GOOGLE_SEARCH_KEY")
 CX=os.getenv("CX")
 GOOGLE_SEARCH_ENGINE = os.getenv("GOOGLE_SEARCH_ENGINE")
-
-mcp = FastMCP(__name__)
-
-weaviate_client = get_weaviate_client()
+MAX_BATCH_QUERIES = int(os.getenv("MAX_BATCH_QUERIES", 8)) #Upper bound on queries per document_search_many call.
+MAX_SEARCH_LIMIT = 10 #Upper bound on hits per search, same as search_chat_documents.
+SNIPPET_MAX_TOKENS = int(os.getenv("SNIPPET_MAX_TOKENS", 1500)) #Default token budget for the text of all hits of one search.
+
+search_cache = SearchCache(
+    directory=os.getenv("SEARCH_CACHE_DIR", str(Path(__file__).resolve().parent / ".search_cache")),
+    ttl=int(os.getenv("SEARCH_CACHE_TTL", 24 * 3600)), #0 disables the cache.
+    stale_ttl=int(os.getenv("SEARCH_CACHE_STALE_TTL", 7 * 24 * 3600)),
+    size_limit=int(os.getenv("SEARCH_CACHE_SIZE_LIMIT", 256 * 1024 * 1024)),
+)
+
+@asynccontextmanager
+async def lifespan(server: FastMCP):
+    """ Open the shared http/weaviate clients on server startup and release them on shutdown. """
+    await clients.start()
+    try:
+        yield
+    finally:
+        await clients.close()
+        await search_cache.close()
+        logger.info("MCP server shutting down")
+        shutdown_logging()
+
+mcp = FastMCP(__name__, lifespan=lifespan)
+mcp.add_middleware(LogContextMiddleware())
+mcp.add_middleware(ToolMetricsMiddleware())
+mcp.add_middleware(ProfileMiddleware())
+register_search_cache(lambda: search_cache.stats)
+
+async def _embed_queries(queries:List[str]) -> List[List[float]]:
+    """ Method to embed queries in a single request over the pooled embedding client. """
+    with track_outbound("embedder", "query"):
+        response = await clients.embedding_http.post(WEAVIATE_SERVER,params={'embed_type':'query'},headers=propagation_headers(),json={"text":queries})
+        response.raise_for_status()
+    return response.json()["vectors"]
+
+def _format_hits(hits:List[dict], query:str, max_tokens:Optional[int]) -> dict:
+    """ Method to shape hits (ordered best first) into the tool response, page texts are reduced to query relevant snippets within max_tokens. """
+    snippets = extract_snippets(
+        [hit["properties"]["text"] for hit in hits],
+        query=query,
+        max_tokens=max_tokens or SNIPPET_MAX_TOKENS,
+    )
+    final_response = defaultdict(list)
+    for hit, snippet in zip(hits, snippets):
+        properties = hit["properties"]
+        final_response["text"].append(snippet)
+        final_response["document_name"].append(properties["doc_name"])
+        final_response["image_id"].append(properties["image_id"])
+        final_response["court"].append(properties.get("court"))
+        final_response["year"].append(properties.get("year"))
+        final_response["distance"].append(round(hit["distance"], 4))
+        if "queries" in hit:
+            final_response["matched_queries"].append(hit["queries"])
+    return final_response
+
+def _build_filters(court:Optional[str], year_from:Optional[int], year_to:Optional[int], document_type:Optional[str], document_name:Optional[str]) -> Optional[dict]:
+    """ Method to combine optional metadata arguments into the filter dict understood by every vector store. """
+    filters = {
+        "court": court.lower() if court else None,
+        "year_from": year_from,
+        "year_to": year_to,
+        "document_type": document_type.lower() if document_type else None,
+        "source_name": document_name.lower() if document_name else None,
+    }
+    filters = {key: value for key, value in filters.items() if value is not None}
+    return filters or None
 
 @mcp.tool
-def document_search(query:str) -> dict:
-    """ Tool to perform near vector search using gemma 300m embedding model with the help of weaviate vector db. """
+async def document_search(
+    query:str,
+    max_tokens:Optional[int] = None,
+    court:Optional[str] = None,
+    year_from:Optional[int] = None,
+    year_to:Optional[int] = None,
+    document_type:Optional[str] = None,
+    document_name:Optional[str] = None,
+) -> dict:
+    """
+    Tool to perform near vector search using gemma 300m embedding model with the help of the vector db.
+    Optional filters narrow the search to matching documents only, pass them when the user asks about a specific
+    court (e.g. "supreme court", "delhi high court"), year or year range, document type (judgment, order, notification)
+    or a named source document.
+    Each hit returns the most query relevant passages of its page packed into max_tokens overall, with its distance
+    (lower is more relevant), stop reading hits once distances get large.
+    """
     try:
-        documents = weaviate_client.collections.use("Vectorbase")
-        query_params = {
-            'embed_type':'query'
-        }
-        response = requests.post(WEAVIATE_SERVER,params=query_params,json={"text":[query]})
-        data = response.json()
-        vector = data["vectors"][0]
-
-        top_k_response = documents.query.near_vector(
-            near_vector=vector,
-            limit=5,
-            return_metadata=MetadataQuery(distance=True),
-        )
-
-        final_response = defaultdict(list)
-
-        for o in top_k_response.objects:
-            final_response["text"].append(o.properties["text"])
-            final_response["document_name"].append(o.properties["doc_name"])
-            final_response["image_id"].append(o.properties["image_id"])
-            #Logs for testing.
-            print(o.properties["doc_name"])
-            print(o.metadata.distance)
+        vector = (await _embed_queries([query]))[0]
+        with track_outbound(vector_backend(), "search"):
+            hits = await clients.vector_store.search(
+                vector,
+                limit=5,
+                filters=_build_filters(court, year_from, year_to, document_type, document_name),
+            )
+        return _format_hits(hits, query, max_tokens)
 
+    except Exception as e:
+        logger.exception("document_search failed")
+        return {"Error":f"Exception -> {e}"}
 
-        return final_response
+@mcp.tool
+async def document_search_many(
+    queries:List[str],
+    limit:int = 5,
+    max_tokens:Optional[int] = None,
+    court:Optional[str] = None,
+    year_from:Optional[int] = None,
+    year_to:Optional[int] = None,
+    document_type:Optional[str] = None,
+    document_name:Optional[str] = None,
+) -> dict:
+    """
+    Tool to search legal documents for several phrasings or angles of a question in one call, use it instead of calling document_search repeatedly.
+    Results of all queries are de-duplicated and merged into one list ranked by distance (lower is more relevant), limited to `limit` hits (at most 10).
+    Only the first 8 queries are searched by default (MAX_BATCH_QUERIES), put the most important phrasings first.
+    Optional filters and max_tokens are the same as document_search, filters apply to every query.
+    """
+    try:
+        queries = [q for q in queries if q and q.strip()][:MAX_BATCH_QUERIES]
+        if not queries:
+            return {"Error":"No queries passed"}
+        limit = max(1, min(limit, MAX_SEARCH_LIMIT)) #Every query fetches `limit` hits, an unbounded value multiplies the vector store work.
+
+        vectors = await _embed_queries(queries) #Single embedding request for every query.
+        filters = _build_filters(court, year_from, year_to, document_type, document_name)
+
+        with track_outbound(vector_backend(), "search_many"): #All queries together, they run concurrently.
+            responses = await asyncio.gather(*[
+                clients.vector_store.search(vector, limit=limit, filters=filters)
+                for vector in vectors
+            ])
+
+        # Keep the best distance per object, an object hit by several queries is counted once.
+        hits = {}
+        for query, top_k_hits in zip(queries, responses):
+            for o in top_k_hits:
+                hit = hits.get(o["uuid"])
+                if hit is None:
+                    hits[o["uuid"]] = {**o, "queries":[query]}
+                else:
+                    hit["distance"] = min(hit["distance"], o["distance"])
+                    hit["queries"].append(query)
+
+        ranked = sorted(hits.values(), key=lambda hit: (hit["distance"], -len(hit["queries"])))[:limit]
+        return _format_hits(ranked, " ".join(queries), max_tokens)
 
     except Exception as e:
+        logger.exception("document_search_many failed", extra={"queries": len(queries)})
         return {"Error":f"Exception -> {e}"}
 
-@mcp.tool
-def search_engine(query :str) -> SearchResponse:
-    """ Tool to perform google search for online refernces to the use case of users. """
+async def _google_search(query :str) -> SearchResponse:
+    """ Method to call the search API, raises on failure so callers decide what to serve. """
     search_params = {
         "key":GOOGLE_SEARCH_KEY,
         "cx":CX,
         "q":query
     }
-    try:
-        response = requests.get(GOOGLE_SEARCH_ENGINE, params=search_params, timeout=10)
+    with track_outbound("search_api", "search"):
+        response = await clients.search_http.get(GOOGLE_SEARCH_ENGINE, params=search_params)
         response.raise_for_status()
-        search_results = response.json()
-    
-    except Exception as e:
-        return SearchResponse(results=[]) # Make sure Agent workflow does not break if tool call fails.
+    search_results = response.json()
 
-    items = search_results.get("items")
+    items = search_results.get("items") or [] #No "items" key when the search has no results.
     content = []
 
     for item in items:
@@ -79,9 +199,51 @@ def search_engine(query :str) -> SearchResponse:
             link=item.get('link',''),
             snippet=item.get('snippet','')
         ))
-    
+
     return SearchResponse(results=content)
 
+@mcp.tool
+async def search_engine(query :str) -> SearchResponse:
+    """ Tool to perform google search for online refernces to the use case of users. """
+    if search_cache.enabled:
+        cached, is_stale = await search_cache.aget(query)
+        if cached is not None:
+            if is_stale:
+                search_cache.refresh(query, _google_search)
+            return cached
+
+    try:
+        response = await _google_search(query)
+    except Exception:
+        logger.exception("Search API call failed")
+        return SearchResponse(results=[]) # Make sure Agent workflow does not break if tool call fails.
+
+    if search_cache.enabled:
+        await search_cache.aset(query, response)
+    return response
+
+@mcp.custom_route("/search-cache/stats", methods=["GET"])
+async def search_cache_stats(request: Request) -> JSONResponse:
+    """ Hit rate and size of the search_engine cache. """
+    return JSONResponse(await asyncio.to_thread(search_cache.get_stats)) #Counts entries on disk.
+
+@mcp.custom_route("/metrics", methods=["GET"])
+async def metrics(request: Request) -> Response:
+    """ Prometheus metrics: tool latency, embedder/vector store/search API latency and search cache hits. """
+    return Response(content=generate_latest(), media_type=CONTENT_TYPE_LATEST)
+
+@mcp.custom_route("/profiles/{profile_id}", methods=["GET"])
+async def get_profile(request: Request) -> Response:
+    """ A stored tool call profile, needs X-Profile: <PROFILE_TOKEN>. ?format=folded returns only the folded stacks for flame graph tools. """
+    if not is_authorized(request.headers.get("X-Profile", "")):
+        return JSONResponse({"error": "Forbidden"}, status_code=403)
+    profile = profile_store.get(request.path_params["profile_id"])
+    if profile is None:
+        return JSONResponse({"error": "Profile not found"}, status_code=404)
+    if request.query_params.get("format") == "folded":
+        return PlainTextResponse(profile["folded"])
+    return JSONResponse(profile)
+
 
 if __name__ == "__main__": #For dev use case to run the file as script, so we define file specific entry point, can be run through CLI.
     mcp.run(transport="http",port=5050)
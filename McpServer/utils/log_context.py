@@ -0,0 +1,17 @@
+from fastmcp.server.dependencies import get_http_headers
+from fastmcp.server.middleware import Middleware,MiddlewareContext
+from structured_logging.logger import new_request_id,thread_id
+
+class LogContextMiddleware(Middleware):
+    """ Tags the log records of an MCP request with its X-Request-ID (or a new id) and the client session. """
+    async def on_request(self, context: MiddlewareContext, call_next):
+        ctx = context.fastmcp_context
+        session_id = None
+        if ctx is not None:
+            try:
+                session_id = ctx.session_id
+            except Exception:
+                pass #No request context (e.g. an in-process call).
+        new_request_id(get_http_headers().get("x-request-id"))
+        thread_id.set(session_id)
+        return await call_next(context)
@@ -0,0 +1,57 @@
+from fastmcp.server.middleware import Middleware,MiddlewareContext
+from prometheus_client import Counter,Histogram,REGISTRY
+from prometheus_client.core import CounterMetricFamily
+from contextlib import contextmanager
+from typing import Callable
+import time
+
+# Prometheus metrics of the MCP server, served by GET /metrics.
+LATENCY_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10, 30)
+
+TOOL_SECONDS = Histogram("tatvix_mcp_tool_seconds", "Latency of MCP tool calls.", ["tool"], buckets=LATENCY_BUCKETS)
+TOOL_ERRORS = Counter("tatvix_mcp_tool_errors_total", "MCP tool calls that raised.", ["tool"])
+OUTBOUND_SECONDS = Histogram("tatvix_mcp_outbound_seconds", "Latency of calls from the MCP server to other services.", ["target", "operation"], buckets=LATENCY_BUCKETS)
+OUTBOUND_ERRORS = Counter("tatvix_mcp_outbound_errors_total", "Failed calls from the MCP server to other services.", ["target", "operation"])
+
+@contextmanager
+def track_outbound(target: str, operation: str):
+    """ Time a call to another service, failures are counted and re-raised. """
+    started = time.perf_counter()
+    try:
+        yield
+    except Exception:
+        OUTBOUND_ERRORS.labels(target, operation).inc()
+        raise
+    finally:
+        OUTBOUND_SECONDS.labels(target, operation).observe(time.perf_counter() - started)
+
+
+class ToolMetricsMiddleware(Middleware):
+    """ Times every tool call, tools catch their own errors so errors here are argument validation or server failures. """
+    async def on_call_tool(self, context: MiddlewareContext, call_next):
+        tool = context.message.name
+        started = time.perf_counter()
+        try:
+            return await call_next(context)
+        except Exception:
+            TOOL_ERRORS.labels(tool).inc()
+            raise
+        finally:
+            TOOL_SECONDS.labels(tool).observe(time.perf_counter() - started)
+
+
+class SearchCacheCollector():
+    """ Exposes the search_engine cache stats as tatvix_mcp_cache_requests_total{cache,result}, read at scrape time. """
+    def __init__(self, stats: Callable[[], dict]):
+        self.stats = stats
+
+    def collect(self):
+        stats = self.stats()
+        family = CounterMetricFamily("tatvix_mcp_cache_requests", "Cache lookups by result.", labels=["cache", "result"])
+        family.add_metric(["search_engine", "hit"], stats.get("hits", 0))
+        family.add_metric(["search_engine", "stale_hit"], stats.get("stale_hits", 0))
+        family.add_metric(["search_engine", "miss"], stats.get("misses", 0))
+        yield family
+
+def register_search_cache(stats: Callable[[], dict]):
+    REGISTRY.register(SearchCacheCollector(stats))
@@ -0,0 +1,28 @@
+from fastmcp.server.dependencies import get_http_headers
+from fastmcp.server.middleware import Middleware,MiddlewareContext
+from request_profiling.sampler import ProfileStore,profile_request
+from structured_logging.logger import request_id
+import hmac,logging,os
+
+logger = logging.getLogger(__name__)
+
+# Tool calls are profiled when the HTTP request carries X-Profile: <PROFILE_TOKEN>, nothing is profiled while PROFILE_TOKEN is unset.
+PROFILE_TOKEN = os.getenv("PROFILE_TOKEN")
+PROFILE_INTERVAL = float(os.getenv("PROFILE_INTERVAL_MS", 5)) / 1000
+profile_store = ProfileStore(max_profiles=int(os.getenv("PROFILE_MAX_STORED", 20)), directory=os.getenv("PROFILE_DIR") or None)
+
+def is_authorized(token: str) -> bool:
+    return bool(PROFILE_TOKEN) and hmac.compare_digest(token.encode(), PROFILE_TOKEN.encode())
+
+
+class ProfileMiddleware(Middleware):
+    """ Runs a tool call under the sampling profiler on request, the profile is stored under the request id (send X-Request-ID to choose it). """
+    async def on_call_tool(self, context: MiddlewareContext, call_next):
+        if not PROFILE_TOKEN or not is_authorized(get_http_headers().get("x-profile", "")):
+            return await call_next(context)
+        tool = context.message.name
+        profile_id = request_id.get()
+        with profile_request(profile_store, profile_id, PROFILE_INTERVAL, tool=tool):
+            result = await call_next(context)
+        logger.info("Profiled tool call", extra={"tool": tool, "profile_id": profile_id})
+        return result
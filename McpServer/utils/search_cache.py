@@ -0,0 +1,98 @@
+from McpServer.utils.query_structure import SearchResponse
+from typing import Awaitable,Callable,Optional,Set,Tuple
+import diskcache
+import asyncio
+import logging
+import time
+
+logger = logging.getLogger(__name__)
+
+class SearchCache():
+    """
+    Disk backed cache of normalized query -> SearchResponse for the search_engine tool.
+        ttl -> seconds an entry is fresh and served without touching the search API.
+        stale_ttl -> further seconds an expired entry is still served while it is refreshed in the background.
+        size_limit -> bytes on disk, least recently used entries are evicted past it.
+    """
+    def __init__(self, directory: str, ttl: int, stale_ttl: int, size_limit: int):
+        self.ttl = ttl
+        self.stale_ttl = stale_ttl
+        self.cache = diskcache.Cache(directory, size_limit=size_limit, eviction_policy="least-recently-used")
+        self.stats = {"hits": 0, "stale_hits": 0, "misses": 0, "refreshes": 0, "refresh_failures": 0}
+        self._refreshing: Set[str] = set()
+        self._tasks: Set[asyncio.Task] = set()
+
+    @property
+    def enabled(self) -> bool:
+        return self.ttl > 0
+
+    @staticmethod
+    def normalize(query: str) -> str:
+        """ Method to normalize a query so casing and spacing variants share one entry. """
+        return " ".join(query.lower().split())
+
+    def get(self, query: str) -> Tuple[Optional[SearchResponse], bool]:
+        """ Method to look up a query, returns (response, is_stale), response is None on a miss. """
+        entry = self.cache.get(self.normalize(query))
+        if entry is None:
+            self.stats["misses"] += 1
+            return None, False
+
+        is_stale = time.time() - entry["fetched_at"] > self.ttl
+        self.stats["stale_hits" if is_stale else "hits"] += 1
+        return SearchResponse.model_validate(entry["response"]), is_stale
+
+    def set(self, query: str, response: SearchResponse):
+        """ Method to store a response, entries are dropped from disk once they are past ttl + stale_ttl. """
+        self.cache.set(
+            self.normalize(query),
+            {"response": response.model_dump(), "fetched_at": time.time()},
+            expire=self.ttl + self.stale_ttl,
+        )
+
+    async def aget(self, query: str) -> Tuple[Optional[SearchResponse], bool]:
+        """ Method to run get in a worker thread, diskcache reads SQLite and files synchronously and would block the event loop. """
+        return await asyncio.to_thread(self.get, query)
+
+    async def aset(self, query: str, response: SearchResponse):
+        """ Method to run set in a worker thread, see aget. """
+        await asyncio.to_thread(self.set, query, response)
+
+    def refresh(self, query: str, fetch: Callable[[str], Awaitable[SearchResponse]]):
+        """ Method to refresh a stale entry in the background, concurrent requests for the same query share one refresh. """
+        key = self.normalize(query)
+        if key in self._refreshing:
+            return
+        self._refreshing.add(key)
+
+        async def _refresh():
+            try:
+                await self.aset(query, await fetch(query))
+                self.stats["refreshes"] += 1
+            except Exception:
+                self.stats["refresh_failures"] += 1 #Stale entry keeps being served until it expires for good.
+                logger.exception("Search cache refresh failed", extra={"query": key})
+            finally:
+                self._refreshing.discard(key)
+
+        task = asyncio.create_task(_refresh())
+        self._tasks.add(task) #Keep a reference so the task is not garbage collected mid-flight.
+        task.add_done_callback(self._tasks.discard)
+
+    def get_stats(self) -> dict:
+        """ Method to report hit rates and disk usage. """
+        lookups = self.stats["hits"] + self.stats["stale_hits"] + self.stats["misses"]
+        return {
+            **self.stats,
+            "hit_rate": (self.stats["hits"] + self.stats["stale_hits"]) / lookups if lookups else 0.0,
+            "entries": len(self.cache),
+            "size_bytes": self.cache.volume(),
+            "refreshing": len(self._refreshing),
+        }
+
+    async def close(self):
+        """ Method to stop pending refreshes and close the cache files. """
+        for task in list(self._tasks):
+            task.cancel()
+        await asyncio.gather(*self._tasks, return_exceptions=True)
+        self.cache.close()
@@ -0,0 +1,39 @@
+from starlette.applications import Starlette
+from starlette.requests import Request
+from starlette.responses import JSONResponse
+from starlette.routing import Route
+import argparse,asyncio,os
+import uvicorn
+
+# Local stand-in for the Google Custom Search API so tests and load runs do not spend quota.
+# Point the MCP server at it with GOOGLE_SEARCH_ENGINE="http://localhost:5055/customsearch/v1".
+STUB_LATENCY = float(os.getenv("SEARCH_STUB_LATENCY", 0)) #Seconds of artificial latency per request.
+
+async def search(request: Request):
+    """ Return canned results shaped like the Custom Search API for the query in ?q= """
+    query = request.query_params.get("q", "")
+    if STUB_LATENCY:
+        await asyncio.sleep(STUB_LATENCY)
+    if not query:
+        return JSONResponse({"error": {"code": 400, "message": "Missing query"}}, status_code=400)
+    return JSONResponse({
+        "items": [
+            {
+                "title": f"Result {i} for {query}",
+                "link": f"https://example.org/search/{i}?q={query}",
+                "snippet": f"Stub snippet {i} for the query '{query}'.",
+            }
+            for i in range(1, 4)
+        ]
+    })
+
+app = Starlette(routes=[Route("/customsearch/v1", search)])
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Local stub of the Google Custom Search API.")
+    parser.add_argument("--port", type=int, default=5055)
+    parser.add_argument("--latency", type=float, default=None, help="Seconds of artificial latency per request.")
+    args = parser.parse_args()
+    if args.latency is not None:
+        STUB_LATENCY = args.latency
+    uvicorn.run(app, host="127.0.0.1", port=args.port)
@@ -0,0 +1,68 @@
+from typing import List,Set,Tuple
+import math,re
+
+# Query relevant snippet extraction for retrieval results, keeps tool output inside a token budget
+# so full page texts are never serialized back to the agent.
+
+_SENTENCE_SPLIT = re.compile(r"(?<=[.!?;:])\s+|\n\s*\n")
+_WORD = re.compile(r"[a-z0-9]+")
+_STOPWORDS = {
+    "a","an","and","are","as","at","be","by","for","from","has","in","is","it","of","on","or","that","the","to","was","were","what","when","which","who","with","under","does","do","can","how"
+}
+
+def approx_tokens(text: str) -> int:
+    """ Approximate token count, same 4 characters per token estimate the agent trims with. """
+    return math.ceil(len(text) / 4)
+
+def _terms(text: str) -> Set[str]:
+    return {w for w in _WORD.findall(text.lower()) if w not in _STOPWORDS}
+
+def _windows(text: str, window: int) -> List[Tuple[int, int, str]]:
+    """ Split text into overlapping windows of `window` sentences, returns (first sentence, last sentence, text). """
+    sentences = [" ".join(s.split()) for s in _SENTENCE_SPLIT.split(text)]
+    sentences = [s for s in sentences if s]
+    if len(sentences) <= window:
+        return [(0, len(sentences) - 1, " ".join(sentences))] if sentences else []
+    return [(i, i + window - 1, " ".join(sentences[i:i + window])) for i in range(len(sentences) - window + 1)]
+
+def _ranked_windows(text: str, query_terms: Set[str], window: int) -> List[Tuple[float, int, int, str]]:
+    """ Rank windows of one hit by query term coverage, earlier windows win ties. """
+    ranked = []
+    for first, last, window_text in _windows(text, window):
+        window_terms = _terms(window_text)
+        coverage = len(query_terms & window_terms) / len(query_terms) if query_terms else 0.0
+        ranked.append((coverage, first, last, window_text))
+    return sorted(ranked, key=lambda w: (-w[0], w[1]))
+
+def extract_snippets(texts: List[str], query: str, max_tokens: int, window: int = 2) -> List[str]:
+    """
+    Pack the most query relevant sentence windows of every hit into max_tokens.
+    texts must be ordered by similarity (best hit first), every hit gets its best window before any hit gets a second one,
+    so low ranked hits only use budget that is left over. Windows of a hit are joined in document order.
+    """
+    query_terms = _terms(query)
+    candidates = [_ranked_windows(text, query_terms, window) for text in texts]
+    selected: List[List[Tuple[int, int, str]]] = [[] for _ in texts]
+    budget = max_tokens
+
+    for rank in range(max((len(c) for c in candidates), default=0)):
+        for hit, ranked in enumerate(candidates):
+            if budget <= 0:
+                break
+            if rank >= len(ranked):
+                continue
+            coverage, first, last, window_text = ranked[rank]
+            if rank > 0 and coverage == 0:
+                continue #Extra windows only when they match the query, the first one is always kept for context.
+            if any(first <= s_last and s_first <= last for s_first, s_last, _ in selected[hit]):
+                continue #Overlaps a window that is already selected.
+            cost = approx_tokens(window_text)
+            if cost > budget:
+                if selected[hit]:
+                    continue
+                window_text = window_text[:budget * 4 - 2].rstrip() + " …" #Truncate so every hit keeps at least some text, the ellipsis counts too.
+                cost = budget
+            selected[hit].append((first, last, window_text))
+            budget -= cost
+
+    return [" … ".join(w[2] for w in sorted(windows)) for windows in selected]
@@ -0,0 +1,69 @@
+from weaviate import WeaviateAsyncClient
+from weaviate.classes.query import MetadataQuery,Filter
+from vector_store.numpy_store import NumpyVectorStore
+from typing import Dict,List,Optional
+import asyncio
+import os
+
+# Search backends behind the document search tools. Both take the same filter dict
+# (court, year_from, year_to, document_type, source_name) and return hits as {"uuid", "properties", "distance"}, best first.
+
+class WeaviateVectorStore():
+    """ Near vector search over the Vectorbase weaviate collection. """
+    def __init__(self, client: WeaviateAsyncClient, name: str = "Vectorbase"):
+        self.client = client
+        self.name = name
+
+    @staticmethod
+    def _to_filter(filters: Optional[Dict]) -> Optional[Filter]:
+        """ Method to combine the filter dict into a single weaviate pre-filter. """
+        if not filters:
+            return None
+        conditions = []
+        if filters.get("court"):
+            conditions.append(Filter.by_property("court").equal(filters["court"])) #Word tokenized, matches when all words are present.
+        if filters.get("year_from") is not None:
+            conditions.append(Filter.by_property("year").greater_or_equal(filters["year_from"]))
+        if filters.get("year_to") is not None:
+            conditions.append(Filter.by_property("year").less_or_equal(filters["year_to"]))
+        if filters.get("document_type"):
+            conditions.append(Filter.by_property("document_type").equal(filters["document_type"]))
+        if filters.get("source_name"):
+            conditions.append(Filter.by_property("source_name").equal(filters["source_name"]))
+        if not conditions:
+            return None
+        return Filter.all_of(conditions)
+
+    async def search(self, vector: List[float], limit: int = 5, filters: Optional[Dict] = None) -> List[dict]:
+        response = await self.client.collections.use(self.name).query.near_vector(
+            near_vector=vector,
+            limit=limit,
+            filters=self._to_filter(filters),
+            return_metadata=MetadataQuery(distance=True),
+        )
+        return [{"uuid": str(o.uuid), "properties": o.properties, "distance": o.metadata.distance} for o in response.objects]
+
+
+class LocalVectorStore():
+    """ Search over the in-process numpy index written by the ingestion server, reloaded when it writes a new generation. """
+    def __init__(self, store: NumpyVectorStore):
+        self.store = store
+
+    async def search(self, vector: List[float], limit: int = 5, filters: Optional[Dict] = None) -> List[dict]:
+        return await asyncio.to_thread(self.store.search, vector, limit, filters) #Exact scans of large indexes stay off the event loop.
+
+
+def vector_backend() -> str:
+    return os.getenv("VECTOR_BACKEND","weaviate").lower()
+
+def get_vector_store(weaviate_client: Optional[WeaviateAsyncClient] = None):
+    """ Build the search backend selected by VECTOR_BACKEND ("weaviate" or "numpy"). """
+    if vector_backend() == "numpy":
+        lists = os.getenv("NUMPY_IVF_LISTS")
+        return LocalVectorStore(NumpyVectorStore(
+            directory=os.getenv("NUMPY_INDEX_DIR","vector_index"),
+            index_type=os.getenv("NUMPY_INDEX_TYPE","exact").lower(),
+            n_lists=int(lists) if lists else None,
+            n_probe=int(os.getenv("NUMPY_IVF_PROBE",8)),
+        ))
+    return WeaviateVectorStore(weaviate_client)
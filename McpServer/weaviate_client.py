@@ -1,31 +1,35 @@
 import weaviate
+from weaviate import WeaviateAsyncClient
 import os
 import certifi
-import time
+import asyncio
+import logging
+
+logger = logging.getLogger(__name__)
 
 #SSL cert file bundles for python to use for connection to weaviate.
 os.environ["SSL_CERT_FILE"] = certifi.where()
 os.environ["REQUESTS_CA_BUNDLE"] = certifi.where()
 
-def get_weaviate_client():
+async def get_weaviate_client() -> WeaviateAsyncClient:
+    """ Get a connected async weaviate client, one client (and gRPC channel) is shared by every tool call. """
     retries = 5
     for attempt in range(retries):
         try:
-            client = weaviate.connect_to_custom(
-                http_host="localhost",
-                http_port=8080,
+            client = weaviate.use_async_with_custom(
+                http_host=os.getenv("WEAVIATE_HOST","localhost"),
+                http_port=int(os.getenv("WEAVIATE_HTTP_PORT",8080)),
                 http_secure=False,
-                grpc_host="localhost",
-                grpc_port=50051,
+                grpc_host=os.getenv("WEAVIATE_HOST","localhost"),
+                grpc_port=int(os.getenv("WEAVIATE_GRPC_PORT",50051)),
                 grpc_secure=False,
             )
+            await client.connect()
             return client
 
         except Exception as e:
-            print(f"Weaviate connection failed (attempt {attempt}/{retries}): {e}")
-            if attempt < retries:
-                time.sleep(5)
+            logger.warning("Weaviate connection failed", extra={"attempt": attempt + 1, "retries": retries, "error": str(e)})
+            if attempt < retries - 1:
+                await asyncio.sleep(5)
             else:
                 raise RuntimeError("Failed to connect to Weaviate after multiple retries.") from e
-
-
@@ -1,23 +1,31 @@
 from langchain_google_genai import ChatGoogleGenerativeAI
 from langgraph.graph import StateGraph,START,END,MessagesState
 from langchain_core.messages import HumanMessage,SystemMessage,AIMessage,ToolMessage
-from langgraph.checkpoint.mongodb import MongoDBSaver
+from app.utils.checkpoint_saver import MeteredMongoDBSaver
 from langchain_core.messages.utils import trim_messages,count_tokens_approximately
 from langchain.messages import RemoveMessage
 from typing import Literal,Optional,List
-import certifi,os
+import certifi,logging,os,time
 from langgraph.prebuilt import ToolNode,tools_condition
 from app.agent.utils.states import ChatState
 from app.agent.utils.mcp_client import McpClient
+from app.agent.utils.tools import search_chat_documents
+from app.agent.utils.metrics_callback import AgentMetricsCallback
+from app.utils.metrics import TURN_SECONDS,TURN_TOOL_ROUNDS
+from app.utils.document_index import chat_documents
+from langchain_core.runnables import RunnableConfig
 from langgraph.graph.state import CompiledStateGraph
 from app.agent.utils.prompts import prompt_templates
 from app.settings import settings
+from structured_logging.logger import thread_id
 from typing import ClassVar
 
 # Force Python to use certifi's CA bundle so TLS/HTTPS validation works
 os.environ["SSL_CERT_FILE"] = certifi.where()
 os.environ["REQUESTS_CA_BUNDLE"] = certifi.where()
 
+logger = logging.getLogger(__name__)
+
 
 class LegalAgent():
     _cahced_tools: ClassVar[Optional[List]] = None #Global class cache for MCP tools.
@@ -25,7 +33,7 @@ class LegalAgent():
     def __init__(self):
         self.tools = None
         self.model = None
-        self.checkpointer:Optional[MongoDBSaver] = None
+        self.checkpointer:Optional[MeteredMongoDBSaver] = None
         self._graph:Optional[CompiledStateGraph] = None
     
     @classmethod
@@ -34,9 +42,9 @@ class LegalAgent():
         self = cls()
         if cls._cahced_tools is None:
             cls._cahced_tools = await self._get_mcp_tools()
-        self.tools = cls._cahced_tools
+        self.tools = cls._cahced_tools + [search_chat_documents] #Local tool over the documents uploaded to the chat.
         self.model = self._initialize_model()
-        print(self.tools)
+        logger.debug("Legal agent ready", extra={"tools": [tool.name for tool in self.tools]})
         return self
 
     async def _get_mcp_tools(self):
@@ -86,7 +94,7 @@ class LegalAgent():
             if user_query:
                 query_template = template.invoke({"user_query" : user_query})
                 response = self.model.invoke(query_template)
-                print(response.text) #LOG
+                logger.debug("Generated header", extra={"chars": len(response.text)})
             else:
                 raise Exception("No user query passed!!!")
         
@@ -110,13 +118,13 @@ class LegalAgent():
         messages = state.get("messages") + [HumanMessage(content=summary_message)]
         try:
             response = self.model.invoke(messages)
-            print(response.content)
+            logger.debug("Summarized conversation", extra={"messages": len(state["messages"]), "chars": len(response.text)})
             #Remove everything but the last 2 messages as a summary already exists now
             delete_messages = [RemoveMessage(id=m.id) for m in state["messages"][:-2]]
             return {"summary": response.content, "messages": delete_messages}
 
         except Exception as e:
-            print(f"Exception -> {e}")
+            logger.exception("Summary node failed")
             raise e
 
     def _trim_tool_output(self, state: ChatState) -> ChatState:
@@ -171,13 +179,16 @@ class LegalAgent():
     #        return "inject_document_template"
     #    return "chat_node"
 
-    def _chat_node(self, state: ChatState) -> ChatState:
+    def _chat_node(self, state: ChatState, config: RunnableConfig) -> ChatState:
         """ Node to initiate conversation with the chat model """
         default_messages = state.get("messages")
         final_message = [SystemMessage(content=prompt_templates.system_template)] + default_messages
+        documents = chat_documents.list_documents(config["configurable"]["thread_id"])
+        if documents:
+            # Only the names go into the prompt, their text is retrieved through search_chat_documents.
+            final_message.insert(1, SystemMessage(content=f"Documents uploaded to this chat: {', '.join(documents)}"))
         summary = state.get("summary")
         if summary:
-            print(f"Summary so far: {summary}")
             system_message = f"Summary of previous conversation is : {summary}"
             messages = [SystemMessage(content=system_message), *final_message]
         else:
@@ -228,26 +239,34 @@ class LegalAgent():
                 self._graph = builder.compile(checkpointer=self.checkpointer)
 
             except Exception as e:
-                print(f"Exception -> {e}") #Log
+                logger.exception("Failed to build the agent graph")
                 raise e
 
         return self._graph
 
-    async def get_response(self, message:str, session_id:str):
-        """ Get response from the LLM for user question """
+    async def get_response(self, message:str, session_id:str, spans:Optional[List[dict]] = None):
+        """ Get response from the LLM for user question, spans collects node/model/tool timings when the turn is profiled. """
         if self.checkpointer is None:
             raise RuntimeError("No Memory for the agent to go with, make sure checkpointer is set!")
         
         if self._graph is None:
             self._graph = self._build_graph()
 
+        metrics = AgentMetricsCallback(local_tools={search_chat_documents.name}, spans=spans) #Node, model and tool timings of this turn.
         config = {
-            "configurable" : {"thread_id" : session_id}
+            "configurable" : {"thread_id" : session_id},
+            "callbacks" : [metrics],
         }
 
+        thread_id.set(session_id) #Correlates the log records of this turn.
         try:
-            response = await self._graph.ainvoke({"user_query": message},config)
-            print(response["messages"]) #LOG
+            written = self.checkpointer.bytes_written(session_id)
+            started = time.perf_counter()
+            response = await self._graph.ainvoke({"user_query": message},config,durability=settings.CHECKPOINT_DURABILITY)
+            TURN_SECONDS.observe(time.perf_counter() - started)
+            TURN_TOOL_ROUNDS.observe(metrics.tool_rounds)
+            self.checkpointer.record_turn(self.checkpointer.bytes_written(session_id) - written) #Pending checkpoint writes are awaited before ainvoke returns.
+            logger.debug("Turn finished", extra={"messages": len(response["messages"]), "tool_rounds": metrics.tool_rounds})
             data = response.get("messages","")
             header = response.get("heading","")
             content = data[-1].text
@@ -263,7 +282,7 @@ class LegalAgent():
                 m for m in response["messages"]
                 if isinstance(m, ToolMessage)
             ] #Extract all the tool messages from the messages list from graph state.
-            print(tool_messages)
+            logger.debug("Tool messages", extra={"count": len(tool_messages)})
             """
         except Exception as e:
             raise e
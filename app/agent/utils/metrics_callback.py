@@ -0,0 +1,84 @@
+from langchain_core.callbacks import BaseCallbackHandler
+from app.utils.metrics import NODE_SECONDS,OUTBOUND_SECONDS,OUTBOUND_ERRORS,LLM_TOKENS
+from typing import Any,Dict,List,Optional,Set,Tuple
+from uuid import UUID
+import time
+
+class AgentMetricsCallback(BaseCallbackHandler):
+    """
+    Callback handler passed to one graph invocation (one chat turn), records into the Prometheus metrics:
+        graph nodes -> latency per node, the runs whose parent is the graph run itself.
+        chat model calls -> latency (target "gemini") and input/output tokens per node.
+        tool calls -> latency (target "mcp", or "local" for in-process tools), tool rounds are counted for the turn.
+    spans -> when the turn is profiled, every timed run is also appended as {"kind", "name", "start", "seconds", "error"}.
+    """
+    run_inline = True #Only bookkeeping, no need to hop to a thread per event.
+
+    def __init__(self, local_tools: Set[str], spans: Optional[List[dict]] = None):
+        self.local_tools = local_tools
+        self.spans = spans
+        self.root: Optional[UUID] = None
+        self.tool_rounds = 0
+        self.runs: Dict[UUID, Tuple[str, str, float]] = {}
+
+    def _finish(self, run_id: UUID, error: bool = False) -> Optional[Tuple[str, str, float]]:
+        run = self.runs.pop(run_id, None)
+        if run is None:
+            return None
+        kind, label, started = run
+        elapsed = time.perf_counter() - started
+        if self.spans is not None:
+            self.spans.append({"kind": kind, "name": label, "start": started, "seconds": elapsed, "error": error})
+        if kind == "node":
+            NODE_SECONDS.labels(label).observe(elapsed)
+        else:
+            target, operation = label.split(":", 1)
+            OUTBOUND_SECONDS.labels(target, operation).observe(elapsed)
+            if error:
+                OUTBOUND_ERRORS.labels(target, operation).inc()
+        return run
+
+    def on_chain_start(self, serialized: Optional[Dict[str, Any]], inputs: Any, *, run_id: UUID, parent_run_id: Optional[UUID] = None, metadata: Optional[Dict[str, Any]] = None, **kwargs: Any):
+        if parent_run_id is None:
+            self.root = run_id
+            return
+        node = (metadata or {}).get("langgraph_node")
+        if parent_run_id == self.root and node is not None:
+            self.runs[run_id] = ("node", node, time.perf_counter())
+            if node == "tools":
+                self.tool_rounds += 1
+
+    def on_chain_end(self, outputs: Any, *, run_id: UUID, **kwargs: Any):
+        self._finish(run_id)
+
+    def on_chain_error(self, error: BaseException, *, run_id: UUID, **kwargs: Any):
+        self._finish(run_id, error=True)
+
+    def on_chat_model_start(self, serialized: Optional[Dict[str, Any]], messages: Any, *, run_id: UUID, metadata: Optional[Dict[str, Any]] = None, **kwargs: Any):
+        node = (metadata or {}).get("langgraph_node", "unknown")
+        self.runs[run_id] = ("llm", f"gemini:{node}", time.perf_counter())
+
+    def on_llm_end(self, response: Any, *, run_id: UUID, **kwargs: Any):
+        run = self._finish(run_id)
+        if run is None:
+            return
+        node = run[1].split(":", 1)[1]
+        for generations in response.generations:
+            for generation in generations:
+                usage = getattr(getattr(generation, "message", None), "usage_metadata", None) or {}
+                LLM_TOKENS.labels(node, "input").inc(usage.get("input_tokens", 0))
+                LLM_TOKENS.labels(node, "output").inc(usage.get("output_tokens", 0))
+
+    def on_llm_error(self, error: BaseException, *, run_id: UUID, **kwargs: Any):
+        self._finish(run_id, error=True)
+
+    def on_tool_start(self, serialized: Optional[Dict[str, Any]], input_str: str, *, run_id: UUID, **kwargs: Any):
+        name = kwargs.get("name") or (serialized or {}).get("name", "unknown")
+        target = "local" if name in self.local_tools else "mcp"
+        self.runs[run_id] = ("tool", f"{target}:{name}", time.perf_counter())
+
+    def on_tool_end(self, output: Any, *, run_id: UUID, **kwargs: Any):
+        self._finish(run_id)
+
+    def on_tool_error(self, error: BaseException, *, run_id: UUID, **kwargs: Any):
+        self._finish(run_id, error=True)
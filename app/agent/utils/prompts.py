@@ -18,7 +18,13 @@ class PromptTemplates():
                 • Always start by issuing the retrieval tool call. Never answer from prior memory.
                 • Use the tool exactly as:
                     TOOL_CALL -> document_search(query="<natural language query>")
-                • The retrieval system will return structured data including: text, doc_name, and optional metadata (distance, image_id, etc.).
+                • When the user names a court, year, document type or document, pass it as a filter instead of only in the query:
+                    TOOL_CALL -> document_search(query="<natural language query>", court="<court>", year_from=<year>, year_to=<year>, document_type="<judgment|order|notification>", document_name="<document>")
+                • When the question needs several angles (e.g. a statute and the case law on it), search them together in one call instead of repeated document_search calls:
+                    TOOL_CALL -> document_search_many(queries=["<query 1>", "<query 2>", ...], limit=<total results>)
+                • When the user asks about a document they uploaded to this chat (listed in a system message), search it instead of the legal corpus, cite it as [document, page]:
+                    TOOL_CALL -> search_chat_documents(query="<natural language query>")
+                • The retrieval system will return structured data including: text, doc_name, and optional metadata (court, year, distance, image_id, etc.).
                 • After receiving the tool output, synthesize the information into:
                     - **TL;DR (1–3 sentences)** summarizing the legal answer directly.
                     - **Key points (3–6 bullets)** explaining the reasoning or holdings.
@@ -0,0 +1,24 @@
+from langchain_core.tools import tool
+from langchain_core.runnables import RunnableConfig
+from app.utils.document_index import chat_documents
+
+@tool
+async def search_chat_documents(query: str, config: RunnableConfig, limit: int = 5) -> dict:
+    """
+    Tool to search the documents the user uploaded to this chat (e.g. their own contract or notice).
+    Use it whenever the question is about an uploaded document, returns the most relevant passages with their document name,
+    page and distance (lower is more relevant).
+    """
+    chat_id = config.get("configurable", {}).get("thread_id") #The chat id is the graph thread id.
+    try:
+        hits = await chat_documents.search(chat_id, query, limit=min(limit, 10))
+    except Exception as e:
+        return {"Error": f"Exception -> {e}"}
+    if not hits:
+        return {"Error": "No documents have been uploaded to this chat, or they have expired and must be uploaded again."}
+    return {
+        "text": [hit["text"] for hit in hits],
+        "document_name": [hit["document"] for hit in hits],
+        "page": [hit["page"] for hit in hits],
+        "distance": [hit["distance"] for hit in hits],
+    }
@@ -1,4 +1,5 @@
 from sqlmodel import Field,SQLModel,Relationship
+from sqlalchemy import Index
 import mongoengine as me
 from datetime import datetime,timezone
 import uuid
@@ -7,11 +8,25 @@ class PDFImage(me.DynamicDocument):
     filename = me.StringField(required=True)  # Store filename
     file = me.FileField(required=True)  # Store image in GridFS
     image_id = me.UUIDField(required=True,default=uuid.uuid4,binary=False) # Generate a unique id for each image
+    source_name = me.StringField() # Original document name the page belongs to
+    source_hash = me.StringField() # sha256 of the original document file, set by the ingestion server
+    court = me.StringField() # Structured document metadata, carried over to weaviate for filtered search
+    year = me.IntField()
+    document_type = me.StringField()
+    display_file = me.FileField() # Optional lower resolution copy for the UI
+    encoding = me.StringField() # Storage encoding of file as "<format>:<color mode>", unset for legacy full colour PNGs
+    dpi = me.IntField() # Render resolution of file
+    content_hash = me.StringField() # sha256 of the rendered pixels, set by the ingestion server
+    linked_filenames = me.ListField(me.StringField()) # Page names of later uploads that were deduplicated to this page
 
 class ExtractedText(me.DynamicDocument):
     image = me.ReferenceField(PDFImage)  # Link to image
     text = me.StringField(required=True)
     time_stamp = me.DateTimeField(default=lambda: datetime.now(timezone.utc))  # Store timestamp of extraction
+    confidence = me.FloatField() # Mean tesseract word confidence 0-100 with adaptive OCR, unset for blank pages, non adaptive OCR and older extractions
+    ocr_dpi = me.IntField() # Resolution the page was OCRed at
+    ocr_psm = me.IntField() # Tesseract page segmentation mode used
+    indexed_at = me.DateTimeField() # Set when the bulk ingester stored the page in the vector store, /populate-weaviate skips it
 
 
 class User(SQLModel, table=True):
@@ -22,6 +37,9 @@ class User(SQLModel, table=True):
 
 
 class Chat(SQLModel, table=True):
+    __table_args__ = (
+        Index("ix_chat_owner_id_created_at", "owner_id", "created_at", "id"), #Chat list per user, newest first (keyset pagination).
+    )
     id: str = Field(primary_key=True) #Chat id, each user chat has a subsequent chat id
     owner_id: int|None = Field(default=None,foreign_key="user.id")
     created_at: datetime = Field(default_factory=lambda: datetime.now(timezone.utc))
@@ -31,6 +49,9 @@ class Chat(SQLModel, table=True):
     messages: list["Message"] = Relationship(back_populates="chat", cascade_delete=True)
 
 class Message(SQLModel, table=True):
+    __table_args__ = (
+        Index("ix_message_chat_id_created_at", "chat_id", "created_at", "id"), #Chat history in order of creation (keyset pagination).
+    )
     id: int|None = Field(primary_key=True,default=None)
 
     chat_id: str = Field(foreign_key="chat.id")
@@ -1,5 +1,8 @@
 from app.settings import settings
-from sqlmodel import create_engine,SQLModel,Session
+from sqlmodel import SQLModel
+from sqlmodel.ext.asyncio.session import AsyncSession
+from sqlalchemy import event
+from sqlalchemy.ext.asyncio import create_async_engine,async_sessionmaker
 from mongoengine import connect,disconnect
 import weaviate
 from weaviate import WeaviateClient
@@ -10,20 +13,50 @@ from fastapi import Request
 class SQLiteConfig():
     def __init__(self):
         self.file_name=settings.SQLITE_DB_NAME
-        self.url=f"sqlite:///{self.file_name}"
+        self.url=f"sqlite+aiosqlite:///{self.file_name}"
         self.connection_args = {
             "check_same_thread":False #Make sure multi-threaded sessions are possible
         }
-        self.engine = create_engine(self.url,connect_args=self.connection_args)
-        self._create_db_and_tables()
+        self.engine = create_async_engine(
+            self.url,
+            connect_args=self.connection_args,
+            pool_size=settings.SQLITE_POOL_SIZE,
+            max_overflow=settings.SQLITE_MAX_OVERFLOW,
+            pool_timeout=settings.SQLITE_POOL_TIMEOUT,
+            pool_pre_ping=False, #Local file database, a pre-ping round trip only adds latency.
+        )
+        event.listen(self.engine.sync_engine, "connect", self._set_pragmas)
+        self.session_maker = async_sessionmaker(self.engine, class_=AsyncSession, expire_on_commit=False) #Objects stay usable after commit without a lazy refresh.
+
+    @staticmethod
+    def _set_pragmas(dbapi_connection, connection_record):
+        """ Method to apply journaling and locking pragmas on every new pooled connection. """
+        cursor = dbapi_connection.cursor()
+        cursor.execute(f"PRAGMA journal_mode={settings.SQLITE_JOURNAL_MODE}")
+        cursor.execute(f"PRAGMA synchronous={settings.SQLITE_SYNCHRONOUS}")
+        cursor.execute(f"PRAGMA busy_timeout={settings.SQLITE_BUSY_TIMEOUT_MS}") #Wait for the write lock instead of failing with "database is locked".
+        cursor.close()
 
-    def _create_db_and_tables(self):
+    async def create_db_and_tables(self):
         """ Method to create database and all default tables if not created. """
-        SQLModel.metadata.create_all(self.engine)
+        async with self.engine.begin() as connection:
+            await connection.run_sync(SQLModel.metadata.create_all)
+            await connection.run_sync(self._create_missing_indexes)
+
+    @staticmethod
+    def _create_missing_indexes(connection):
+        """ Method to create indexes added after a table already existed, create_all() only creates indexes along with new tables. """
+        for table in SQLModel.metadata.sorted_tables:
+            for index in table.indexes:
+                index.create(connection, checkfirst=True)
+
+    async def dispose(self):
+        """ Method to close every pooled connection. """
+        await self.engine.dispose()
     
 class MongoDBConfig():
     def __init__(self):
-        connect(host=settings.MONGODB_URI,alias="TatvixDB")
+        connect(db=settings.MONGODB_DB,host=settings.MONGODB_URI,alias="TatvixDB")
     
     def disconnect(self):
         """ Method to release MongoEngine connection object to database. """
@@ -42,11 +75,11 @@ class WeaviateConfig():
     def _get_weaviate_client() -> WeaviateClient:
         """ Get weaviate client object """
         client =  weaviate.connect_to_custom(
-            http_host="localhost",
+            http_host=settings.WEAVIATE_HOST,
             http_secure=False,
-            http_port=8080,
-            grpc_host="localhost",
-            grpc_port=50051,
+            http_port=settings.WEAVIATE_HTTP_PORT,
+            grpc_host=settings.WEAVIATE_HOST,
+            grpc_port=settings.WEAVIATE_GRPC_PORT,
             grpc_secure=False,
         )
         return client
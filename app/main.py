@@ -1,9 +1,22 @@
-from fastapi import FastAPI,Depends
+from fastapi import FastAPI,Depends,Request,Response
 from contextlib import asynccontextmanager
-from app.routes import authenticate,chat
+from app.routes import authenticate,chat,admin,images
 from fastapi.middleware.cors import CORSMiddleware
 from app.settings import settings
-from langgraph.checkpoint.mongodb import MongoDBSaver
+from app.utils.chat_writer import get_chat_writer
+from app.utils.security import security
+from app.utils.checkpoint_retention import CheckpointRetention
+from app.utils.checkpoint_saver import MeteredMongoDBSaver
+from app.utils.document_index import chat_documents
+from app.utils.page_images import PageImageStore
+from app.utils.metrics import cache_stats
+from app.utils.auth_cache import auth_cache
+from prometheus_client import generate_latest,CONTENT_TYPE_LATEST
+from structured_logging.logger import configure_logging,new_request_id,shutdown_logging
+import logging
+
+configure_logging("app")
+logger = logging.getLogger(__name__)
 
 origins = [
     settings.ALLOWED_ORIGIN,
@@ -14,13 +27,42 @@ async def lifespan(app: FastAPI):
     """ Method to instantiate/initialize certain objects and parameters during app startup and free them after shutdown """
     from app.dbconfig import get_sqlite_config,get_mongo_config,get_weaviate_client,get_pymongo_client
     app.state.sqlite_config = get_sqlite_config() #This will initialize the database connection string.
+    await app.state.sqlite_config.create_db_and_tables()
+    app.state.chat_writer = get_chat_writer(app.state.sqlite_config.session_maker)
+    if app.state.chat_writer is not None:
+        app.state.chat_writer.start()
     app.state.mongo_config = get_mongo_config()
-    app.state.weaviate_client = get_weaviate_client()
+    app.state.weaviate_client = get_weaviate_client() if settings.VECTOR_BACKEND == "weaviate" else None
+    security.hash_pool.start() #Dedicated processes for password hashing.
+    chat_documents.start()
+    app.state.page_images = PageImageStore(settings.MONGODB_URI, settings.MONGODB_DB, thumbnail_cache_bytes=settings.PAGE_THUMBNAIL_CACHE_BYTES)
+    cache_stats.add("page_thumbnails", lambda: app.state.page_images.stats, hits=["thumbnail_hits"], misses=["thumbnail_misses"])
     pymongo = get_pymongo_client()
-    app.state.checkpointer = MongoDBSaver(pymongo.pymongo_client)
+    app.state.checkpointer = MeteredMongoDBSaver(
+        pymongo.pymongo_client,
+        compress_threshold=settings.CHECKPOINT_COMPRESS_THRESHOLD,
+        compress_level=settings.CHECKPOINT_COMPRESS_LEVEL,
+        ttl=settings.CHECKPOINT_TTL_SECONDS or None,
+    ) #A ttl makes the saver stamp created_at for the TTL index.
+    app.state.checkpoint_retention = CheckpointRetention(
+        checkpointer=app.state.checkpointer,
+        keep_last=settings.CHECKPOINT_KEEP_LAST,
+        ttl=settings.CHECKPOINT_TTL_SECONDS,
+        interval=settings.CHECKPOINT_COMPACT_INTERVAL,
+    )
+    app.state.checkpoint_retention.ensure_indexes()
+    app.state.checkpoint_retention.start()
     yield
+    await app.state.checkpoint_retention.stop()
+    if app.state.chat_writer is not None:
+        await app.state.chat_writer.close() #Flush queued chat turns before the pool is disposed.
+    await security.hash_pool.shutdown()
+    await chat_documents.close()
+    await app.state.page_images.close()
     app.state.mongo_config.disconnect() #Free mongo db connection string object.
-    print("Server Shutting down...")
+    await app.state.sqlite_config.dispose()
+    logger.info("Server shutting down")
+    shutdown_logging()
 
 
 app = FastAPI(lifespan=lifespan)
@@ -33,5 +75,23 @@ app.add_middleware(
     allow_headers=["*"],
 )
 
+@app.middleware("http")
+async def request_context(request: Request, call_next):
+    """ Tag the log records of a request with its id, taken from X-Request-ID when the caller sends one. """
+    request_id = new_request_id(request.headers.get("X-Request-ID"))
+    response = await call_next(request)
+    response.headers["X-Request-ID"] = request_id
+    return response
+
 app.include_router(authenticate.router)
 app.include_router(chat.router)
+app.include_router(admin.router)
+app.include_router(images.router)
+
+cache_stats.add("auth_users", lambda: auth_cache.stats, hits=["user_hits"], misses=["user_misses"])
+cache_stats.add("chat_owners", lambda: auth_cache.stats, hits=["chat_hits"], misses=["chat_misses"])
+
+@app.get("/metrics", include_in_schema=False)
+def metrics():
+    """ Prometheus metrics: graph node, model, tool and embedder latencies, token counts, tool rounds per turn and cache hits. """
+    return Response(content=generate_latest(), media_type=CONTENT_TYPE_LATEST)
@@ -0,0 +1,72 @@
+from fastapi import APIRouter,Depends,Request,Query,HTTPException
+from fastapi.responses import PlainTextResponse
+from app.utils.security import security
+from app.db_models.models import User
+from starlette.concurrency import run_in_threadpool
+from app.utils.profiles import profile_store
+from app.utils.auth_cache import auth_cache
+from typing import Annotated,Literal
+
+router = APIRouter(prefix="/api/admin")
+
+@router.get("/checkpoints",status_code=200)
+async def checkpoint_storage(
+    request: Request,
+    admin_user: Annotated[User,Depends(security.get_admin_user)],
+    limit: Annotated[int, Query(ge=1, le=1000)] = 50
+):
+    """ Per thread checkpoint storage (documents and BSON bytes), largest threads first, along with the retention policy in force. """
+    return await run_in_threadpool(request.app.state.checkpoint_retention.storage_report, limit)
+
+
+@router.post("/checkpoints/compact",status_code=200)
+async def compact_checkpoints(
+    request: Request,
+    admin_user: Annotated[User,Depends(security.get_admin_user)]
+):
+    """ Run the checkpoint compactor now instead of waiting for the next background run. """
+    return await run_in_threadpool(request.app.state.checkpoint_retention.compact_all)
+
+
+@router.get("/checkpoints/writes",status_code=200)
+async def checkpoint_writes(
+    request: Request,
+    admin_user: Annotated[User,Depends(security.get_admin_user)]
+):
+    """ Checkpoint write volume, compression ratio and bytes written per agent turn since startup. """
+    return request.app.state.checkpointer.get_stats()
+
+
+@router.get("/auth-cache",status_code=200)
+async def auth_cache_stats(
+    admin_user: Annotated[User,Depends(security.get_admin_user)]
+):
+    """ Hit rates and sizes of the authentication and chat ownership caches. """
+    return auth_cache.get_stats()
+
+
+@router.get("/profiles",status_code=200)
+async def list_profiles(
+    admin_user: Annotated[User,Depends(security.get_admin_user)]
+):
+    """ Stored profiles of chat turns run with ?profile=true, newest first. """
+    return {"profiles": await run_in_threadpool(profile_store.list)}
+
+
+@router.get("/profiles/{profile_id}",status_code=200)
+async def get_profile(
+    admin_user: Annotated[User,Depends(security.get_admin_user)],
+    profile_id: str,
+    format: Literal["json","folded"] = "json"
+):
+    """
+    One profile by its id (the request id of the profiled turn).
+    format=json -> samples, graph node/model/tool spans and the folded stacks.
+    format=folded -> only the folded stacks, for flamegraph.pl, speedscope or inferno.
+    """
+    profile = await run_in_threadpool(profile_store.get, profile_id)
+    if profile is None:
+        raise HTTPException(status_code=404,detail={"code":"NOT_FOUND","message":"profile could not be found"})
+    if format == "folded":
+        return PlainTextResponse(profile["folded"])
+    return profile
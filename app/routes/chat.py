@@ -1,13 +1,26 @@
-from fastapi import APIRouter,Depends,Request,HTTPException
+from fastapi import APIRouter,Depends,Request,HTTPException,Query,UploadFile
 from app.utils.security import security
 from typing import Annotated,Literal
 from app.db_models.models import User,Chat,Message
 from app.agent.graph import LegalAgent
-from app.utils.db_util import SQLSessionDep
+from app.utils.db_util import SQLSessionDep,encode_cursor,decode_cursor
 from sqlmodel import select
+from sqlalchemy import tuple_
 from app.payload_models.chat import ChatPayload
+from starlette.concurrency import run_in_threadpool
+from app.utils.chat_writer import ChatTurn,write_turns
+from app.utils.auth_cache import auth_cache
+from app.utils.document_index import chat_documents,chunk_pages
+from app.settings import settings
+from app.utils.profiles import profile_store
+from request_profiling.sampler import profile_request
+from structured_logging.logger import new_request_id,request_id
+from contextlib import nullcontext
+from setupAPI.extraction import TooManyScannedPages,extract_pdf_text
+import logging
 
 router = APIRouter(prefix="/api")
+logger = logging.getLogger(__name__)
 
 async def get_legal_agent(request: Request):
     """ Dependency to inject agent instance with correctly initialized global checkpointer. """
@@ -15,19 +28,29 @@ async def get_legal_agent(request: Request):
     agent.checkpointer = request.app.state.checkpointer
     return agent
 
-# For logs, print has been used, using a logging library is much better, and will be used as project moves in progress.
+async def get_chat_owner(session: SQLSessionDep, chat_id: str) -> None|int:
+    """ Owner id of a chat from the ownership cache, falls back to a single column lookup. None if the chat does not exist. """
+    owner_id = auth_cache.get_chat_owner(chat_id)
+    if owner_id is None:
+        owner_id = (await session.exec(select(Chat.owner_id).where(Chat.id == chat_id))).first()
+        if owner_id is not None:
+            auth_cache.set_chat_owner(chat_id, owner_id)
+    return owner_id
 
 @router.get("/chat",status_code=200)
-def find_chat(
+async def find_chat(
     request: Request,
     current_user: Annotated[User,Depends(security.get_current_user)],
     session: SQLSessionDep,
-    chat_id: None|str = None
+    chat_id: None|str = None,
+    limit: Annotated[None|int, Query(ge=1, le=200)] = None,
+    cursor: None|str = None
 ):
     """
     End point to create or find chat.
     /chat, chat_id =  None -> Creates new chat and returns the chat_id.
     /chat/?chat_id=<chat_id> -> Retrieves the chat_id to get.
+    /chat/?chat_id=<chat_id>&limit=<n>&cursor=<next_cursor> -> Retrieves the latest n messages older than the cursor (in order of creation), next_cursor pages further back.
     """
     if chat_id is None:
         try:
@@ -35,14 +58,15 @@ def find_chat(
             new_chat = Chat(id=new_chat_id, owner_id=current_user.id)
             try:
                 session.add(new_chat)
-                session.commit()
+                await session.commit()
+                auth_cache.set_chat_owner(new_chat_id, current_user.id)
             except Exception as e:
-                print(e) #LOG
-                session.rollback()
+                logger.exception("Failed to create chat")
+                await session.rollback()
                 raise HTTPException(500, {"code": "DB_ERROR", "message": "Failed to start chat"})
 
         except Exception as e:
-            print(e) #LOG
+            logger.exception("Chat record could not be created")
             raise HTTPException(status_code=500,detail={"code":"INTERNAL_SERVER_ERROR","message":"Could not create record"})
 
         return {
@@ -52,26 +76,40 @@ def find_chat(
             }
 
     else:
+        position = decode_cursor(cursor, int) if cursor else None #Validated here, a malformed cursor is a 400 and not a 500 below.
+        next_cursor = None
         try:
-            is_chat = session.exec(select(Chat).where(Chat.id == chat_id)).first()
-            if not is_chat:
+            owner_id = await get_chat_owner(session, chat_id)
+            if owner_id is None:
                 raise HTTPException(status_code=403,detail={"code":"UNAUTHORIZED","message":"chat does not belong to the right user"})
             
-            if is_chat.owner_id != current_user.id:
+            if owner_id != current_user.id:
                 raise HTTPException(403, {"code": "UNAUTHORIZED", "message": "chat does not belong to the right user"})
 
             #Returns a list of instances of messages of human and ai ordered by time created
-            messages = session.exec(select(Message).where(Message.chat_id == chat_id).order_by(Message.created_at)).all()
+            if limit is None:
+                messages = (await session.exec(select(Message).where(Message.chat_id == chat_id).order_by(Message.created_at, Message.id))).all()
+            else:
+                statement = select(Message).where(Message.chat_id == chat_id)
+                if position is not None:
+                    statement = statement.where(tuple_(Message.created_at, Message.id) < position)
+                #Newest page first from the (chat_id, created_at, id) index, one extra row tells if an older page exists.
+                page = (await session.exec(statement.order_by(Message.created_at.desc(), Message.id.desc()).limit(limit + 1))).all()
+                if len(page) > limit:
+                    page = page[:limit]
+                    next_cursor = encode_cursor(page[-1].created_at, page[-1].id)
+                messages = list(reversed(page))
         
         except Exception as e:
-            print(e)
+            logger.exception("Failed to load chat", extra={"chat_id": chat_id})
             raise HTTPException(status_code=500,detail={"code":"INTERNAL_SERVER_ERROR","message":"Could not load record"})
         
         return {
                 "code":"CHAT_RETRIEVED",
                 "message":"chat history found successfully",
                 "messages":messages,
-                "chat_id": chat_id
+                "chat_id": chat_id,
+                "next_cursor": next_cursor
             }
 
 
@@ -82,7 +120,8 @@ async def talk_chat(
     legal_agent: Annotated[LegalAgent,Depends(get_legal_agent)],
     session: SQLSessionDep,
     chat_id: str,
-    chat: ChatPayload
+    chat: ChatPayload,
+    profile: bool = False
 ):
     """
     End point to talk to the legal agent.
@@ -91,73 +130,136 @@ async def talk_chat(
         "user_query":"<query>"
     }
     returns agent response as content.
+    /chat/chat_id=<chat_id>?profile=true (or header X-Profile: 1), admins only -> the turn runs under the sampling profiler,
+    the profile is stored under the returned profile_id (the request id), see /api/admin/profiles.
     """
+    profile = profile or request.headers.get("X-Profile", "").lower() in ("1", "true")
+    if profile and current_user.username not in settings.ADMIN_USERNAMES:
+        raise HTTPException(status_code=403,detail={"code":"FORBIDDEN","message":"Admin access required to profile a request!"})
+    profile_id = (request_id.get() or new_request_id()) if profile else None
     try:
         # Retrieve chat id to check if it exists or not.
-        is_chat = session.exec(select(Chat).where(Chat.id == chat_id)).first()
-        if not is_chat:
+        owner_id = await get_chat_owner(session, chat_id)
+        if owner_id is None:
             raise HTTPException(status_code=404,detail={"code":"NOT_FOUND","message":"chat could not be found"})
 
         # Check user authenticity.
-        if current_user.id != is_chat.owner_id:
+        if current_user.id != owner_id:
             raise HTTPException(status_code=403,detail={"code":"UNAUTHORIZED","message":"chat does not belong to the right user"})
         
         user_query = chat.user_query
         if not user_query:
             raise HTTPException(status_code=500,detail={"code":"INTERNAL_SERVER_ERROR","message":"user query is not passed"})
         
-        response = await legal_agent.get_response(message=user_query,session_id=chat_id)
+        await session.close() #Release the pooled connection while the agent runs, the turn is written with a fresh transaction.
+
+        profiling = profile_request(profile_store, profile_id, settings.PROFILE_INTERVAL_MS / 1000, chat_id=chat_id) if profile else nullcontext()
+        with profiling as profiler:
+            response = await legal_agent.get_response(message=user_query,session_id=chat_id,spans=profiler.spans if profiler else None)
         content = response.get("content",[])
-        if "header" in response.keys():
-            header = response.get("header","")
-            try:
-                update = session.exec(select(Chat).where(Chat.id == chat_id)).first()
-                update.header = header
-                session.add(update)
-                session.commit()
-            
-            except Exception as e:
-                session.rollback()
-                print(e) #LOG
-                raise HTTPException(500, {"code": "DB_ERROR", "message": "Failed to save messages"})
-            
         if not content:
             raise HTTPException(500, detail={"code": "INTERNAL_SERVER_ERROR", "message": "No messages in model response, try again"})
 
-        print(content) #LOG
+        logger.debug("Agent response", extra={"chat_id": chat_id, "chars": len(content)})
 
-        if content:
-            human_message = Message(chat_id=chat_id,role="human",content=user_query)
-            ai_message = Message(chat_id=chat_id,role="ai",content=content)
-            try:
-                session.add(human_message)
-                session.add(ai_message)
-                session.commit()
-            except Exception as e:
-                session.rollback()
-                print(e) #LOG
-                raise HTTPException(500, {"code": "DB_ERROR", "message": "Failed to save messages"})
+        # Header and both messages of the turn are written together, either queued for the write-behind writer or in one transaction.
+        turn = ChatTurn(chat_id=chat_id,user_query=user_query,content=content,header=response.get("header") or None)
+        chat_writer = request.app.state.chat_writer
+        try:
+            if chat_writer is not None:
+                await chat_writer.submit(turn)
+            else:
+                await write_turns(session, [turn])
+        except Exception as e:
+            logger.exception("Failed to save chat turn", extra={"chat_id": chat_id})
+            raise HTTPException(500, {"code": "DB_ERROR", "message": "Failed to save messages"})
 
     except Exception as e:
-        print(e) #LOG
+        logger.exception("Chat turn failed", extra={"chat_id": chat_id})
         raise HTTPException(status_code=500,detail={"code":"INTERNAL_SERVER_ERROR","message":"There was a problem processing the model"})
     
-    return {
+    result = {
             "code":"MODEL_RESPONSE_SUCCESS",
             "message":"Model has successfully returned a response",
             "content":content,
             "chat_id":chat_id
         }
+    if profile_id is not None:
+        result["profile_id"] = profile_id
+    return result
 
-"""@router.post("/chat/{chat_id}",status_code=200)
-def document(
-    request: Request,
+async def check_chat_owner(session: SQLSessionDep, chat_id: str, current_user: User):
+    """ Raise 404 if the chat does not exist and 403 if it belongs to another user. """
+    owner_id = await get_chat_owner(session, chat_id)
+    if owner_id is None:
+        raise HTTPException(status_code=404,detail={"code":"NOT_FOUND","message":"chat could not be found"})
+    if current_user.id != owner_id:
+        raise HTTPException(status_code=403,detail={"code":"UNAUTHORIZED","message":"chat does not belong to the right user"})
+
+@router.post("/chat/{chat_id}/documents",status_code=201)
+async def upload_document(
     current_user: Annotated[User,Depends(security.get_current_user)],
     session: SQLSessionDep,
-)"""
+    chat_id: str,
+    file: UploadFile
+):
+    """
+    End point to upload a document (PDF or plain text) the agent can search within this chat only.
+    The document is extracted, chunked and embedded once and kept in memory, it expires after DOCUMENT_INDEX_TTL seconds without use.
+    body: form-data with "file".
+    """
+    await check_chat_owner(session, chat_id, current_user)
+    await session.close() #No database work below, release the pooled connection during extraction and embedding.
+
+    data = await file.read(settings.DOCUMENT_UPLOAD_MAX_BYTES + 1)
+    if len(data) > settings.DOCUMENT_UPLOAD_MAX_BYTES:
+        raise HTTPException(status_code=413,detail={"code":"DOCUMENT_TOO_LARGE","message":f"Documents are limited to {settings.DOCUMENT_UPLOAD_MAX_BYTES} bytes"})
+
+    filename = file.filename or "document"
+    try:
+        if file.content_type == "application/pdf" or filename.lower().endswith(".pdf"):
+            pages = await run_in_threadpool(extract_pdf_text, data, max_ocr_pages=settings.DOCUMENT_OCR_MAX_PAGES) #Rendering and OCR are blocking.
+        elif (file.content_type or "").startswith("text/") or filename.lower().endswith(".txt"):
+            pages = [data.decode("utf-8", errors="replace")]
+        else:
+            raise HTTPException(status_code=415,detail={"code":"UNSUPPORTED_DOCUMENT","message":"Only PDF and plain text documents are supported"})
+    except HTTPException as e:
+        raise e
+    except TooManyScannedPages as e:
+        raise HTTPException(status_code=413,detail={"code":"DOCUMENT_TOO_LARGE","message":f"Scanned documents are limited to {e.limit} pages without a text layer, this one has {e.scanned}"})
+    except Exception as e:
+        logger.exception("Failed to read uploaded document", extra={"chat_id": chat_id, "document": filename})
+        raise HTTPException(status_code=422,detail={"code":"UNREADABLE_DOCUMENT","message":"Document could not be read"})
+
+    chunks = chunk_pages(pages, settings.DOCUMENT_CHUNK_TOKENS, settings.DOCUMENT_CHUNK_OVERLAP)
+    try:
+        result = await chat_documents.add_document(chat_id, filename, chunks)
+    except ValueError as e:
+        raise HTTPException(status_code=413 if chunks else 422,detail={"code":"DOCUMENT_REJECTED","message":str(e)})
+    except Exception as e:
+        logger.exception("Failed to index uploaded document", extra={"chat_id": chat_id, "document": filename})
+        raise HTTPException(status_code=502,detail={"code":"EMBEDDING_ERROR","message":"Document could not be embedded, try again"})
+
+    return {
+            "code":"DOCUMENT_UPLOADED",
+            "message":"Document is ready to be searched in this chat",
+            "chat_id":chat_id,
+            "pages":len(pages),
+            **result
+        }
+
+@router.get("/chat/{chat_id}/documents",status_code=200)
+async def list_documents(
+    current_user: Annotated[User,Depends(security.get_current_user)],
+    session: SQLSessionDep,
+    chat_id: str
+):
+    """ End point to list the documents currently indexed for a chat with their chunk counts. """
+    await check_chat_owner(session, chat_id, current_user)
+    return {"chat_id":chat_id, "documents":chat_documents.list_documents(chat_id)}
 
 @router.delete("/chat",status_code=200)
-def delete_chat(
+async def delete_chat(
     request: Request,
     current_user: Annotated[User,Depends(security.get_current_user)],
     session: SQLSessionDep,
@@ -169,20 +271,22 @@ def delete_chat(
     args -> chat_id:str -> query params
     """
     
-    is_chat = session.exec(select(Chat.id).where(Chat.id == chat_id)).first()
-    if not is_chat:
+    owner_id = await get_chat_owner(session, chat_id)
+    if owner_id is None:
         raise HTTPException(status_code=404,detail={"code":"NOT_FOUND","message":"chat could not be found"})
     try:
-        response = legal_agent.clear_chat(session_id=chat_id) #Clear chat from mongoDB checkpointer
-        print(response) #LOG
+        response = await run_in_threadpool(legal_agent.clear_chat, session_id=chat_id) #Clear chat from mongoDB checkpointer (blocking pymongo call)
+        logger.debug("Cleared chat checkpoints", extra={"chat_id": chat_id})
         try:
-            results = session.exec(select(Chat).where(Chat.id == chat_id)).one()
-            session.delete(results)
-            session.commit()
+            results = (await session.exec(select(Chat).where(Chat.id == chat_id))).one()
+            await session.delete(results)
+            await session.commit()
+            auth_cache.invalidate_chat(chat_id)
+            chat_documents.drop(chat_id)
     
         except Exception as e:
-            session.rollback()
-            print(e) #LOG
+            await session.rollback()
+            logger.exception("Failed to delete chat", extra={"chat_id": chat_id})
             raise HTTPException(500, {"code": "DB_ERROR", "message": "Failed to delete messages"})
 
     except Exception as e:
@@ -194,32 +298,48 @@ def delete_chat(
         }
 
 @router.get("/chat-ids")
-def get_chat_ids(
+async def get_chat_ids(
     request:Request,
     current_user:Annotated[User,Depends(security.get_current_user)],
     session:SQLSessionDep,
+    limit: Annotated[None|int, Query(ge=1, le=200)] = None,
+    cursor: None|str = None
 ):
     """
     End-point to get all chat_ids.
     returns -> a list of chat_ids of the user making the request. (passed to get_current_user dependency with the help of request object)
+    limit, cursor -> optional keyset pagination, newest chats first, pass next_cursor back to get the next page.
     """
+    position = decode_cursor(cursor) if cursor else None
+    next_cursor = None
     try:
         if not current_user:
             raise HTTPException(status_code=403,detail={"code":"UNAUTHORIZED","message":"chat does not belong to the right user"})
         
-        chats = session.exec(select(Chat).where(Chat.owner_id == current_user.id).order_by(Chat.created_at.desc())).all()
+        #Only the columns the chat list needs, served from the (owner_id, created_at, id) index.
+        statement = select(Chat.id, Chat.header, Chat.created_at).where(Chat.owner_id == current_user.id)
+        if position is not None:
+            statement = statement.where(tuple_(Chat.created_at, Chat.id) < position)
+        statement = statement.order_by(Chat.created_at.desc(), Chat.id.desc())
+        if limit is not None:
+            statement = statement.limit(limit + 1) #One extra row tells if another page exists.
+        chats = (await session.exec(statement)).all()
+        if limit is not None and len(chats) > limit:
+            chats = chats[:limit]
+            next_cursor = encode_cursor(chats[-1].created_at, chats[-1].id)
         
-        print(chats) #LOG
+        logger.debug("Listed chat ids", extra={"count": len(chats)})
         if not chats:
             raise HTTPException(status_code=404,detail={"code":"NOT_FOUND","message":"User has no associated chat ids"})
         
     except Exception as e:
-        print(e) #LOG
+        logger.exception("Failed to list chat ids")
         raise HTTPException(500, {"code": "INTERNAL_SERVER_ERROR", "message": "There was a problem processing the model"})
     
     return {
         "code":"CHAT_IDS_RETRIEVED",
         "message":"chat ids have been successfully retrieved",
         "chat_ids": [x.id for x in chats],
-        "chat_headers":[x.header for x in chats]
+        "chat_headers":[x.header for x in chats],
+        "next_cursor": next_cursor
     }
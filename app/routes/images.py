@@ -0,0 +1,69 @@
+from fastapi import APIRouter,Depends,Request,HTTPException,Query
+from fastapi.responses import Response,StreamingResponse
+from app.utils.security import security
+from app.utils.db_util import PageImageStoreDep
+from app.db_models.models import User
+from typing import Annotated
+
+router = APIRouter(prefix="/api")
+
+# Page images never change once ingested, the GridFS file id is a strong validator and clients may cache for a year.
+CACHE_CONTROL = "private, max-age=31536000, immutable"
+
+@router.get("/images/{image_id}",status_code=200)
+async def get_page_image(
+    request: Request,
+    current_user: Annotated[User,Depends(security.get_current_user)],
+    page_images: PageImageStoreDep,
+    image_id: str,
+    width: Annotated[None|int, Query(ge=32, le=1024)] = None,
+    full: bool = False
+):
+    """
+    End point to get the page image behind a document_search citation (its image_id).
+    width -> optional thumbnail width in pixels (rounded up to a multiple of 64), served as WebP.
+    full -> serve the full resolution (OCR) image instead of the display copy, when the page has one.
+    The original image is streamed from GridFS and supports single Range requests, conditional requests via If-None-Match.
+    """
+    grid_out = await page_images.open(image_id, full=full or width is not None) #Thumbnails are rendered from the full image.
+    if grid_out is None:
+        raise HTTPException(status_code=404,detail={"code":"NOT_FOUND","message":"page image could not be found"})
+
+    if width is not None:
+        width = min(-(-width // 64) * 64, 1024) #Round up so a few sizes are cached instead of one per pixel width.
+    etag = f'"{grid_out._id}"' if width is None else f'"{grid_out._id}-w{width}"'
+    headers = {"ETag": etag, "Cache-Control": CACHE_CONTROL}
+
+    if_none_match = request.headers.get("if-none-match")
+    if if_none_match and (if_none_match.strip() == "*" or etag in [tag.strip() for tag in if_none_match.split(",")]):
+        return Response(status_code=304, headers=headers)
+
+    if width is not None:
+        thumbnail = await page_images.thumbnail(grid_out, width)
+        return Response(content=thumbnail, media_type="image/webp", headers=headers)
+
+    length = grid_out.length
+    headers["Accept-Ranges"] = "bytes"
+    range_header = request.headers.get("range")
+    if_range = request.headers.get("if-range")
+    if if_range and if_range.strip() != etag:
+        range_header = None #The client's copy is stale, send the whole image.
+    try:
+        byte_range = page_images.parse_range(range_header, length)
+    except ValueError:
+        return Response(status_code=416, headers={**headers, "Content-Range": f"bytes */{length}"})
+
+    status_code = 200
+    start, end = 0, length - 1
+    if byte_range is not None:
+        start, end = byte_range
+        status_code = 206
+        headers["Content-Range"] = f"bytes {start}-{end}/{length}"
+    headers["Content-Length"] = str(end - start + 1)
+
+    return StreamingResponse(
+        page_images.stream(grid_out, start, end),
+        status_code=status_code,
+        media_type=grid_out.content_type or "image/png",
+        headers=headers,
+    )
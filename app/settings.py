@@ -1,5 +1,6 @@
 from pydantic_settings import SettingsConfigDict, BaseSettings
 from pathlib import Path
+from typing import Literal,Optional
 
 BASE_DIR = Path(__file__).resolve().parent.parent
 
@@ -13,6 +14,61 @@ class Settings(BaseSettings):
     WEAVIATE_SERVER: str
     GOOGLE_API_KEY: str
     MCP_SERVER: str
+    VECTOR_BACKEND: Literal["weaviate","numpy"] = "weaviate" #With "numpy" retrieval runs in-process in the MCP server and no weaviate client is opened.
+    MONGODB_DB: str = "test" #Database used when MONGODB_URI names none, the setup server reads the same variable ("test" is mongoengine's default).
+    # Weaviate server, the same variables are read by the MCP and setup servers.
+    WEAVIATE_HOST: str = "localhost"
+    WEAVIATE_HTTP_PORT: int = 8080
+    WEAVIATE_GRPC_PORT: int = 50051
+    # SQLite tuning, WAL lets readers run alongside the single writer and NORMAL sync only fsyncs on checkpoints.
+    SQLITE_JOURNAL_MODE: str = "WAL"
+    SQLITE_SYNCHRONOUS: str = "NORMAL"
+    SQLITE_BUSY_TIMEOUT_MS: int = 5000
+    SQLITE_POOL_SIZE: int = 5
+    SQLITE_MAX_OVERFLOW: int = 10
+    SQLITE_POOL_TIMEOUT: float = 30
+    # Write-behind persistence of chat turns, turns are batched across requests instead of committed before the response.
+    CHAT_WRITE_BEHIND: bool = False
+    CHAT_WRITE_QUEUE_SIZE: int = 1000
+    CHAT_WRITE_BATCH_SIZE: int = 100
+    CHAT_WRITE_FLUSH_INTERVAL: float = 0.05
+    # In-memory caches of authenticated users and chat owners, see app/utils/auth_cache.py.
+    AUTH_CACHE_SIZE: int = 10000
+    AUTH_CACHE_TTL: int = 300
+    CHAT_OWNER_CACHE_SIZE: int = 50000
+    # Password hashing, Argon2 parameters (memory cost in KiB) and the dedicated process pool it runs on.
+    ARGON2_TIME_COST: int = 3
+    ARGON2_MEMORY_COST: int = 65536
+    ARGON2_PARALLELISM: int = 4
+    HASH_POOL_WORKERS: int = 2
+    HASH_QUEUE_LIMIT: int = 32
+    # Checkpoint retention, latest checkpoints kept per thread (0 keeps all), TTL for abandoned threads (0 disables it) and compactor interval.
+    CHECKPOINT_KEEP_LAST: int = 5
+    CHECKPOINT_TTL_SECONDS: int = 0
+    CHECKPOINT_COMPACT_INTERVAL: int = 600
+    # Checkpoint writes, "sync" persists after every node, "async" persists in the background while the next node runs,
+    # "exit" persists only when the run ends. Blobs of at least CHECKPOINT_COMPRESS_THRESHOLD bytes are zlib compressed (0 disables it).
+    CHECKPOINT_DURABILITY: Literal["sync","async","exit"] = "async"
+    CHECKPOINT_COMPRESS_THRESHOLD: int = 0
+    CHECKPOINT_COMPRESS_LEVEL: int = 6
+    # Per chat document uploads, indexed in memory only. Indexes expire DOCUMENT_INDEX_TTL seconds after last use and the least
+    # recently used are evicted once all indexes together exceed DOCUMENT_INDEX_MAX_BYTES.
+    DOCUMENT_UPLOAD_MAX_BYTES: int = 20 * 1024 * 1024
+    DOCUMENT_OCR_MAX_PAGES: int = 50 #Pages without a text layer OCR'd per upload, larger scans are rejected.
+    DOCUMENT_INDEX_MAX_BYTES: int = 256 * 1024 * 1024
+    DOCUMENT_INDEX_TTL: int = 3600
+    DOCUMENT_INDEX_MAX_CHUNKS: int = 2000
+    DOCUMENT_CHUNK_TOKENS: int = 300
+    DOCUMENT_CHUNK_OVERLAP: int = 50
+    # Total bytes of page thumbnails kept in memory by /api/images.
+    PAGE_THUMBNAIL_CACHE_BYTES: int = 64 * 1024 * 1024
+    # Usernames allowed on the /api/admin endpoints.
+    ADMIN_USERNAMES: list[str] = []
+    # Chat turns profiled on request by admins (?profile=true or X-Profile: 1), sampling interval, profiles kept and an optional
+    # directory to keep them in so every worker can serve them from /api/admin/profiles.
+    PROFILE_INTERVAL_MS: float = 5
+    PROFILE_MAX_STORED: int = 20
+    PROFILE_DIR: Optional[str] = None
     model_config = SettingsConfigDict(env_file=BASE_DIR / ".env") #Read your .env file
 
 # Instantiate settings so that you can import the instance directly
@@ -0,0 +1,66 @@
+from cachetools import LRUCache,TLRUCache
+from app.db_models.models import User
+from app.settings import settings
+from typing import Optional
+import time
+
+class AuthCache():
+    """
+    In-memory caches for the lookups every protected request makes.
+        users -> username to user principal, an entry lives for AUTH_CACHE_TTL seconds but never past the expiry of the token that loaded it.
+        chat_owners -> chat id to owner id, ownership never changes so entries only leave on eviction or chat deletion.
+    """
+    def __init__(self, user_max_size: int, user_ttl: int, chat_max_size: int):
+        self.user_ttl = user_ttl
+        self.users = TLRUCache(maxsize=user_max_size, ttu=lambda key, value, now: value[1], timer=time.time)
+        self.chat_owners = LRUCache(maxsize=chat_max_size)
+        self.stats = {"user_hits": 0, "user_misses": 0, "chat_hits": 0, "chat_misses": 0}
+
+    def get_user(self, username: str) -> Optional[User]:
+        """ Method to get a cached user principal, None on a miss. """
+        entry = self.users.get(username)
+        self.stats["user_hits" if entry else "user_misses"] += 1
+        return entry[0] if entry else None
+
+    def set_user(self, username: str, user: User, token_expiry: Optional[float] = None):
+        """ Method to cache a user principal, token_expiry (unix time) caps how long the entry is valid. """
+        expires_at = time.time() + self.user_ttl
+        if token_expiry is not None:
+            expires_at = min(expires_at, token_expiry)
+        self.users[username] = (user, expires_at)
+
+    def invalidate_user(self, username: str):
+        """ Method to drop a user principal, call it whenever a user row changes. """
+        self.users.pop(username, None)
+
+    def get_chat_owner(self, chat_id: str) -> Optional[int]:
+        """ Method to get the cached owner id of a chat, None on a miss. """
+        owner_id = self.chat_owners.get(chat_id)
+        self.stats["chat_hits" if owner_id is not None else "chat_misses"] += 1
+        return owner_id
+
+    def set_chat_owner(self, chat_id: str, owner_id: int):
+        """ Method to cache the owner id of a chat, call it once the chat row was read or created. """
+        self.chat_owners[chat_id] = owner_id
+
+    def invalidate_chat(self, chat_id: str):
+        """ Method to drop the cached owner of a chat, call it when the chat is deleted. """
+        self.chat_owners.pop(chat_id, None)
+
+    def get_stats(self) -> dict:
+        """ Method to report hit rates and sizes of both caches. """
+        user_lookups = self.stats["user_hits"] + self.stats["user_misses"]
+        chat_lookups = self.stats["chat_hits"] + self.stats["chat_misses"]
+        return {
+            **self.stats,
+            "user_hit_rate": self.stats["user_hits"] / user_lookups if user_lookups else 0.0,
+            "chat_hit_rate": self.stats["chat_hits"] / chat_lookups if chat_lookups else 0.0,
+            "users_cached": len(self.users),
+            "chats_cached": len(self.chat_owners),
+        }
+
+auth_cache = AuthCache(
+    user_max_size=settings.AUTH_CACHE_SIZE,
+    user_ttl=settings.AUTH_CACHE_TTL,
+    chat_max_size=settings.CHAT_OWNER_CACHE_SIZE,
+)
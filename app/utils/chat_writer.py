@@ -0,0 +1,110 @@
+from app.db_models.models import Chat,Message
+from app.settings import settings
+from sqlmodel import update
+from sqlmodel.ext.asyncio.session import AsyncSession
+from sqlalchemy.ext.asyncio import async_sessionmaker
+from pydantic import BaseModel,Field
+from datetime import datetime,timezone
+from typing import List,Optional
+import asyncio,logging
+
+logger = logging.getLogger(__name__)
+
+class ChatTurn(BaseModel):
+    """ Everything persisted for one chat turn: the optional new header plus the human and ai messages. """
+    chat_id: str
+    user_query: str
+    content: str
+    header: Optional[str] = None
+    created_at: datetime = Field(default_factory=lambda: datetime.now(timezone.utc)) #Taken on submit so queued turns keep their order.
+
+
+async def write_turns(session: AsyncSession, turns: List[ChatTurn]):
+    """ Write the headers and messages of one or more turns in a single transaction. """
+    for turn in turns:
+        if turn.header:
+            await session.exec(update(Chat).where(Chat.id == turn.chat_id).values(header=turn.header))
+        session.add(Message(chat_id=turn.chat_id,role="human",content=turn.user_query,created_at=turn.created_at))
+        session.add(Message(chat_id=turn.chat_id,role="ai",content=turn.content,created_at=turn.created_at))
+    try:
+        await session.commit()
+    except Exception:
+        await session.rollback()
+        raise
+
+
+class ChatWriter():
+    """
+    Bounded write-behind queue for chat turns, so the HTTP response does not wait on SQLite commits.
+    A single background task drains the queue and writes up to batch_size turns (across requests) per transaction.
+    Submitting blocks only when the queue is full, pending turns are flushed on shutdown.
+    """
+    def __init__(self, session_maker: async_sessionmaker, max_size: int, batch_size: int, flush_interval: float):
+        self.session_maker = session_maker
+        self.batch_size = batch_size
+        self.flush_interval = flush_interval
+        self.queue: asyncio.Queue[ChatTurn] = asyncio.Queue(maxsize=max_size)
+        self._task: Optional[asyncio.Task] = None
+
+    def start(self):
+        """ Method to start the background writer task. """
+        self._task = asyncio.create_task(self._run())
+
+    async def submit(self, turn: ChatTurn):
+        """ Method to queue a turn for writing, waits for space when the queue is full (back pressure). """
+        await self.queue.put(turn)
+
+    async def _next_batch(self) -> List[ChatTurn]:
+        """ Method to wait for a turn and collect whatever else arrives within the flush interval, up to batch_size. """
+        batch = [await self.queue.get()]
+        loop = asyncio.get_running_loop()
+        deadline = loop.time() + self.flush_interval
+        while len(batch) < self.batch_size:
+            timeout = deadline - loop.time()
+            if timeout <= 0:
+                break
+            try:
+                batch.append(await asyncio.wait_for(self.queue.get(), timeout))
+            except asyncio.TimeoutError:
+                break
+        return batch
+
+    async def _write(self, batch: List[ChatTurn]):
+        """ Method to write a batch, a failed batch is logged and dropped so later turns are not blocked behind it. """
+        try:
+            async with self.session_maker() as session:
+                await write_turns(session, batch)
+        except Exception:
+            logger.exception("Chat writer failed to persist turns", extra={"turns": len(batch)})
+        finally:
+            for _ in batch:
+                self.queue.task_done()
+
+    async def _run(self):
+        while True:
+            batch = await self._next_batch()
+            await self._write(batch)
+
+    async def close(self):
+        """ Method to flush every queued turn and stop the background task. """
+        if self._task is None:
+            return
+        await self.queue.join()
+        self._task.cancel()
+        try:
+            await self._task
+        except asyncio.CancelledError:
+            pass
+        self._task = None
+
+
+def get_chat_writer(session_maker: async_sessionmaker) -> Optional[ChatWriter]:
+    """ Build the write-behind writer if enabled in settings, None means turns are written inline. """
+    if not settings.CHAT_WRITE_BEHIND:
+        return None
+    return ChatWriter(
+        session_maker=session_maker,
+        max_size=settings.CHAT_WRITE_QUEUE_SIZE,
+        batch_size=settings.CHAT_WRITE_BATCH_SIZE,
+        flush_interval=settings.CHAT_WRITE_FLUSH_INTERVAL,
+    )
@@ -0,0 +1,130 @@
+from langgraph.checkpoint.mongodb import MongoDBSaver
+from pymongo import ASCENDING
+from pymongo.collection import Collection
+from typing import Optional
+import asyncio,logging
+
+logger = logging.getLogger(__name__)
+
+class CheckpointRetention():
+    """
+    Retention policy for the MongoDB checkpointer.
+        keep_last -> checkpoints kept per thread, older ones (and their pending writes) are deleted by the compactor. 0 keeps everything.
+            A thread only needs its latest checkpoint to continue, older ones hold history that RemoveMessage already dropped.
+        ttl -> seconds after which checkpoints and writes expire through a MongoDB TTL index on created_at, removing abandoned threads. 0 disables it.
+            Only documents written while a ttl is configured carry created_at, older documents never expire.
+        interval -> seconds between background compaction runs.
+    """
+    def __init__(self, checkpointer: MongoDBSaver, keep_last: int, ttl: int, interval: int):
+        self.checkpointer = checkpointer
+        self.keep_last = keep_last
+        self.ttl = ttl
+        self.interval = interval
+        self._task: Optional[asyncio.Task] = None
+
+    @property
+    def collections(self):
+        return (self.checkpointer.checkpoint_collection, self.checkpointer.writes_collection)
+
+    def _ensure_ttl_index(self, collection: Collection):
+        """ Method to create, update or drop the created_at TTL index so it matches the configured ttl. """
+        for index in collection.list_indexes():
+            if dict(index["key"]) != {"created_at": 1}:
+                continue
+            if not self.ttl:
+                collection.drop_index(index["name"]) #TTL turned off, stop expiring documents.
+            elif index.get("expireAfterSeconds") != self.ttl:
+                collection.database.command("collMod", collection.name, index={"keyPattern": {"created_at": 1}, "expireAfterSeconds": self.ttl})
+            return
+        if self.ttl:
+            collection.create_index([("created_at", ASCENDING)], expireAfterSeconds=self.ttl)
+
+    def ensure_indexes(self):
+        """ Method to apply the TTL policy to both checkpoint collections, the saver itself only creates them on empty collections. """
+        for collection in self.collections:
+            self._ensure_ttl_index(collection)
+
+    def compact_thread(self, thread_id: str, checkpoint_ns: str = "") -> int:
+        """ Method to delete all but the latest keep_last checkpoints of a thread along with their writes, returns the deleted checkpoint count. """
+        if not self.keep_last:
+            return 0
+        checkpoints, writes = self.collections
+        query = {"thread_id": thread_id, "checkpoint_ns": checkpoint_ns}
+        stale_ids = [
+            doc["checkpoint_id"]
+            for doc in checkpoints.find(query, {"checkpoint_id": 1, "_id": 0}).sort("checkpoint_id", -1).skip(self.keep_last) #Checkpoint ids are time ordered.
+        ]
+        if not stale_ids:
+            return 0
+        checkpoints.delete_many({**query, "checkpoint_id": {"$in": stale_ids}})
+        writes.delete_many({**query, "checkpoint_id": {"$in": stale_ids}})
+        return len(stale_ids)
+
+    def compact_all(self) -> dict:
+        """ Method to compact every thread holding more than keep_last checkpoints. """
+        if not self.keep_last:
+            return {"threads": 0, "deleted_checkpoints": 0}
+        checkpoints, _ = self.collections
+        over_limit = checkpoints.aggregate([
+            {"$group": {"_id": {"thread_id": "$thread_id", "checkpoint_ns": "$checkpoint_ns"}, "count": {"$sum": 1}}},
+            {"$match": {"count": {"$gt": self.keep_last}}},
+        ])
+        threads, deleted = 0, 0
+        for group in over_limit:
+            deleted += self.compact_thread(group["_id"]["thread_id"], group["_id"]["checkpoint_ns"])
+            threads += 1
+        return {"threads": threads, "deleted_checkpoints": deleted}
+
+    def storage_report(self, limit: int = 50) -> dict:
+        """ Method to report checkpoint and write storage per thread, largest threads first. """
+        def _per_thread(collection: Collection) -> dict:
+            groups = collection.aggregate([
+                {"$group": {"_id": "$thread_id", "documents": {"$sum": 1}, "bytes": {"$sum": {"$bsonSize": "$$ROOT"}}}},
+            ])
+            return {group["_id"]: group for group in groups}
+
+        checkpoints, writes = (_per_thread(collection) for collection in self.collections)
+        threads = []
+        for thread_id in checkpoints.keys() | writes.keys():
+            checkpoint_group = checkpoints.get(thread_id, {})
+            write_group = writes.get(thread_id, {})
+            threads.append({
+                "thread_id": thread_id,
+                "checkpoints": checkpoint_group.get("documents", 0),
+                "checkpoint_bytes": checkpoint_group.get("bytes", 0),
+                "writes": write_group.get("documents", 0),
+                "write_bytes": write_group.get("bytes", 0),
+            })
+        threads.sort(key=lambda t: t["checkpoint_bytes"] + t["write_bytes"], reverse=True)
+        return {
+            "threads": len(threads),
+            "total_bytes": sum(t["checkpoint_bytes"] + t["write_bytes"] for t in threads),
+            "keep_last": self.keep_last,
+            "ttl": self.ttl,
+            "largest_threads": threads[:limit],
+        }
+
+    async def _run(self):
+        while True:
+            await asyncio.sleep(self.interval)
+            try:
+                result = await asyncio.to_thread(self.compact_all) #pymongo is blocking, keep it off the event loop.
+                if result["deleted_checkpoints"]:
+                    logger.info("Checkpoint compactor pass", extra=result)
+            except Exception as e:
+                logger.exception("Checkpoint compactor failed")
+
+    def start(self):
+        """ Method to start the background compactor. """
+        if self.keep_last and self.interval > 0:
+            self._task = asyncio.create_task(self._run())
+
+    async def stop(self):
+        """ Method to stop the background compactor. """
+        if self._task is not None:
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+            self._task = None
@@ -0,0 +1,103 @@
+from langgraph.checkpoint.mongodb import MongoDBSaver
+from langgraph.checkpoint.serde.jsonplus import JsonPlusSerializer
+from langchain_core.runnables import RunnableConfig
+from cachetools import LRUCache
+from collections import deque
+from typing import Any,Tuple
+import threading,zlib
+
+_COMPRESSED_SUFFIX = "+zlib"
+
+class CompressingSerializer(JsonPlusSerializer):
+    """
+    JsonPlus serializer that zlib compresses blobs of at least `threshold` bytes, 0 disables compression.
+    Compressed blobs are tagged with a "+zlib" type suffix so uncompressed checkpoints written before stay readable.
+    The bytes produced on the calling thread are counted so the saver can attribute them to a thread id.
+    """
+    def __init__(self, threshold: int, level: int = 6):
+        super().__init__()
+        self.threshold = threshold
+        self.level = level
+        self._local = threading.local()
+
+    def dumps_typed(self, obj: Any) -> Tuple[str, bytes]:
+        type_, data = super().dumps_typed(obj)
+        raw_size = len(data)
+        if self.threshold and raw_size >= self.threshold:
+            compressed = zlib.compress(data, self.level)
+            if len(compressed) < raw_size:
+                type_, data = type_ + _COMPRESSED_SUFFIX, compressed
+        self._local.raw_bytes = getattr(self._local, "raw_bytes", 0) + raw_size
+        self._local.stored_bytes = getattr(self._local, "stored_bytes", 0) + len(data)
+        return type_, data
+
+    def loads_typed(self, data: Tuple[str, bytes]) -> Any:
+        type_, payload = data
+        if type_.endswith(_COMPRESSED_SUFFIX):
+            type_, payload = type_[:-len(_COMPRESSED_SUFFIX)], zlib.decompress(payload)
+        return super().loads_typed((type_, payload))
+
+    def take_counts(self) -> Tuple[int, int]:
+        """ Method to return and reset the (raw, stored) bytes serialized on the current thread. """
+        counts = (getattr(self._local, "raw_bytes", 0), getattr(self._local, "stored_bytes", 0))
+        self._local.raw_bytes = self._local.stored_bytes = 0
+        return counts
+
+
+class MeteredMongoDBSaver(MongoDBSaver):
+    """
+    MongoDBSaver that optionally compresses large blobs and meters how many bytes every thread writes.
+    The agent records the bytes of each turn through record_turn, get_stats reports them for the admin endpoint.
+    """
+    def __init__(self, client, compress_threshold: int = 0, compress_level: int = 6, max_threads: int = 10000, max_turns: int = 1000, **kwargs):
+        super().__init__(client, **kwargs)
+        self.serde = CompressingSerializer(threshold=compress_threshold, level=compress_level)
+        self.thread_bytes = LRUCache(maxsize=max_threads) #thread id -> stored bytes written, bounded like the auth caches.
+        self.turn_bytes = deque(maxlen=max_turns)
+        self.stats = {"checkpoints": 0, "writes": 0, "raw_bytes": 0, "stored_bytes": 0}
+        self._lock = threading.Lock() #put and put_writes run on executor threads.
+
+    def _meter(self, config: RunnableConfig, kind: str, documents: int):
+        raw, stored = self.serde.take_counts()
+        thread_id = config["configurable"]["thread_id"]
+        with self._lock:
+            self.stats[kind] += documents
+            self.stats["raw_bytes"] += raw
+            self.stats["stored_bytes"] += stored
+            self.thread_bytes[thread_id] = self.thread_bytes.get(thread_id, 0) + stored
+
+    def put(self, config, checkpoint, metadata, new_versions) -> RunnableConfig:
+        self.serde.take_counts()
+        next_config = super().put(config, checkpoint, metadata, new_versions)
+        self._meter(config, "checkpoints", 1)
+        return next_config
+
+    def put_writes(self, config, writes, task_id, task_path = "") -> None:
+        self.serde.take_counts()
+        super().put_writes(config, writes, task_id, task_path)
+        self._meter(config, "writes", len(writes))
+
+    def bytes_written(self, thread_id: str) -> int:
+        """ Method to get the stored bytes written for a thread so far. """
+        with self._lock:
+            return self.thread_bytes.get(thread_id, 0)
+
+    def record_turn(self, written: int):
+        """ Method to record the stored bytes one agent turn wrote. """
+        with self._lock:
+            self.turn_bytes.append(written)
+
+    def get_stats(self) -> dict:
+        """ Method to report write volume, compression ratio and bytes written per turn. """
+        with self._lock:
+            turns = sorted(self.turn_bytes)
+            stats = dict(self.stats)
+        return {
+            **stats,
+            "compression_ratio": stats["stored_bytes"] / stats["raw_bytes"] if stats["raw_bytes"] else 1.0,
+            "turns": len(turns),
+            "avg_bytes_per_turn": sum(turns) / len(turns) if turns else 0.0,
+            "p50_bytes_per_turn": turns[len(turns) // 2] if turns else 0,
+            "p95_bytes_per_turn": turns[min(len(turns) - 1, int(len(turns) * 0.95))] if turns else 0,
+            "compress_threshold": self.serde.threshold,
+        }
@@ -1,16 +1,32 @@
-from fastapi import Request,Depends
-from sqlmodel import Session
-from typing import Annotated
-from app.db_models.models import PDFImage
+from fastapi import Request,Depends,HTTPException
+from sqlmodel.ext.asyncio.session import AsyncSession
+from typing import Annotated,Any,Callable
+from app.utils.page_images import PageImageStore
+from datetime import datetime
+import base64
 
 
-def get_sql_session(request: Request):
+async def get_sql_session(request: Request):
     """ Method to initialize database session object """
-    with Session(request.app.state.sqlite_config.engine) as session:
+    async with request.app.state.sqlite_config.session_maker() as session:
         yield session
 
-def reconstruct_text_to_image(request: Request):
-    pass
+def encode_cursor(created_at: datetime, row_id) -> str:
+    """ Method to encode the (created_at, id) position of the last returned row into an opaque keyset cursor. """
+    return base64.urlsafe_b64encode(f"{created_at.isoformat()}|{row_id}".encode()).decode()
+
+def decode_cursor(cursor: str, id_type: Callable[[str], Any] = str) -> tuple[datetime, Any]:
+    """ Method to decode a keyset cursor back into its (created_at, id) position, id_type converts the id (e.g. int for message ids). """
+    try:
+        created_at, row_id = base64.urlsafe_b64decode(cursor.encode()).decode().split("|", 1)
+        return datetime.fromisoformat(created_at), id_type(row_id)
+    except Exception:
+        raise HTTPException(status_code=400,detail={"code":"INVALID_CURSOR","message":"Pagination cursor is invalid"})
+
+def get_page_image_store(request: Request) -> PageImageStore:
+    """ Method to get the shared GridFS page image store, used to resolve the image_id of document_search citations """
+    return request.app.state.page_images
 
 #Build session dependency object to inject the appropriate session per user request
-SQLSessionDep = Annotated[Session, Depends(get_sql_session)]
\ No newline at end of file
+SQLSessionDep = Annotated[AsyncSession, Depends(get_sql_session)]
+PageImageStoreDep = Annotated[PageImageStore, Depends(get_page_image_store)]
\ No newline at end of file
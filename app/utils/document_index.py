@@ -0,0 +1,142 @@
+from cachetools import TTLCache
+from app.settings import settings
+from app.utils.metrics import track_outbound
+from structured_logging.logger import propagation_headers
+from typing import Dict,List,Optional
+import numpy as np
+import httpx
+import time
+
+class ChatDocumentIndex():
+    """ Chunks and normalized embeddings of the documents uploaded to one chat, searched by brute force. """
+    def __init__(self):
+        self.chunks: List[dict] = []
+        self.vectors: Optional[np.ndarray] = None
+        self.documents: Dict[str, int] = {} #filename -> chunk count.
+
+    @property
+    def nbytes(self) -> int:
+        """ Approximate memory held by the index, counted against DOCUMENT_INDEX_MAX_BYTES. """
+        text_bytes = sum(len(chunk["text"]) for chunk in self.chunks)
+        return (self.vectors.nbytes if self.vectors is not None else 0) + text_bytes
+
+    def add(self, filename: str, chunks: List[dict], vectors: List[List[float]]):
+        vectors = np.asarray(vectors, dtype=np.float32)
+        vectors /= np.maximum(np.linalg.norm(vectors, axis=1, keepdims=True), 1e-12)
+        self.vectors = vectors if self.vectors is None else np.concatenate([self.vectors, vectors])
+        self.chunks.extend({**chunk, "document": filename} for chunk in chunks)
+        self.documents[filename] = self.documents.get(filename, 0) + len(chunks)
+
+    def search(self, vector: List[float], limit: int) -> List[dict]:
+        query = np.asarray(vector, dtype=np.float32)
+        query /= max(float(np.linalg.norm(query)), 1e-12)
+        scores = self.vectors @ query
+        best = np.argsort(-scores)[:limit]
+        return [{**self.chunks[i], "distance": round(float(1.0 - scores[i]), 4)} for i in best]
+
+
+def chunk_pages(pages: List[str], chunk_tokens: int, overlap_tokens: int) -> List[dict]:
+    """ Split page texts into overlapping word windows of about chunk_tokens tokens (4 characters per token), chunks never span pages. """
+    chunk_chars, overlap_chars = chunk_tokens * 4, overlap_tokens * 4
+    chunks = []
+    for page, text in enumerate(pages, start=1):
+        words = text.split()
+        start = 0
+        while start < len(words):
+            end, size = start, 0
+            while end < len(words) and size + len(words[end]) + 1 <= chunk_chars:
+                size += len(words[end]) + 1
+                end += 1
+            end = max(end, start + 1) #A single word longer than a chunk still makes progress.
+            chunks.append({"text": " ".join(words[start:end]), "page": page})
+            if end >= len(words):
+                break
+            back, size = end, 0
+            while back > start + 1 and size + len(words[back - 1]) + 1 <= overlap_chars:
+                size += len(words[back - 1]) + 1
+                back -= 1
+            start = back
+    return chunks
+
+
+class ChatDocumentStore():
+    """
+    In-memory per chat document indexes, nothing is persisted.
+    Indexes live in a TTL cache sized in bytes: an index expires ttl seconds after it was last used and the least recently
+    used indexes are evicted once all of them together exceed max_bytes. A chat holds at most max_chunks chunks.
+    """
+    def __init__(self, max_bytes: int, ttl: int, max_chunks: int, embedding_url: str, batch_size: int = 32):
+        self.indexes = TTLCache(maxsize=max_bytes, ttl=ttl, timer=time.monotonic, getsizeof=lambda index: max(index.nbytes, 1))
+        self.max_bytes = max_bytes
+        self.max_chunks = max_chunks
+        self.embedding_url = embedding_url
+        self.batch_size = batch_size
+        self.http: Optional[httpx.AsyncClient] = None
+
+    def start(self):
+        """ Method to open the pooled client for the embedding server. """
+        self.http = httpx.AsyncClient(timeout=httpx.Timeout(60.0, connect=5.0))
+
+    async def close(self):
+        if self.http is not None:
+            await self.http.aclose()
+            self.http = None
+
+    async def _embed(self, texts: List[str], embed_type: str) -> List[List[float]]:
+        """ Method to embed texts in batches, documents are embedded once on upload. """
+        vectors = []
+        for start in range(0, len(texts), self.batch_size):
+            with track_outbound("embedder", embed_type):
+                response = await self.http.post(self.embedding_url, params={"embed_type": embed_type}, headers=propagation_headers(), json={"text": texts[start:start + self.batch_size]})
+                response.raise_for_status()
+            vectors.extend(response.json()["vectors"])
+        return vectors
+
+    def _touch(self, chat_id: str) -> Optional[ChatDocumentIndex]:
+        """ Method to get an index and restart its ttl, None if the chat has none (or it expired). """
+        index = self.indexes.get(chat_id)
+        if index is not None:
+            self.indexes[chat_id] = index
+        return index
+
+    async def add_document(self, chat_id: str, filename: str, chunks: List[dict]) -> dict:
+        """ Method to embed the chunks of a document and add them to the chat index, raises ValueError over the size caps. """
+        self._check_chunks(self.indexes.get(chat_id), chunks) #Fail before spending time on embeddings.
+        vectors = await self._embed([chunk["text"] for chunk in chunks], "document")
+        # No await from here on, concurrent uploads to the same chat cannot interleave.
+        index = self.indexes.get(chat_id) or ChatDocumentIndex()
+        self._check_chunks(index, chunks)
+        added_bytes = len(vectors) * len(vectors[0]) * 4 + sum(len(chunk["text"]) for chunk in chunks)
+        if index.nbytes + added_bytes > self.max_bytes:
+            raise ValueError("Document is too large for the document index")
+        index.add(filename, chunks, vectors)
+        self.indexes[chat_id] = index #(Re)insert so the cache accounts for the new size.
+        return {"document": filename, "chunks": len(chunks), "documents": dict(index.documents)}
+
+    def _check_chunks(self, index: Optional[ChatDocumentIndex], chunks: List[dict]):
+        if not chunks:
+            raise ValueError("No text could be extracted from the document")
+        if (len(index.chunks) if index is not None else 0) + len(chunks) > self.max_chunks:
+            raise ValueError(f"A chat can hold at most {self.max_chunks} document chunks")
+
+    def list_documents(self, chat_id: str) -> Dict[str, int]:
+        index = self.indexes.get(chat_id)
+        return dict(index.documents) if index is not None else {}
+
+    async def search(self, chat_id: str, query: str, limit: int = 5) -> List[dict]:
+        index = self._touch(chat_id)
+        if index is None or not index.chunks:
+            return []
+        vector = (await self._embed([query], "query"))[0]
+        return index.search(vector, limit)
+
+    def drop(self, chat_id: str):
+        self.indexes.pop(chat_id, None)
+
+
+chat_documents = ChatDocumentStore(
+    max_bytes=settings.DOCUMENT_INDEX_MAX_BYTES,
+    ttl=settings.DOCUMENT_INDEX_TTL,
+    max_chunks=settings.DOCUMENT_INDEX_MAX_CHUNKS,
+    embedding_url=settings.WEAVIATE_SERVER, #The embedding (vectorizer) endpoint, shared with weaviate ingestion.
+)
@@ -0,0 +1,72 @@
+from pwdlib import PasswordHash
+from pwdlib.hashers.argon2 import Argon2Hasher
+from concurrent.futures import ProcessPoolExecutor
+from fastapi import HTTPException
+from typing import Dict,Optional,Tuple
+import asyncio,multiprocessing
+
+# Argon2 parameters as (time_cost, memory_cost in KiB, parallelism), passed to worker processes with every call.
+HashParams = Tuple[int, int, int]
+
+_hashers: Dict[HashParams, PasswordHash] = {} #Per process cache, a worker builds its hasher once.
+
+def build_password_hash(params: HashParams) -> PasswordHash:
+    """ Build a pwdlib PasswordHash with Argon2 using the given parameters. """
+    time_cost, memory_cost, parallelism = params
+    return PasswordHash((Argon2Hasher(time_cost=time_cost, memory_cost=memory_cost, parallelism=parallelism),))
+
+def _get_hasher(params: HashParams) -> PasswordHash:
+    if params not in _hashers:
+        _hashers[params] = build_password_hash(params)
+    return _hashers[params]
+
+def _hash(password: str, params: HashParams) -> str:
+    return _get_hasher(params).hash(password)
+
+def _verify(password: str, hashed_password: str, params: HashParams) -> bool:
+    return _get_hasher(params).verify(password, hashed_password) #Parameters are read from the hash itself, params only pick the cached hasher.
+
+
+class HashingPool():
+    """
+    Dedicated, size limited process pool for Argon2 hashing and verification.
+    Hashing is CPU and memory heavy by design, running it in its own processes keeps login bursts away from the
+    shared threadpool and the GIL used by chat requests. Calls beyond workers + queue_limit in flight are rejected with a 503.
+    """
+    def __init__(self, workers: int, queue_limit: int, params: HashParams):
+        self.workers = workers
+        self.queue_limit = queue_limit
+        self.params = params
+        self.executor: Optional[ProcessPoolExecutor] = None
+        self._in_flight = 0
+
+    def start(self):
+        """ Method to create the worker processes. """
+        #Spawned, not forked: the pool starts after pymongo, aiosqlite and other client threads, a forked child can inherit their held locks.
+        self.executor = ProcessPoolExecutor(max_workers=self.workers, mp_context=multiprocessing.get_context("spawn"))
+
+    async def shutdown(self):
+        """ Method to stop the worker processes, queued calls are cancelled. """
+        if self.executor is not None:
+            executor, self.executor = self.executor, None
+            await asyncio.to_thread(executor.shutdown, wait=True, cancel_futures=True) #Joining the workers blocks, keep it off the event loop.
+
+    async def _submit(self, fn, *args):
+        """ Method to run a hashing call on the pool, or reject it when the pool is saturated. """
+        if self._in_flight >= self.workers + self.queue_limit:
+            raise HTTPException(
+                status_code=503,
+                detail={"code":"SERVER_BUSY","message":"Too many authentication requests, try again shortly"},
+                headers={"Retry-After":"1"},
+            )
+        self._in_flight += 1
+        try:
+            return await asyncio.get_running_loop().run_in_executor(self.executor, fn, *args) #Falls back to the default threadpool if start() was not called.
+        finally:
+            self._in_flight -= 1
+
+    async def hash(self, password: str) -> str:
+        return await self._submit(_hash, password, self.params)
+
+    async def verify(self, password: str, hashed_password: str) -> bool:
+        return await self._submit(_verify, password, hashed_password, self.params)
@@ -0,0 +1,51 @@
+from prometheus_client import Counter,Histogram,REGISTRY
+from prometheus_client.core import CounterMetricFamily
+from contextlib import contextmanager
+from typing import Callable,Dict,List,Tuple
+import time
+
+# Prometheus metrics of the main API, served by GET /metrics.
+LATENCY_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10, 30, 60)
+
+NODE_SECONDS = Histogram("tatvix_graph_node_seconds", "Latency of agent graph nodes.", ["node"], buckets=LATENCY_BUCKETS)
+OUTBOUND_SECONDS = Histogram("tatvix_outbound_seconds", "Latency of calls to other services.", ["target", "operation"], buckets=LATENCY_BUCKETS)
+OUTBOUND_ERRORS = Counter("tatvix_outbound_errors_total", "Failed calls to other services.", ["target", "operation"])
+LLM_TOKENS = Counter("tatvix_llm_tokens_total", "Chat model tokens per graph node.", ["node", "direction"])
+TURN_SECONDS = Histogram("tatvix_turn_seconds", "Latency of a whole chat turn.", buckets=LATENCY_BUCKETS)
+TURN_TOOL_ROUNDS = Histogram("tatvix_turn_tool_rounds", "Tool node executions per chat turn.", buckets=(0, 1, 2, 3, 4, 6, 8, 12))
+
+@contextmanager
+def track_outbound(target: str, operation: str):
+    """ Time a call to another service, failures are counted and re-raised. """
+    started = time.perf_counter()
+    try:
+        yield
+    except Exception:
+        OUTBOUND_ERRORS.labels(target, operation).inc()
+        raise
+    finally:
+        OUTBOUND_SECONDS.labels(target, operation).observe(time.perf_counter() - started)
+
+
+class CacheStatsCollector():
+    """
+    Exposes the hit/miss counters caches already keep in their stats dicts as tatvix_cache_requests_total{cache,result},
+    read at scrape time so the hot paths are not counted twice.
+    """
+    def __init__(self):
+        self.caches: Dict[str, Tuple[Callable[[], dict], List[str], List[str]]] = {}
+
+    def add(self, cache: str, stats: Callable[[], dict], hits: List[str], misses: List[str]):
+        self.caches[cache] = (stats, hits, misses)
+
+    def collect(self):
+        family = CounterMetricFamily("tatvix_cache_requests", "Cache lookups by result.", labels=["cache", "result"])
+        for cache, (stats, hits, misses) in self.caches.items():
+            values = stats()
+            family.add_metric([cache, "hit"], sum(values.get(key, 0) for key in hits))
+            family.add_metric([cache, "miss"], sum(values.get(key, 0) for key in misses))
+        yield family
+
+
+cache_stats = CacheStatsCollector()
+REGISTRY.register(cache_stats)
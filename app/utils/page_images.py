@@ -0,0 +1,96 @@
+from pymongo import AsyncMongoClient
+from gridfs import AsyncGridFSBucket
+from gridfs.asynchronous.grid_file import AsyncGridOut
+from cachetools import LRUCache
+from PIL import Image
+from io import BytesIO
+from typing import AsyncIterator,Optional,Tuple
+import asyncio,re
+
+_RANGE = re.compile(r"bytes=(\d*)-(\d*)$")
+
+class PageImageStore():
+    """
+    Read access to the page images the ingestion server stores in GridFS (PDFImage documents, "fs" bucket).
+    Files are streamed chunk by chunk, thumbnails are rendered on demand and kept in an LRU cache bounded by total bytes.
+    """
+    def __init__(self, uri: str, database: str, thumbnail_cache_bytes: int, chunk_size: int = 255 * 1024):
+        self.client = AsyncMongoClient(uri)
+        self.db = self.client.get_default_database(database) #The database of the uri wins like in mongoengine, so both servers read the same one.
+        self.images = self.db["p_d_f_image"] #Collection of the PDFImage mongoengine document.
+        self.bucket = AsyncGridFSBucket(self.db)
+        self.chunk_size = chunk_size
+        self.thumbnails = LRUCache(maxsize=thumbnail_cache_bytes, getsizeof=lambda entry: len(entry[0]))
+        self.stats = {"thumbnail_hits": 0, "thumbnail_misses": 0}
+
+    async def open(self, image_id: str, full: bool = False) -> Optional[AsyncGridOut]:
+        """
+        Method to open the GridFS file of a page by its image_id, None if it does not exist.
+        Pages stored with a display copy (lower DPI WebP) are served from it unless full is set.
+        """
+        image = await self.images.find_one({"image_id": image_id}, {"file": 1, "display_file": 1})
+        if image is None:
+            return None
+        file_id = image.get("file") if full else image.get("display_file") or image.get("file")
+        if file_id is None:
+            return None
+        return await self.bucket.open_download_stream(file_id)
+
+    async def stream(self, grid_out: AsyncGridOut, start: int, end: int) -> AsyncIterator[bytes]:
+        """ Method to yield bytes [start, end] of a file without reading the rest of it. """
+        await grid_out.seek(start)
+        remaining = end - start + 1
+        while remaining > 0:
+            chunk = await grid_out.read(min(self.chunk_size, remaining))
+            if not chunk:
+                break
+            remaining -= len(chunk)
+            yield chunk
+
+    @staticmethod
+    def parse_range(header: Optional[str], length: int) -> Optional[Tuple[int, int]]:
+        """
+        Method to resolve a single "bytes=" range to inclusive (start, end), None to serve the whole file.
+        Multiple ranges are answered with the whole file, raises ValueError for unsatisfiable ranges.
+        """
+        if not header or "," in header:
+            return None
+        match = _RANGE.match(header.strip())
+        if not match or (not match.group(1) and not match.group(2)):
+            return None
+        if not match.group(1): #Suffix range, the last n bytes.
+            suffix = int(match.group(2))
+            if suffix == 0:
+                raise ValueError("Unsatisfiable range")
+            return max(length - suffix, 0), length - 1
+        start = int(match.group(1))
+        end = min(int(match.group(2)), length - 1) if match.group(2) else length - 1
+        if start >= length or start > end:
+            raise ValueError("Unsatisfiable range")
+        return start, end
+
+    @staticmethod
+    def _render_thumbnail(data: bytes, width: int) -> bytes:
+        img = Image.open(BytesIO(data))
+        img.thumbnail((width, width * 4)) #Keeps the aspect ratio, pages are never 4 times taller than wide.
+        if img.mode not in ("RGB", "L"):
+            img = img.convert("RGB")
+        out = BytesIO()
+        img.save(out, format="WEBP", quality=80)
+        return out.getvalue()
+
+    async def thumbnail(self, grid_out: AsyncGridOut, width: int) -> bytes:
+        """ Method to get a WebP thumbnail of a page, rendered from the full image once and then served from the cache. """
+        key = f"{grid_out._id}:{width}"
+        entry = self.thumbnails.get(key)
+        self.stats["thumbnail_hits" if entry is not None else "thumbnail_misses"] += 1
+        if entry is not None:
+            return entry[0]
+        data = await grid_out.read()
+        thumbnail = await asyncio.to_thread(self._render_thumbnail, data, width) #Decoding a 200 DPI page is CPU bound.
+        if len(thumbnail) <= self.thumbnails.maxsize:
+            self.thumbnails[key] = (thumbnail,)
+        return thumbnail
+
+    async def close(self):
+        await self.client.close()
@@ -0,0 +1,5 @@
+from request_profiling.sampler import ProfileStore
+from app.settings import settings
+
+# Profiles of chat turns run with ?profile=true by an admin, keyed by request id, see /api/admin/profiles.
+profile_store = ProfileStore(max_profiles=settings.PROFILE_MAX_STORED, directory=settings.PROFILE_DIR)
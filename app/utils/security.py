@@ -1,4 +1,4 @@
-from pwdlib import PasswordHash
+from app.utils.hashing import HashingPool,build_password_hash
 from datetime import datetime,timedelta
 from fastapi.security import OAuth2PasswordBearer
 from fastapi import Depends,HTTPException
@@ -8,6 +8,7 @@ from app.utils.db_util import SQLSessionDep
 from typing import Annotated
 from jwt.exceptions import InvalidTokenError
 from app.settings import settings
+from app.utils.auth_cache import auth_cache
 import jwt
 import uuid
 
@@ -16,7 +17,9 @@ oauth2_schema = OAuth2PasswordBearer(tokenUrl="login")
 class Security():
     
     def __init__(self):
-        self.hash_object = PasswordHash.recommended() #Use the reccomended password hash settings
+        hash_params = (settings.ARGON2_TIME_COST, settings.ARGON2_MEMORY_COST, settings.ARGON2_PARALLELISM)
+        self.hash_object = build_password_hash(hash_params) #Argon2, reccomended hasher with configurable cost
+        self.hash_pool = HashingPool(workers=settings.HASH_POOL_WORKERS, queue_limit=settings.HASH_QUEUE_LIMIT, params=hash_params)
 
     def hash_password(self,password:str):
         """ Utility to hash user password """
@@ -25,6 +28,14 @@ class Security():
     def verify_password(self,password:str, hashed_password:str):
         """ Utility to verify user password """
         return self.hash_object.verify(password, hashed_password)
+
+    async def hash_password_async(self,password:str):
+        """ Utility to hash user password on the hashing process pool, raises 503 when the pool is saturated """
+        return await self.hash_pool.hash(password)
+
+    async def verify_password_async(self,password:str, hashed_password:str):
+        """ Utility to verify user password on the hashing process pool, raises 503 when the pool is saturated """
+        return await self.hash_pool.verify(password, hashed_password)
     
     def create_access_token(self, data:dict, expire_time: timedelta):
         """
@@ -40,7 +51,7 @@ class Security():
         encoded_jwt = jwt.encode(to_encode,settings.JWT_SECRET_KEY,algorithm=settings.ENC_ALGORITHM)
         return encoded_jwt
     
-    def get_current_user(self, token: Annotated[str, Depends(oauth2_schema)], db_session: SQLSessionDep):
+    async def get_current_user(self, token: Annotated[str, Depends(oauth2_schema)], db_session: SQLSessionDep):
         """
         Utility to get current user for every protected endpoint
         It Authorizes if the user access bearer token is valid or not
@@ -59,16 +70,28 @@ class Security():
             if username is None:
                 raise HTTPException(status_code=401,detail={"code":"UNAUTHORIZED_ACCESS","message":"Unauthorized Access!"})
             
-            user = db_session.exec(select(User).where(User.username == username)).first()
+            user = auth_cache.get_user(username) #Skip the user lookup for principals seen recently.
+            if user is not None:
+                return user
+
+            user = (await db_session.exec(select(User).where(User.username == username))).first()
 
             if user is None:
                 raise HTTPException(status_code=401,detail={"code":"UNAUTHORIZED_ACCESS","message":"Unauthorized Access!"})
             
+            auth_cache.set_user(username, user, token_expiry=expiry)
             return user
 
         except InvalidTokenError as e:
             raise e
         
+    async def get_admin_user(self, token: Annotated[str, Depends(oauth2_schema)], db_session: SQLSessionDep):
+        """ Utility to authorize admin only endpoints, the user must be listed in ADMIN_USERNAMES. """
+        user = await self.get_current_user(token, db_session)
+        if user.username not in settings.ADMIN_USERNAMES:
+            raise HTTPException(status_code=403,detail={"code":"FORBIDDEN","message":"Admin access required!"})
+        return user
+
     @staticmethod
     def create_chat_hash(userid) -> str:
         """ Method to create unique user id combination for chat session. """
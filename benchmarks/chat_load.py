@@ -0,0 +1,218 @@
+from benchmarks.fakes import fake_embedding_app,seed_vector_store
+from prometheus_client.parser import text_string_to_metric_families
+from typing import Dict,List,Optional
+import argparse,asyncio,json,multiprocessing,os,socket,tempfile,time
+import httpx,uvicorn
+
+# End to end load test of the chat path, run from the project root:
+#   python -m benchmarks.chat_load --users 16 --turns 5 --model-latency-ms 300 --tool-call-rate 1
+# The real FastAPI app, LegalAgent graph and MCP server run in their own processes against local stand-ins (benchmarks/fakes.py):
+# a scripted chat model, a fake embedding server, the numpy vector backend over a synthetic corpus and mongomock for checkpoints
+# (--mongo-uri uses a real MongoDB instead). Every user signs up, opens a chat and sends its turns back to back, all users at once.
+# Reports throughput, p50/p95/p99 turn latency and per stage means from the /metrics histograms of the app and the MCP server.
+
+def _free_port() -> int:
+    with socket.socket() as s:
+        s.bind(("127.0.0.1", 0))
+        return s.getsockname()[1]
+
+def _serve_embedder(port: int, options: dict):
+    uvicorn.run(fake_embedding_app(options["dim"], options["embed_latency_ms"]), host="127.0.0.1", port=port, log_level="warning")
+
+def _serve_mcp(port: int, options: dict):
+    os.environ.update(VECTOR_BACKEND="numpy", NUMPY_INDEX_DIR=options["index_dir"], SEARCH_CACHE_DIR=os.path.join(options["workdir"], "search_cache"))
+    from McpServer import server
+    server.WEAVIATE_SERVER = options["embedder_url"] #After import, McpServer/.mcp.env overrides the environment.
+    uvicorn.run(server.mcp.http_app(), host="127.0.0.1", port=port, log_level="warning")
+
+def _serve_app(port: int, options: dict):
+    os.environ.update(
+        SQLITE_DB_NAME=os.path.join(options["workdir"], "load.db"),
+        MONGODB_URI=options["mongo_uri"] or "mongodb://localhost:27017/TatvixLoadTest",
+        MCP_SERVER=options["mcp_url"],
+        WEAVIATE_SERVER=options["embedder_url"],
+        VECTOR_BACKEND="numpy",
+        CHECKPOINT_COMPACT_INTERVAL="0",
+    )
+    from benchmarks.fakes import ScriptedChatModel,mongomock_client,use_app_placeholders
+    use_app_placeholders()
+    import app.dbconfig as dbconfig
+    if not options["mongo_uri"]:
+        class _MockPyMongo():
+            pymongo_client = mongomock_client()
+        dbconfig.get_pymongo_client = lambda: _MockPyMongo
+    from app.main import app
+    from app.routes.chat import get_legal_agent
+    from app.agent.graph import LegalAgent
+    from app.agent.utils.prompts import prompt_templates
+    from app.agent.utils.tools import search_chat_documents
+    from fastapi import Request
+
+    model = ScriptedChatModel(
+        system_prompt=prompt_templates.system_template,
+        latency_ms=options["model_latency_ms"],
+        jitter_ms=options["model_jitter_ms"],
+        tool_call_rate=options["tool_call_rate"],
+        tool_rounds=options["tool_rounds"],
+        answer_words=options["answer_words"],
+    )
+
+    async def scripted_agent(request: Request) -> LegalAgent:
+        """ get_legal_agent with the scripted model in place of Gemini, tools still come from the MCP server. """
+        agent = LegalAgent()
+        if LegalAgent._cahced_tools is None:
+            LegalAgent._cahced_tools = await agent._get_mcp_tools()
+        agent.tools = LegalAgent._cahced_tools + [search_chat_documents]
+        agent.model = model.bind_tools(agent.tools)
+        agent.checkpointer = request.app.state.checkpointer
+        return agent
+
+    app.dependency_overrides[get_legal_agent] = scripted_agent
+    uvicorn.run(app, host="127.0.0.1", port=port, log_level="warning")
+
+def _wait_ready(url: str, timeout: float = 60):
+    deadline = time.monotonic() + timeout
+    while time.monotonic() < deadline:
+        try:
+            httpx.get(url, timeout=1)
+            return
+        except httpx.TransportError:
+            time.sleep(0.2)
+    raise RuntimeError(f"{url} did not come up within {timeout}s")
+
+
+def _histograms(text: str, names: List[str]) -> Dict[str, Dict[str, float]]:
+    """ {"name{label=value}": {"sum", "count"}} of the histograms in a /metrics page. """
+    series: Dict[str, Dict[str, float]] = {}
+    for family in text_string_to_metric_families(text):
+        if family.name not in names:
+            continue
+        for sample in family.samples:
+            if not sample.name.endswith(("_sum", "_count")):
+                continue
+            labels = ",".join(f"{key}={value}" for key, value in sorted(sample.labels.items()))
+            key = f"{family.name}{{{labels}}}" if labels else family.name
+            series.setdefault(key, {"sum": 0.0, "count": 0.0})[sample.name.rsplit("_", 1)[1]] = sample.value
+    return series
+
+def _stage_means(before: Dict[str, Dict[str, float]], after: Dict[str, Dict[str, float]]) -> Dict[str, dict]:
+    """ Calls and mean latency per series over the measured window. """
+    stages = {}
+    for key, values in after.items():
+        start = before.get(key, {"sum": 0.0, "count": 0.0})
+        count = values["count"] - start["count"]
+        if count:
+            stages[key] = {"count": int(count), "mean_ms": round((values["sum"] - start["sum"]) / count * 1000, 2)}
+    return stages
+
+def _percentile(values: List[float], q: float) -> Optional[float]:
+    if not values:
+        return None
+    ordered = sorted(values)
+    return round(ordered[min(len(ordered) - 1, int(len(ordered) * q))] * 1000, 2)
+
+APP_HISTOGRAMS = ["tatvix_graph_node_seconds", "tatvix_outbound_seconds", "tatvix_turn_seconds"]
+MCP_HISTOGRAMS = ["tatvix_mcp_tool_seconds", "tatvix_mcp_outbound_seconds"]
+
+async def _drive(app_url: str, mcp_metrics_url: str, users: int, turns: int, warmup_turns: int) -> dict:
+    """ Sign up `users` users, warm up, then run every user's turns concurrently and collect latencies. """
+    async with httpx.AsyncClient(base_url=app_url, timeout=300, limits=httpx.Limits(max_connections=users * 2)) as client:
+        async def _user(i: int) -> dict:
+            credentials = {"username": f"load-user-{i}", "password": "load-test-password"}
+            await client.post("/api/auth/signup", json=credentials)
+            token = (await client.post("/api/auth/login", data=credentials)).json()["access_token"]
+            headers = {"Authorization": f"Bearer {token}"}
+            chat_id = (await client.get("/api/chat", headers=headers)).json()["chat_id"]
+            return {"headers": headers, "chat_id": chat_id}
+
+        sessions = await asyncio.gather(*[_user(i) for i in range(users)])
+        for turn in range(warmup_turns): #Compiles the graph paths and loads the MCP tools before measuring.
+            await client.post(f"/api/chat/{sessions[0]['chat_id']}", json={"user_query": f"warm up question {turn}"}, headers=sessions[0]["headers"])
+
+        latencies: List[float] = []
+        errors: Dict[str, int] = {}
+
+        async def _turns(i: int, session: dict):
+            for turn in range(turns):
+                started = time.perf_counter()
+                try:
+                    response = await client.post(f"/api/chat/{session['chat_id']}", json={"user_query": f"user {i} question {turn} on bail under section 438"}, headers=session["headers"])
+                    if response.status_code == 200:
+                        latencies.append(time.perf_counter() - started)
+                    else:
+                        errors[str(response.status_code)] = errors.get(str(response.status_code), 0) + 1
+                except httpx.HTTPError as e:
+                    errors[type(e).__name__] = errors.get(type(e).__name__, 0) + 1
+
+        app_before = _histograms((await client.get("/metrics")).text, APP_HISTOGRAMS)
+        mcp_before = _histograms(httpx.get(mcp_metrics_url).text, MCP_HISTOGRAMS)
+        started = time.perf_counter()
+        await asyncio.gather(*[_turns(i, session) for i, session in enumerate(sessions)])
+        elapsed = time.perf_counter() - started
+        app_after = _histograms((await client.get("/metrics")).text, APP_HISTOGRAMS)
+        mcp_after = _histograms(httpx.get(mcp_metrics_url).text, MCP_HISTOGRAMS)
+
+    return {
+        "turns": len(latencies),
+        "errors": errors,
+        "seconds": round(elapsed, 2),
+        "turns_per_s": round(len(latencies) / elapsed, 2) if elapsed else 0.0,
+        "latency_ms": {"p50": _percentile(latencies, 0.50), "p95": _percentile(latencies, 0.95), "p99": _percentile(latencies, 0.99), "max": _percentile(latencies, 1.0)},
+        "stages": {**_stage_means(app_before, app_after), **_stage_means(mcp_before, mcp_after)},
+    }
+
+def main():
+    parser = argparse.ArgumentParser(description="Load test the chat path end to end against local stand-ins.")
+    parser.add_argument("--users", type=int, default=8, help="Concurrent users, each with its own chat.")
+    parser.add_argument("--turns", type=int, default=5, help="Turns per user, more than 3 exercises the summary node.")
+    parser.add_argument("--warmup-turns", type=int, default=2)
+    parser.add_argument("--model-latency-ms", type=float, default=300)
+    parser.add_argument("--model-jitter-ms", type=float, default=50)
+    parser.add_argument("--tool-call-rate", type=float, default=1.0, help="Fraction of turns that search before answering.")
+    parser.add_argument("--tool-rounds", type=int, default=1)
+    parser.add_argument("--answer-words", type=int, default=150)
+    parser.add_argument("--embed-latency-ms", type=float, default=20)
+    parser.add_argument("--corpus-pages", type=int, default=2000)
+    parser.add_argument("--dim", type=int, default=768)
+    parser.add_argument("--mongo-uri", default=None, help="Checkpoint to this MongoDB instead of mongomock.")
+    parser.add_argument("--output", help="Also write the report to this JSON file.")
+    args = parser.parse_args()
+
+    workdir = tempfile.mkdtemp(prefix="tatvix-load-")
+    ports = {name: _free_port() for name in ("embedder", "mcp", "app")}
+    options = {
+        **vars(args),
+        "workdir": workdir,
+        "index_dir": os.path.join(workdir, "vector_index"),
+        "embedder_url": f"http://127.0.0.1:{ports['embedder']}/vectors",
+        "mcp_url": f"http://127.0.0.1:{ports['mcp']}/mcp",
+    }
+    seed_vector_store(options["index_dir"], args.corpus_pages, dim=args.dim)
+    os.environ.setdefault("LOG_LEVEL", "WARNING") #Servers log to stderr, keep the report readable.
+
+    context = multiprocessing.get_context("spawn") #Each server imports its own settings and singletons.
+    servers = [
+        context.Process(target=_serve_embedder, args=(ports["embedder"], options)),
+        context.Process(target=_serve_mcp, args=(ports["mcp"], options)),
+        context.Process(target=_serve_app, args=(ports["app"], options)),
+    ]
+    try:
+        for process in servers:
+            process.start()
+        _wait_ready(f"http://127.0.0.1:{ports['embedder']}/.well-known/ready")
+        _wait_ready(f"http://127.0.0.1:{ports['mcp']}/metrics")
+        _wait_ready(f"http://127.0.0.1:{ports['app']}/metrics")
+        result = asyncio.run(_drive(f"http://127.0.0.1:{ports['app']}", f"http://127.0.0.1:{ports['mcp']}/metrics", args.users, args.turns, args.warmup_turns))
+    finally:
+        for process in servers:
+            process.terminate()
+            process.join()
+
+    report = {"config": {key: value for key, value in vars(args).items() if key != "output"}, **result}
+    print(json.dumps(report, indent=2))
+    if args.output:
+        with open(args.output, "w", encoding="utf-8") as f:
+            json.dump(report, f, indent=2)
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,169 @@
+from langchain_core.language_models.chat_models import BaseChatModel
+from langchain_core.messages import AIMessage,BaseMessage,HumanMessage,SystemMessage,ToolMessage
+from langchain_core.messages.utils import count_tokens_approximately
+from langchain_core.outputs import ChatGeneration,ChatResult
+from starlette.applications import Starlette
+from starlette.requests import Request
+from starlette.responses import JSONResponse
+from starlette.routing import Route
+from vector_store.numpy_store import NumpyVectorStore
+from typing import Any,List,Optional
+import asyncio,os,random,time,zlib
+import numpy as np
+
+# Local stand-ins for the external services of the chat path, used by benchmarks.chat_load so load tests need no Gemini quota,
+# embedding model, weaviate or MongoDB server. Their latency is configurable so the harness measures our own overhead around them.
+
+WORDS = (
+    "court held appeal petition section act judgment order bail accused respondent appellant contract breach damages evidence "
+    "witness statute constitution article writ jurisdiction tribunal notification clause liability negligence compensation "
+    "limitation suit decree injunction arbitration award tax assessment property lease tenant landlord employer workman"
+).split()
+
+# Required app settings the benchmarks never use, applied with setdefault so explicit values still win. Environment variables take
+# precedence over .env in app.settings, so these also replace a developer's .env values for the benchmark process.
+APP_SETTINGS_PLACEHOLDERS = {
+    "SQLITE_DB_NAME": "benchmark.db",
+    "JWT_SECRET_KEY": "load-test",
+    "ENC_ALGORITHM": "HS256",
+    "ACCESS_TOKEN_EXPIRE_MINUTES": "600",
+    "ALLOWED_ORIGIN": "http://localhost",
+    "MONGODB_URI": "mongodb://localhost:27017/TatvixBenchmark",
+    "WEAVIATE_SERVER": "http://localhost:8081/vectors",
+    "GOOGLE_API_KEY": "load-test",
+    "MCP_SERVER": "http://localhost:5050/mcp",
+}
+
+def use_app_placeholders():
+    """ Set the placeholder app settings that are not set yet, call before importing app modules. """
+    for key, value in APP_SETTINGS_PLACEHOLDERS.items():
+        os.environ.setdefault(key, value)
+
+def synthetic_text(rng: random.Random, words: int) -> str:
+    """ Legal sounding filler text, enough vocabulary for snippet extraction and token counting to do real work. """
+    sentences = []
+    while words > 0:
+        length = min(words, rng.randint(8, 24))
+        sentences.append(" ".join(rng.choice(WORDS) for _ in range(length)).capitalize() + ".")
+        words -= length
+    return " ".join(sentences)
+
+
+class ScriptedChatModel(BaseChatModel):
+    """
+    Chat model standing in for Gemini with a fixed latency per call.
+        tool_call_rate -> fraction of turns that call tool_name before answering, decided per query so reruns behave the same.
+        tool_rounds -> tool calls made by a turn that calls tools, one per model call.
+        answer_words -> length of the final answer, headers and summaries are short.
+    Calls are recognised like the graph makes them: chat_node calls carry the system prompt, header and summary calls do not.
+    """
+    system_prompt: str
+    latency_ms: float = 200.0
+    jitter_ms: float = 0.0
+    tool_call_rate: float = 1.0
+    tool_rounds: int = 1
+    tool_name: str = "document_search"
+    answer_words: int = 150
+    seed: int = 0
+
+    @property
+    def _llm_type(self) -> str:
+        return "scripted"
+
+    def bind_tools(self, tools: Any, **kwargs: Any) -> "ScriptedChatModel":
+        return self
+
+    def _decide(self, messages: List[BaseMessage]) -> Optional[str]:
+        """ Query to search for when this call should make a tool call, None to answer. """
+        if not any(isinstance(m, SystemMessage) and m.content == self.system_prompt for m in messages):
+            return None
+        turn: List[BaseMessage] = []
+        for message in reversed(messages):
+            if isinstance(message, HumanMessage):
+                break
+            turn.append(message)
+        query = message.text if isinstance(message, HumanMessage) else ""
+        rounds = sum(isinstance(m, ToolMessage) for m in turn)
+        if rounds >= self.tool_rounds:
+            return None
+        if random.Random(zlib.crc32(f"{self.seed}:{query}".encode())).random() >= self.tool_call_rate:
+            return None
+        return query if rounds == 0 else f"{query} {rounds}"
+
+    def _generate(self, messages: List[BaseMessage], stop: Optional[List[str]] = None, run_manager: Any = None, **kwargs: Any) -> ChatResult:
+        time.sleep(max(0.0, self.latency_ms + random.uniform(-self.jitter_ms, self.jitter_ms)) / 1000)
+        query = self._decide(messages)
+        rng = random.Random(zlib.crc32(str(len(messages)).encode()))
+        if query is not None:
+            content = ""
+            tool_calls = [{"name": self.tool_name, "args": {"query": query}, "id": f"call_{rng.getrandbits(32):08x}"}]
+        else:
+            is_chat = any(isinstance(m, SystemMessage) and m.content == self.system_prompt for m in messages)
+            content = synthetic_text(rng, self.answer_words if is_chat else 12)
+            tool_calls = []
+        usage = {"input_tokens": count_tokens_approximately(messages), "output_tokens": len(content.split()) + 10 * len(tool_calls)}
+        usage["total_tokens"] = usage["input_tokens"] + usage["output_tokens"]
+        message = AIMessage(content=content, tool_calls=tool_calls, usage_metadata=usage)
+        return ChatResult(generations=[ChatGeneration(message=message)])
+
+
+def fake_vector(text: str, dim: int) -> np.ndarray:
+    """ Deterministic unit vector per text. """
+    vector = np.random.default_rng(zlib.crc32(text.encode())).standard_normal(dim).astype(np.float32)
+    return vector / np.linalg.norm(vector)
+
+def fake_embedding_app(dim: int = 768, latency_ms: float = 20.0, per_text_ms: float = 2.0) -> Starlette:
+    """ Embedding server with the /vectors contract of Gemma_Inference_API, latency grows with the batch like the real model. """
+    async def vectors(request: Request) -> JSONResponse:
+        texts = (await request.json()).get("text", [])
+        if not texts or not isinstance(texts, list):
+            return JSONResponse({"error": "Invalid or missing 'text' key"}, status_code=400)
+        await asyncio.sleep((latency_ms + per_text_ms * len(texts)) / 1000)
+        return JSONResponse({"vectors": [fake_vector(text, dim).tolist() for text in texts]})
+
+    async def ready(request: Request) -> JSONResponse:
+        return JSONResponse({"status": "ready"})
+
+    return Starlette(routes=[Route("/vectors", vectors, methods=["POST"]), Route("/.well-known/ready", ready, methods=["GET"])])
+
+
+def seed_vector_store(directory: str, pages: int, dim: int = 768, words: int = 400, seed: int = 0) -> NumpyVectorStore:
+    """ Synthetic corpus of pages with metadata for the numpy vector backend. """
+    rng = random.Random(seed)
+    courts = ["supreme court of india", "delhi high court", "bombay high court", "district court"]
+    objects = []
+    for i in range(pages):
+        objects.append({
+            "text": synthetic_text(rng, words),
+            "doc_name": f"document_{i // 20}.pdf_{i % 20}",
+            "image_id": f"{i:024x}",
+            "source_name": f"document_{i // 20}.pdf",
+            "court": courts[i % len(courts)],
+            "year": 1990 + i % 35,
+            "document_type": "judgment" if i % 3 else "order",
+        })
+    store = NumpyVectorStore(directory)
+    store.add(objects, np.stack([fake_vector(o["text"], dim) for o in objects]))
+    return store
+
+
+def mongomock_client():
+    """ In-memory MongoClient for the LangGraph checkpointer, mongomock lacks a few pymongo 4 calls the saver makes. """
+    import mongomock
+    import mongomock.collection as collection
+
+    class _Cursor(list):
+        def to_list(self):
+            return list(self)
+
+    if not getattr(collection.Collection, "_checkpointer_compatible", False):
+        list_indexes = collection.Collection.list_indexes
+        create_index = collection.Collection.create_index
+        collection.Collection.list_indexes = lambda self, *args, **kwargs: _Cursor(list_indexes(self, *args, **kwargs))
+        collection.Collection.create_index = lambda self, keys=None, *args, **kwargs: create_index(self, keys, *args, **kwargs)
+        def bulk_write(self, requests, *args, **kwargs): #Only the UpdateOne upserts the saver issues.
+            for request in requests:
+                self.update_one(request._filter, request._doc, upsert=request._upsert)
+        collection.Collection.bulk_write = bulk_write
+        collection.Collection._checkpointer_compatible = True
+    return mongomock.MongoClient()
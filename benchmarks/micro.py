@@ -0,0 +1,243 @@
+from benchmarks.fakes import synthetic_text,use_app_placeholders
+from statistics import mean,median
+from typing import Callable,Dict,List,NamedTuple,Optional
+import argparse,json,os,platform,random,shutil,subprocess,sys,time
+
+# Micro benchmarks of the ingestion and context management hot paths, run from the project root:
+#   python -m benchmarks.micro --output results.json                       # measure
+#   python -m benchmarks.micro --baseline baseline.json --threshold 0.2     # measure and compare, exits 1 on a regression or a failed case
+#   python -m benchmarks.micro --only text. agent. --repeat 10              # cases whose name starts with a prefix
+# MongoDB is replaced by mongomock (GridFS included) and sample PDFs are generated, so runs are reproducible on any machine.
+# Compare against a baseline taken on the same machine, the median time per item of each case is checked against baseline * (1 + threshold).
+
+class Skip(Exception):
+    """ Raised by a case whose requirements (e.g. tesseract) are missing here. """
+
+class Bench(NamedTuple):
+    run: Callable[[], object] #Measured.
+    items: int #Pages, texts or messages handled by one run, for the throughput.
+    before: Optional[Callable[[], None]] = None #Unmeasured reset before every run.
+
+
+def _connect_mongomock():
+    import mongoengine as me
+    import mongomock
+    import mongomock.gridfs
+    mongomock.gridfs.enable_gridfs_integration()
+    me.disconnect()
+    me.connect("benchmark", host="mongodb://localhost", mongo_client_class=mongomock.MongoClient)
+
+def _drop_ingested():
+    from setupAPI.models import PDFImage,ExtractedText
+    for document in (PDFImage, ExtractedText):
+        document.drop_collection()
+    db = PDFImage._get_db()
+    for name in ("fs.files", "fs.chunks"):
+        db.drop_collection(name)
+
+def sample_pdfs(seed: int = 0) -> Dict[str, bytes]:
+    """ Sample documents covering the page kinds ingestion sees: plain text, two columns and scans (image only pages). """
+    import fitz
+    rng = random.Random(seed)
+    text = fitz.open()
+    for _ in range(8):
+        page = text.new_page()
+        page.insert_textbox(fitz.Rect(72, 72, 523, 770), synthetic_text(rng, 450), fontsize=10)
+    columns = fitz.open()
+    for _ in range(4):
+        page = columns.new_page()
+        page.insert_textbox(fitz.Rect(50, 72, 290, 770), synthetic_text(rng, 300), fontsize=9)
+        page.insert_textbox(fitz.Rect(305, 72, 545, 770), synthetic_text(rng, 300), fontsize=9)
+    scanned = fitz.open()
+    for page in text.pages(0, 4):
+        pixmap = page.get_pixmap(dpi=150, colorspace=fitz.csGRAY)
+        scan = scanned.new_page(width=page.rect.width, height=page.rect.height)
+        scan.insert_image(scan.rect, pixmap=pixmap)
+    return {"text.pdf": text.tobytes(), "two_columns.pdf": columns.tobytes(), "scanned.pdf": scanned.tobytes()}
+
+def bench_pdf_to_mongodb() -> Bench:
+    import pytesseract
+    if shutil.which(pytesseract.pytesseract.tesseract_cmd) is None:
+        raise Skip("tesseract is not installed")
+    _connect_mongomock()
+    from setupAPI.utils import Utils
+    utils = Utils()
+    pdfs = sample_pdfs()
+    pages = sum(__import__("fitz").open(stream=data, filetype="pdf").page_count for data in pdfs.values())
+    def run():
+        for filename, data in pdfs.items():
+            utils.pdf_to_mongodb(data, filename, metadata={"court": "supreme court of india", "year": 2020, "document_type": "judgment"})
+    return Bench(run, pages, before=_drop_ingested) #Stored pages would be skipped as duplicates on the next run.
+
+def _ocr_texts(count: int, seed: int = 0) -> List[str]:
+    """ OCR like page texts, some tagged, some noise. """
+    rng = random.Random(seed)
+    texts = []
+    for i in range(count):
+        if i % 10 == 0:
+            texts.append("[DATE] [/DATE] " * rng.randint(2, 6))
+        elif i % 10 == 1:
+            texts.append("ORDER SHEET / IN THE COURT")
+        else:
+            body = synthetic_text(rng, 250)
+            texts.append(f"[DATE]12.03.2019[/DATE] {body} [LAW]Section 438 CrPC[/LAW] {body[:200]}")
+    return texts
+
+def bench_is_noisy() -> Bench:
+    from setupAPI.utils import Utils
+    texts = _ocr_texts(20000)
+    return Bench(lambda: [Utils._is_noisy(text) for text in texts], len(texts))
+
+def bench_clean_tags() -> Bench:
+    from setupAPI.utils import Utils
+    texts = _ocr_texts(20000)
+    return Bench(lambda: [Utils._clean_tags(text) for text in texts], len(texts))
+
+def bench_get_data() -> Bench:
+    _connect_mongomock()
+    from setupAPI.models import PDFImage,ExtractedText
+    from setupAPI.utils import Utils
+    from bson import ObjectId
+    from datetime import datetime
+    import uuid
+    _drop_ingested()
+    pages = 500 #mongomock looks up every referenced image linearly, keep the run short.
+    images = [{"_id": ObjectId(), "filename": f"document_{i // 20}.pdf_{i % 20}", "image_id": str(uuid.uuid4()), "source_name": f"document_{i // 20}.pdf",
+               "court": "delhi high court", "year": 2000 + i % 25, "document_type": "judgment"} for i in range(pages)]
+    PDFImage._get_collection().insert_many(images) #Raw inserts, the GridFS files are not read by get_data.
+    now = datetime.utcnow()
+    ExtractedText._get_collection().insert_many([{"image": image["_id"], "text": text, "time_stamp": now} for image, text in zip(images, _ocr_texts(pages))])
+    utils = Utils()
+    return Bench(utils.get_data, pages)
+
+def _long_thread(turns: int, seed: int = 0) -> list:
+    """ A conversation where every turn searched (human, ai tool call, tool result, ai answer), ending on the tool result of the last turn like the graph state the trim nodes see. """
+    from langchain_core.messages import HumanMessage,AIMessage,ToolMessage
+    rng = random.Random(seed)
+    messages = []
+    for turn in range(turns):
+        call_id = f"call_{turn}"
+        results = {"text": [synthetic_text(rng, 300) for _ in range(5)], "doc_name": [f"document_{rng.randint(0, 99)}.pdf_0" for _ in range(5)]}
+        messages += [
+            HumanMessage(content=synthetic_text(rng, 30), id=f"h{turn}"),
+            AIMessage(content="", tool_calls=[{"name": "document_search", "args": {"query": synthetic_text(rng, 10)}, "id": call_id}], id=f"c{turn}"),
+            ToolMessage(content=json.dumps(results), tool_call_id=call_id, id=f"t{turn}"),
+            AIMessage(content=synthetic_text(rng, 180), id=f"a{turn}"),
+        ]
+    return messages[:-1]
+
+TRIM_LOOPS = 50 #A single trim takes about a millisecond, too short to time reliably.
+
+def bench_trim_input_context() -> Bench:
+    use_app_placeholders() #app.settings requires them at import, the trim nodes use none.
+    from app.agent.graph import LegalAgent
+    agent = LegalAgent()
+    state = {"messages": _long_thread(100)}
+    return Bench(lambda: [agent._trim_input_context(state) for _ in range(TRIM_LOOPS)], TRIM_LOOPS * len(state["messages"]))
+
+def bench_trim_tool_output() -> Bench:
+    use_app_placeholders() #app.settings requires them at import, the trim nodes use none.
+    from app.agent.graph import LegalAgent
+    agent = LegalAgent()
+    state = {"messages": _long_thread(100)}
+    return Bench(lambda: [agent._trim_tool_output(state) for _ in range(TRIM_LOOPS)], TRIM_LOOPS * len(state["messages"]))
+
+def bench_vectors_serialisation() -> Bench:
+    from Gemma_Inference_API.payload import vectors_payload
+    from flask import Flask
+    import numpy as np
+    dumps = Flask("benchmark").json.dumps #The provider jsonify uses.
+    batches = [list(np.random.default_rng(i).standard_normal((32, 768)).astype(np.float32)) for i in range(8)]
+    return Bench(lambda: [dumps(vectors_payload(batch)) for batch in batches], sum(len(batch) for batch in batches))
+
+CASES: Dict[str, Callable[[], Bench]] = {
+    "ingest.pdf_to_mongodb": bench_pdf_to_mongodb,
+    "ingest.get_data": bench_get_data,
+    "text.is_noisy": bench_is_noisy,
+    "text.clean_tags": bench_clean_tags,
+    "agent.trim_input_context": bench_trim_input_context,
+    "agent.trim_tool_output": bench_trim_tool_output,
+    "embedder.vectors_serialisation": bench_vectors_serialisation,
+}
+
+
+def measure(bench: Bench, repeat: int) -> dict:
+    """ One warm up run, then `repeat` timed runs. """
+    timings = []
+    for attempt in range(repeat + 1):
+        if bench.before is not None:
+            bench.before()
+        started = time.perf_counter()
+        bench.run()
+        if attempt:
+            timings.append(time.perf_counter() - started)
+    return {
+        "median_ms": round(median(timings) * 1000, 3),
+        "min_ms": round(min(timings) * 1000, 3),
+        "mean_ms": round(mean(timings) * 1000, 3),
+        "items": bench.items,
+        "items_per_s": round(bench.items / median(timings), 1),
+        "repeat": repeat,
+    }
+
+def compare(results: Dict[str, dict], baseline: Dict[str, dict], threshold: float) -> Dict[str, dict]:
+    """ Change of each case's median per item against the baseline, a regression is slower than baseline * (1 + threshold). """
+    comparison = {}
+    for name, result in results.items():
+        before = baseline.get(name, {})
+        if "median_ms" not in result or "median_ms" not in before:
+            continue
+        change = (result["median_ms"] / result["items"]) / (before["median_ms"] / before["items"]) - 1 #Per item, cases may change size between runs.
+        comparison[name] = {
+            "baseline_ms": before["median_ms"],
+            "median_ms": result["median_ms"],
+            "change_pct": round(change * 100, 1),
+            "regression": change > threshold,
+        }
+    return comparison
+
+def _environment() -> dict:
+    try:
+        commit = subprocess.run(["git", "rev-parse", "--short", "HEAD"], capture_output=True, text=True, check=True).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        commit = None
+    return {"python": platform.python_version(), "platform": platform.platform(), "cpus": os.cpu_count(), "commit": commit, "created_at": time.time()}
+
+def main():
+    parser = argparse.ArgumentParser(description="Micro benchmarks of ingestion and context management hot paths.")
+    parser.add_argument("--only", nargs="+", default=None, help="Run the cases whose name starts with one of these prefixes.")
+    parser.add_argument("--repeat", type=int, default=5)
+    parser.add_argument("--output", help="Write the results to this JSON file, usable as a later --baseline.")
+    parser.add_argument("--baseline", help="Results JSON of an earlier run on the same machine to compare against.")
+    parser.add_argument("--threshold", type=float, default=0.2, help="Allowed slowdown of a case's median, 0.2 = 20%%.")
+    args = parser.parse_args()
+    os.environ.setdefault("LOG_LEVEL", "WARNING")
+
+    results = {}
+    for name, case in CASES.items():
+        if args.only and not name.startswith(tuple(args.only)):
+            continue
+        try:
+            results[name] = measure(case(), args.repeat)
+        except Skip as e:
+            results[name] = {"skipped": str(e)}
+        except Exception as e: #Keep the cases measured so far and the ones after.
+            results[name] = {"error": f"{type(e).__name__}: {e}"}
+        print(f"{name}: {results[name]}", file=sys.stderr)
+
+    report = {"environment": _environment(), "results": results}
+    if args.baseline:
+        with open(args.baseline, encoding="utf-8") as f:
+            baseline = json.load(f)
+        report["threshold"] = args.threshold
+        report["comparison"] = compare(results, baseline["results"], args.threshold)
+    print(json.dumps(report, indent=2))
+    if args.output:
+        with open(args.output, "w", encoding="utf-8") as f:
+            json.dump(report, f, indent=2)
+    failed = any("error" in result for result in results.values())
+    if failed or any(entry["regression"] for entry in report.get("comparison", {}).values()):
+        sys.exit(1)
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,78 @@
+from app.utils.hashing import HashingPool,build_password_hash
+from statistics import median
+import argparse,asyncio,itertools,json,time
+
+# Benchmark of Argon2 parameters for login/signup, run from the project root:
+#   python -m benchmarks.password_hashing --time-cost 2 3 --memory-cost 19456 65536 --parallelism 1 4 --workers 2 --concurrency 16
+# Reports single hash/verify latency per parameter set and login throughput through the HashingPool under concurrency.
+
+def _single_latency(params, repeats: int) -> dict:
+    """ Median latency of hash and verify in this process. """
+    hasher = build_password_hash(params)
+    hashed = hasher.hash("benchmark-password")
+    hash_times, verify_times = [], []
+    for _ in range(repeats):
+        start = time.perf_counter()
+        hasher.hash("benchmark-password")
+        hash_times.append(time.perf_counter() - start)
+        start = time.perf_counter()
+        hasher.verify("benchmark-password", hashed)
+        verify_times.append(time.perf_counter() - start)
+    return {"hash_ms_p50": median(hash_times) * 1000, "verify_ms_p50": median(verify_times) * 1000}
+
+async def _pool_throughput(params, workers: int, queue_limit: int, concurrency: int, requests: int) -> dict:
+    """ Verify throughput and latency through the process pool with `concurrency` logins in flight. """
+    pool = HashingPool(workers=workers, queue_limit=queue_limit, params=params)
+    pool.start()
+    hashed = build_password_hash(params).hash("benchmark-password")
+    latencies, rejected = [], 0
+    semaphore = asyncio.Semaphore(concurrency)
+
+    async def _login():
+        nonlocal rejected
+        async with semaphore:
+            start = time.perf_counter()
+            try:
+                await pool.verify("benchmark-password", hashed)
+                latencies.append(time.perf_counter() - start)
+            except Exception:
+                rejected += 1
+
+    try:
+        await pool.verify("benchmark-password", hashed) #Warm up the worker processes.
+        start = time.perf_counter()
+        await asyncio.gather(*[_login() for _ in range(requests)])
+        elapsed = time.perf_counter() - start
+    finally:
+        await pool.shutdown()
+
+    latencies.sort()
+    return {
+        "logins_per_s": len(latencies) / elapsed,
+        "login_ms_p50": latencies[len(latencies) // 2] * 1000 if latencies else None,
+        "login_ms_p95": latencies[int(len(latencies) * 0.95) - 1] * 1000 if latencies else None,
+        "rejected_503": rejected,
+    }
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark Argon2 parameters and the hashing process pool.")
+    parser.add_argument("--time-cost", type=int, nargs="+", default=[3])
+    parser.add_argument("--memory-cost", type=int, nargs="+", default=[65536], help="KiB")
+    parser.add_argument("--parallelism", type=int, nargs="+", default=[4])
+    parser.add_argument("--workers", type=int, default=2)
+    parser.add_argument("--queue-limit", type=int, default=32)
+    parser.add_argument("--concurrency", type=int, default=16)
+    parser.add_argument("--requests", type=int, default=64)
+    parser.add_argument("--repeats", type=int, default=5)
+    args = parser.parse_args()
+
+    results = []
+    for params in itertools.product(args.time_cost, args.memory_cost, args.parallelism):
+        result = {"time_cost": params[0], "memory_cost": params[1], "parallelism": params[2]}
+        result.update(_single_latency(params, args.repeats))
+        result.update(asyncio.run(_pool_throughput(params, args.workers, args.queue_limit, args.concurrency, args.requests)))
+        results.append(result)
+        print(json.dumps(result))
+
+if __name__ == "__main__":
+    main()
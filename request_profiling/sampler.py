@@ -0,0 +1,162 @@
+from collections import Counter,OrderedDict
+from contextlib import contextmanager
+from typing import Dict,List,Optional
+import json,os,re,sys,threading,time
+
+# On-demand sampling profiler for single requests, shared by the main API and the MCP server (the embedding server has its own copy).
+# Nothing runs unless a request asks to be profiled: a sampler thread then records the Python stacks of every thread of the process
+# until the request finishes. Stacks are kept in the folded format ("frame;frame;frame count" per line) that flamegraph.pl,
+# speedscope and inferno read, along with the spans (graph nodes, model and tool calls) the request recorded.
+# Threads of the process serve other requests too, profile on a quiet worker when exact attribution matters.
+
+# Leaf frames of threads waiting for work, they would otherwise dominate every profile.
+IDLE_FRAMES = {
+    "threading.py:Condition.wait", "threading.py:Event.wait", "threading.py:Thread._wait_for_tstate_lock",
+    "queue.py:Queue.get", "selectors.py:EpollSelector.select", "selectors.py:KqueueSelector.select",
+    "selectors.py:_PollLikeSelector.select", "selectors.py:SelectSelector.select", "socket.py:socket.accept",
+    "thread.py:_worker", #Pool workers blocked on their work queue.
+    "periodic_executor.py:PeriodicExecutor._run", "core.py:_connection_worker_thread", #pymongo monitors and aiosqlite connections.
+}
+
+class SamplingProfiler():
+    """
+    Samples the stacks of every thread of the process while started.
+        interval -> seconds between samples, sampling costs roughly 50-100 µs per live thread.
+        spans -> filled by the caller with {"kind", "name", "start" (perf_counter), "seconds"}, reported relative to the profile start.
+    """
+    def __init__(self, interval: float = 0.005, max_depth: int = 128):
+        self.interval = interval
+        self.max_depth = max_depth
+        self.stacks: Counter = Counter()
+        self.samples = 0
+        self.spans: List[dict] = []
+        self.started = 0.0
+        self.elapsed = 0.0
+        self._stop = threading.Event()
+        self._thread: Optional[threading.Thread] = None
+
+    @staticmethod
+    def _frame_name(frame) -> str:
+        code = frame.f_code
+        return f"{os.path.basename(code.co_filename)}:{code.co_qualname}"
+
+    def _sample(self):
+        own = threading.get_ident()
+        names = {thread.ident: re.sub(r"_\d+$", "", thread.name) for thread in threading.enumerate()} #Pool workers fold into one root.
+        for ident, frame in sys._current_frames().items():
+            if ident == own:
+                continue
+            if self._frame_name(frame) in IDLE_FRAMES:
+                continue
+            stack = []
+            while frame is not None and len(stack) < self.max_depth:
+                stack.append(self._frame_name(frame))
+                frame = frame.f_back
+            stack.append(names.get(ident, "thread"))
+            self.stacks[";".join(reversed(stack))] += 1
+        self.samples += 1
+
+    def _run(self):
+        while not self._stop.wait(self.interval):
+            self._sample()
+
+    def start(self):
+        self.started = time.perf_counter()
+        self._thread = threading.Thread(target=self._run, name="request-profiler", daemon=True)
+        self._thread.start()
+
+    def stop(self):
+        self._stop.set()
+        if self._thread is not None:
+            self._thread.join()
+        self.elapsed = time.perf_counter() - self.started
+
+    def folded(self) -> str:
+        """ Stacks in the folded format, one "root;...;leaf count" line per distinct stack. """
+        return "\n".join(f"{stack} {count}" for stack, count in self.stacks.most_common())
+
+    def result(self, profile_id: str, **info) -> dict:
+        spans = [
+            {
+                **{key: value for key, value in span.items() if key not in ("start", "seconds")},
+                "start_ms": round((span["start"] - self.started) * 1000, 2),
+                "ms": round(span["seconds"] * 1000, 2),
+            }
+            for span in self.spans
+        ]
+        return {
+            "id": profile_id,
+            "created_at": time.time(),
+            "seconds": round(self.elapsed, 4),
+            "interval_ms": self.interval * 1000,
+            "samples": self.samples,
+            "spans": sorted(spans, key=lambda span: span["start_ms"]),
+            "folded": self.folded(),
+            **info,
+        }
+
+
+class ProfileStore():
+    """
+    Most recent profiles by id (the request id), kept in memory or, with a directory, as <id>.json files so every worker can serve them.
+        max_profiles -> profiles kept, older ones are dropped first.
+    """
+    def __init__(self, max_profiles: int = 20, directory: Optional[str] = None):
+        self.max_profiles = max_profiles
+        self.directory = directory
+        self._profiles: "OrderedDict[str, dict]" = OrderedDict()
+        self._lock = threading.Lock()
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+
+    def _path(self, profile_id: str) -> str:
+        return os.path.join(self.directory, f"{re.sub(r'[^A-Za-z0-9_.-]', '_', profile_id)}.json")
+
+    def save(self, profile: dict):
+        if self.directory:
+            with open(self._path(profile["id"]), "w", encoding="utf-8") as f:
+                json.dump(profile, f)
+            files = sorted((entry for entry in os.scandir(self.directory) if entry.name.endswith(".json")), key=lambda entry: entry.stat().st_mtime)
+            for entry in files[:-self.max_profiles]:
+                os.remove(entry.path)
+            return
+        with self._lock:
+            self._profiles[profile["id"]] = profile
+            while len(self._profiles) > self.max_profiles:
+                self._profiles.popitem(last=False)
+
+    def get(self, profile_id: str) -> Optional[dict]:
+        if self.directory:
+            try:
+                with open(self._path(profile_id), encoding="utf-8") as f:
+                    return json.load(f)
+            except FileNotFoundError:
+                return None
+        with self._lock:
+            return self._profiles.get(profile_id)
+
+    def list(self) -> List[Dict[str, object]]:
+        """ Summaries of the stored profiles, newest first. """
+        if self.directory:
+            profiles = []
+            for entry in os.scandir(self.directory):
+                if entry.name.endswith(".json"):
+                    with open(entry.path, encoding="utf-8") as f:
+                        profiles.append(json.load(f))
+        else:
+            with self._lock:
+                profiles = list(self._profiles.values())
+        summaries = [{key: value for key, value in profile.items() if key not in ("folded", "spans")} for profile in profiles]
+        return sorted(summaries, key=lambda profile: profile["created_at"], reverse=True)
+
+
+@contextmanager
+def profile_request(store: ProfileStore, profile_id: str, interval: float, **info):
+    """ Profile the enclosed block and save the result under profile_id, also when the block raises. """
+    profiler = SamplingProfiler(interval=interval)
+    profiler.start()
+    try:
+        yield profiler
+    finally:
+        profiler.stop()
+        store.save(profiler.result(profile_id, **info))
@@ -3,15 +3,46 @@ import os
 from dotenv import load_dotenv
 import weaviate
 from weaviate import WeaviateClient
-import time
+import weaviate.classes.config as wc
+from pydantic import BaseModel,model_validator
+from typing import Literal,Optional
+import logging,time
 
 load_dotenv()
 os.environ.pop('SSL_CERT_FILE', None) #For overriding TLS check for weaviate client for local development.
+logger = logging.getLogger(__name__)
+
+class VectorBackendSettings(BaseModel):
+    """
+    Vector store used by ingestion and document search.
+        backend -> "weaviate" (default) or "numpy", an in-process index persisted as .npy files in numpy_dir, no extra service needed.
+        numpy_index_type -> "exact" brute force or "ivf" inverted lists (numpy_ivf_lists lists, numpy_ivf_probe probed per query).
+    """
+    backend: Literal["weaviate","numpy"] = "weaviate"
+    numpy_dir: str = "vector_index"
+    numpy_index_type: Literal["exact","ivf"] = "exact"
+    numpy_ivf_lists: Optional[int] = None
+    numpy_ivf_probe: int = 8
+
+    @classmethod
+    def from_env(cls) -> "VectorBackendSettings":
+        """ Method to read the vector backend from the environment. """
+        lists = os.getenv("NUMPY_IVF_LISTS")
+        return cls(
+            backend=os.getenv("VECTOR_BACKEND","weaviate").lower(),
+            numpy_dir=os.getenv("NUMPY_INDEX_DIR","vector_index"),
+            numpy_index_type=os.getenv("NUMPY_INDEX_TYPE","exact").lower(),
+            numpy_ivf_lists=int(lists) if lists else None,
+            numpy_ivf_probe=int(os.getenv("NUMPY_IVF_PROBE",8)),
+        )
+
 
 class Config():
     def __init__(self):
-        me.connect(host=os.getenv("MONGODB_URI"))
-        self.weaviate_client = self._get_weaviate_client()
+        me.connect(db=os.getenv("MONGODB_DB","test"),host=os.getenv("MONGODB_URI"))
+        self.vector_backend = VectorBackendSettings.from_env()
+        # The numpy backend runs in-process, skip connecting (and retrying) to a weaviate server that is not used.
+        self.weaviate_client = self._get_weaviate_client() if self.vector_backend.backend == "weaviate" else None
 
 
     def _get_weaviate_client(self) -> WeaviateClient:
@@ -19,18 +50,159 @@ class Config():
         for attempt in range(retries):
             try:
                 client = weaviate.connect_to_custom(
-                    http_host="localhost",
-                    http_port=8080,
+                    http_host=os.getenv("WEAVIATE_HOST","localhost"),
+                    http_port=int(os.getenv("WEAVIATE_HTTP_PORT",8080)),
                     http_secure=False,
-                    grpc_host="localhost",
-                    grpc_port=50051,
+                    grpc_host=os.getenv("WEAVIATE_HOST","localhost"),
+                    grpc_port=int(os.getenv("WEAVIATE_GRPC_PORT",50051)),
                     grpc_secure=False,
                 )
                 return client
 
             except Exception as e:
-                print(f"Weaviate connection failed (attempt {attempt}/{retries}): {e}")
-                if attempt < retries:
+                logger.warning("Weaviate connection failed", extra={"attempt": attempt + 1, "retries": retries, "error": str(e)})
+                if attempt < retries - 1:
                     time.sleep(5)
                 else:
                     raise RuntimeError("Failed to connect to Weaviate after multiple retries.") from e
+
+
+class VectorIndexSettings(BaseModel):
+    """
+    Vector index settings for the Vectorbase collection.
+        index_type -> "hnsw" for large collections, "flat" for small tenants (brute force, no graph kept in memory).
+        quantizer -> compression of the vectors held in memory, rescore_limit re-ranks candidates with the full vectors.
+    """
+    index_type: Literal["hnsw","flat"] = "hnsw"
+    quantizer: Literal["none","pq","bq","sq","rq"] = "none"
+    rescore_limit: Optional[int] = None
+    training_limit: Optional[int] = None #Objects used to fit PQ/SQ codebooks before compression kicks in.
+    pq_segments: Optional[int] = None
+    rq_bits: Optional[int] = None
+    ef: Optional[int] = None
+    ef_construction: Optional[int] = None
+    max_connections: Optional[int] = None
+    vector_cache_max_objects: Optional[int] = None
+
+    @classmethod
+    def from_env(cls) -> "VectorIndexSettings":
+        """ Method to read vector index settings from the environment, unset values fall back to weaviate defaults. """
+        def _int(key: str) -> Optional[int]:
+            value = os.getenv(key)
+            return int(value) if value else None
+
+        return cls(
+            index_type=os.getenv("WEAVIATE_INDEX_TYPE","hnsw").lower(),
+            quantizer=os.getenv("WEAVIATE_QUANTIZER","none").lower(),
+            rescore_limit=_int("WEAVIATE_RESCORE_LIMIT"),
+            training_limit=_int("WEAVIATE_TRAINING_LIMIT"),
+            pq_segments=_int("WEAVIATE_PQ_SEGMENTS"),
+            rq_bits=_int("WEAVIATE_RQ_BITS"),
+            ef=_int("WEAVIATE_HNSW_EF"),
+            ef_construction=_int("WEAVIATE_HNSW_EF_CONSTRUCTION"),
+            max_connections=_int("WEAVIATE_HNSW_MAX_CONNECTIONS"),
+            vector_cache_max_objects=_int("WEAVIATE_VECTOR_CACHE_MAX_OBJECTS"),
+        )
+
+    def _quantizer_config(self):
+        """ Method to build the weaviate quantizer config for the selected quantization mode. """
+        quantizer = wc.Configure.VectorIndex.Quantizer
+        if self.quantizer == "pq":
+            return quantizer.pq(segments=self.pq_segments, training_limit=self.training_limit)
+        if self.quantizer == "bq":
+            return quantizer.bq(rescore_limit=self.rescore_limit)
+        if self.quantizer == "sq":
+            return quantizer.sq(rescore_limit=self.rescore_limit, training_limit=self.training_limit)
+        if self.quantizer == "rq":
+            return quantizer.rq(bits=self.rq_bits, rescore_limit=self.rescore_limit)
+        return None
+
+    def to_vector_config(self):
+        """ Method to build the self provided vector config passed to collections.create(). """
+        if self.index_type == "flat":
+            if self.quantizer not in ("none","bq","rq"):
+                raise ValueError(f"Quantizer '{self.quantizer}' is not supported by the flat index, use bq or rq.")
+            index_config = wc.Configure.VectorIndex.flat(
+                vector_cache_max_objects=self.vector_cache_max_objects,
+                quantizer=self._quantizer_config(),
+            )
+        else:
+            index_config = wc.Configure.VectorIndex.hnsw(
+                ef=self.ef,
+                ef_construction=self.ef_construction,
+                max_connections=self.max_connections,
+                vector_cache_max_objects=self.vector_cache_max_objects,
+                quantizer=self._quantizer_config(),
+            )
+        return wc.Configure.Vectors.self_provided(vector_index_config=index_config)
+
+
+class ImageStorageSettings(BaseModel):
+    """
+    Storage encoding of page images in GridFS, OCR always runs on the full colour render before encoding.
+        color_mode -> "rgb", "grayscale" or "bilevel" (1 bit, suits clean text scans).
+        format -> "png" (lossless), "webp" (lossy at quality, or lossless), "jpeg", or "tiff_g4" (CCITT group 4, bilevel only).
+        ocr_dpi -> render resolution for OCR and the stored image.
+        display_dpi -> optional lower resolution WebP copy stored next to it for the UI, browsers cannot show tiff_g4 pages without it.
+    """
+    color_mode: Literal["rgb","grayscale","bilevel"] = "rgb"
+    format: Literal["png","webp","jpeg","tiff_g4"] = "png"
+    quality: int = 80
+    lossless: bool = False
+    ocr_dpi: int = 200
+    display_dpi: Optional[int] = None
+
+    @model_validator(mode="after")
+    def _check_format(self) -> "ImageStorageSettings":
+        if self.format == "tiff_g4" and self.color_mode != "bilevel":
+            raise ValueError("tiff_g4 (CCITT group 4) can only store bilevel images, set color_mode to bilevel.")
+        if self.display_dpi is not None and self.display_dpi >= self.ocr_dpi:
+            raise ValueError("display_dpi must be lower than ocr_dpi.")
+        return self
+
+    @property
+    def encoding(self) -> str:
+        """ Label stored on every PDFImage, pages with a different label are picked up by the migration. """
+        lossless = "-lossless" if self.format == "webp" and self.lossless else ""
+        return f"{self.format}{lossless}:{self.color_mode}"
+
+    @classmethod
+    def from_env(cls) -> "ImageStorageSettings":
+        """ Method to read the page image storage encoding from the environment, defaults keep full colour PNGs. """
+        display_dpi = os.getenv("PAGE_DISPLAY_DPI")
+        return cls(
+            color_mode=os.getenv("PAGE_COLOR_MODE","rgb").lower(),
+            format=os.getenv("PAGE_IMAGE_FORMAT","png").lower(),
+            quality=int(os.getenv("PAGE_IMAGE_QUALITY",80)),
+            lossless=os.getenv("PAGE_IMAGE_LOSSLESS","false").lower() in ("1","true","yes"),
+            ocr_dpi=int(os.getenv("PAGE_OCR_DPI",200)),
+            display_dpi=int(display_dpi) if display_dpi else None,
+        )
+
+
+class PageDedupSettings(BaseModel):
+    """
+    Deduplication of rendered pages before OCR, pages already stored are linked instead of processed again.
+        enabled -> match pages by an exact hash of the rendered pixels.
+        perceptual -> also match re-scans of the same page by a 256 bit difference hash, off by default since two
+                      different pages with the same layout can hash close together.
+        phash_max_distance -> largest hamming distance (of 256 bits) counted as the same page, at most 15 (16 hash bands are indexed).
+    """
+    enabled: bool = True
+    perceptual: bool = False
+    phash_max_distance: int = 10
+
+    @model_validator(mode="after")
+    def _check_distance(self) -> "PageDedupSettings":
+        if not 0 <= self.phash_max_distance <= 15:
+            raise ValueError("phash_max_distance must be between 0 and 15.")
+        return self
+
+    @classmethod
+    def from_env(cls) -> "PageDedupSettings":
+        """ Method to read page deduplication settings from the environment. """
+        return cls(
+            enabled=os.getenv("PAGE_DEDUP","true").lower() in ("1","true","yes"),
+            perceptual=os.getenv("PAGE_DEDUP_PERCEPTUAL","false").lower() in ("1","true","yes"),
+            phash_max_distance=int(os.getenv("PAGE_DEDUP_PHASH_DISTANCE",10)),
+        )
@@ -0,0 +1,208 @@
+from concurrent.futures import ThreadPoolExecutor
+from PIL import Image
+from pydantic import BaseModel
+from typing import Callable,Iterator,List,Optional,Tuple
+import numpy as np
+import fitz
+import os,threading
+import pytesseract
+
+# Page rendering and OCR shared by the MongoDB ingestion pipeline and the chat document upload of the main API,
+# kept free of database and environment side effects so either process can import it.
+
+_MUPDF_LOCK = threading.RLock() #MuPDF is not thread safe, pages are rendered one at a time while OCR runs in parallel.
+
+def render_page(doc: fitz.Document, i: int, dpi: int = 200) -> Image.Image:
+    """ Render page i of an open PDF straight to a PIL image, no intermediate PNG encode/decode. """
+    with _MUPDF_LOCK:
+        pix = doc.load_page(i).get_pixmap(dpi=dpi, alpha=False)   # good quality for OCR
+        return Image.frombytes("RGB", (pix.width, pix.height), pix.samples)
+
+def render_pages(doc: fitz.Document, start: int, end: int, dpi: int = 200) -> Iterator[Tuple[int, Image.Image]]:
+    """ Render pages [start, end) of an open PDF to PIL images. """
+    for i in range(start, end):
+        yield i, render_page(doc, i, dpi)
+
+def ocr_image(img: Image.Image) -> str:
+    """ OCR a page image with tesseract. """
+    return pytesseract.image_to_string(img)
+
+
+class OcrSettings(BaseModel):
+    """
+    Tesseract settings for ingested pages.
+        adaptive -> estimate the text size from a low resolution preview, OCR at the resolution that puts text lines at about
+                    target_line_px pixels (between min_dpi and max_dpi) with a page segmentation mode picked from the layout,
+                    and retry at a higher resolution when the mean word confidence is below min_confidence.
+        lang -> tesseract languages, e.g. "eng" or "eng+hin".
+        char_whitelist -> optional characters tesseract may output (no spaces), unset allows all.
+        psm -> page segmentation mode when not adaptive (3 is tesseract's default, fully automatic).
+    """
+    adaptive: bool = False
+    lang: str = "eng"
+    char_whitelist: Optional[str] = None
+    psm: int = 3
+    target_line_px: int = 32 #12pt text lands at ~200 DPI, larger print is OCRed at less, small print at more.
+    min_dpi: int = 150
+    max_dpi: int = 400
+    min_confidence: float = 75.0
+
+    def config(self, psm: int) -> str:
+        config = f"--psm {psm}"
+        if self.char_whitelist:
+            config += f" -c tessedit_char_whitelist={self.char_whitelist}"
+        return config
+
+    @classmethod
+    def from_env(cls) -> "OcrSettings":
+        """ Method to read OCR settings from the environment, defaults keep tesseract's own behaviour. """
+        return cls(
+            adaptive=os.getenv("PAGE_OCR_ADAPTIVE","false").lower() in ("1","true","yes"),
+            lang=os.getenv("PAGE_OCR_LANG","eng"),
+            char_whitelist=os.getenv("PAGE_OCR_WHITELIST") or None,
+            psm=int(os.getenv("PAGE_OCR_PSM",3)),
+            target_line_px=int(os.getenv("PAGE_OCR_TARGET_LINE_PX",32)),
+            min_dpi=int(os.getenv("PAGE_OCR_MIN_DPI",150)),
+            max_dpi=int(os.getenv("PAGE_OCR_MAX_DPI",400)),
+            min_confidence=float(os.getenv("PAGE_OCR_MIN_CONFIDENCE",75)),
+        )
+
+
+class OcrResult(BaseModel):
+    text: str
+    confidence: Optional[float] = None #Mean word confidence 0-100 weighted by word length, None when nothing was recognized.
+    dpi: int
+    psm: int
+    retried: bool = False
+
+
+class PageLayout(BaseModel):
+    lines: int #Text lines found on the preview.
+    line_height: Optional[float] = None #Median text line height in pixels of the analysed image.
+    columns: int = 1
+    uniform: bool = True #Line heights are close to each other (body text only).
+
+
+def analyse_layout(img: Image.Image, ink_threshold: int = 160) -> PageLayout:
+    """ Method to estimate text line height and columns of a page from row and column ink projections. """
+    ink = np.asarray(img.convert("L")) < ink_threshold
+    rows = ink.mean(axis=1) > 0.002
+    edges = np.flatnonzero(np.diff(np.concatenate([[0], rows.astype(np.int8), [0]])))
+    heights = edges[1::2] - edges[::2]
+    heights = heights[heights >= 2] #Single pixel rows are rules or scan noise.
+    if not len(heights):
+        return PageLayout(lines=0)
+    median = float(np.median(heights))
+    body = heights[heights <= median * 3] #Merged lines and images are not text lines.
+
+    columns = 1
+    text_rows = ink[rows]
+    width = ink.shape[1]
+    left = int(width * 0.35)
+    empty = np.concatenate([[0], (text_rows[:, left:int(width * 0.65)].sum(axis=0) == 0).astype(np.int8), [0]])
+    runs = np.flatnonzero(np.diff(empty)).reshape(-1, 2) #[start, end) of empty column runs in the middle band.
+    if len(heights) >= 10 and len(runs):
+        start, end = runs[np.argmax(runs[:, 1] - runs[:, 0])] + left
+        # A gutter is wider than a word gap and most text lines have ink on both sides of it.
+        if end - start >= width * 0.02 and text_rows[:, :start].any(axis=1).mean() > 0.5 and text_rows[:, end:].any(axis=1).mean() > 0.5:
+            columns = 2
+    return PageLayout(
+        lines=int(len(heights)),
+        line_height=median,
+        columns=columns,
+        uniform=bool(len(body) and np.percentile(body, 90) <= median * 1.5),
+    )
+
+def _read(img: Image.Image, settings: OcrSettings, psm: int) -> Tuple[str, Optional[float]]:
+    """ Method to OCR an image into text with the line and paragraph breaks of image_to_string and its mean confidence. """
+    data = pytesseract.image_to_data(img, lang=settings.lang, config=settings.config(psm), output_type=pytesseract.Output.DICT)
+    paragraphs, lines = [], {}
+    weighted, total = 0.0, 0
+    for block, par, line, word, conf in zip(data["block_num"], data["par_num"], data["line_num"], data["text"], data["conf"]):
+        conf = float(conf)
+        if conf < 0 or not word.strip():
+            continue
+        if (block, par) not in lines:
+            lines[(block, par)] = {}
+            paragraphs.append((block, par))
+        lines[(block, par)].setdefault(line, []).append(word)
+        weighted += conf * len(word)
+        total += len(word)
+    text = "\n\n".join("\n".join(" ".join(words) for words in lines[key].values()) for key in paragraphs)
+    return text, (round(weighted / total, 1) if total else None)
+
+def ocr_page(img: Image.Image, img_dpi: int, settings: OcrSettings, render: Optional[Callable[[int], Image.Image]] = None) -> OcrResult:
+    """
+    OCR a rendered page with the settings, img_dpi is the resolution img was rendered at.
+    Adaptive OCR scales img down when the text is large enough, render(dpi) is called when a higher resolution is needed.
+    """
+    if not settings.adaptive:
+        #No retry decision to make, so skip the word level image_to_data output, the confidence is left unset.
+        text = pytesseract.image_to_string(img, lang=settings.lang, config=settings.config(settings.psm))
+        return OcrResult(text=text, dpi=img_dpi, psm=settings.psm)
+
+    factor = max(1, img_dpi // 72)
+    layout = analyse_layout(img.convert("L").reduce(factor)) #~72 DPI preview, cheap compared to any OCR pass.
+    if not layout.lines:
+        return OcrResult(text="", dpi=img_dpi, psm=settings.psm) #Blank page, nothing to OCR.
+
+    line_px = layout.line_height * factor * 72 / img_dpi #Line height at 72 DPI, i.e. in points.
+    dpi = int(round(settings.target_line_px * 72 / line_px / 25) * 25)
+    dpi = min(max(dpi, settings.min_dpi), settings.max_dpi)
+    if layout.lines < 5:
+        psm = 11 #Sparse text, stamps and cover pages.
+    elif layout.columns > 1:
+        psm = 3
+    else:
+        psm = 6 if layout.uniform else 4
+
+    def at(dpi: int) -> Image.Image:
+        if dpi == img_dpi:
+            return img
+        if dpi < img_dpi or render is None:
+            scale = dpi / img_dpi
+            return img.resize((round(img.width * scale), round(img.height * scale)), Image.Resampling.LANCZOS)
+        return render(dpi)
+
+    text, confidence = _read(at(dpi), settings, psm)
+    result = OcrResult(text=text, confidence=confidence, dpi=dpi, psm=psm)
+    retry_dpi = min(int(dpi * 1.5), settings.max_dpi)
+    if (confidence or 0) < settings.min_confidence and retry_dpi > dpi and (render is not None or retry_dpi <= img_dpi):
+        text, retry_confidence = _read(at(retry_dpi), settings, psm)
+        if (retry_confidence or 0) > (confidence or 0):
+            result = OcrResult(text=text, confidence=retry_confidence, dpi=retry_dpi, psm=psm, retried=True)
+        else:
+            result.retried = True
+    return result
+
+class TooManyScannedPages(ValueError):
+    """ Raised by extract_pdf_text when a PDF has more pages without a text layer than may be OCR'd. """
+    def __init__(self, scanned: int, limit: int):
+        super().__init__(f"{scanned} pages need OCR, at most {limit} are allowed")
+        self.scanned = scanned
+        self.limit = limit
+
+def extract_pdf_text(data: bytes, max_workers: int = 4, dpi: int = 200, min_text_chars: int = 50, max_ocr_pages: Optional[int] = None) -> List[str]:
+    """
+    Text of every page of a PDF, in page order.
+    Pages with an embedded text layer (at least min_text_chars characters) use it directly, only scanned pages are rendered and OCR'd.
+    max_ocr_pages -> raise TooManyScannedPages instead of OCRing more scanned pages than this, checked before any rendering.
+    """
+    doc = fitz.open(stream=data, filetype="pdf")
+    try:
+        with _MUPDF_LOCK:
+            texts = [doc.load_page(i).get_text() for i in range(len(doc))]
+        scanned = [i for i, text in enumerate(texts) if len(text.strip()) < min_text_chars]
+        if max_ocr_pages is not None and len(scanned) > max_ocr_pages:
+            raise TooManyScannedPages(len(scanned), max_ocr_pages)
+        if scanned:
+            with ThreadPoolExecutor(max_workers=max_workers) as executor:
+                # Every job renders its page and drops the bitmap (~11 MB at 200 DPI) after OCR, a window bounds how many wait.
+                window = max_workers * 2
+                for start in range(0, len(scanned), window):
+                    pages = scanned[start:start + window]
+                    for i, text in zip(pages, executor.map(lambda i: ocr_image(render_page(doc, i, dpi)), pages)):
+                        texts[i] = text
+    finally:
+        doc.close()
+    return texts
@@ -0,0 +1,79 @@
+from setupAPI.config import ImageStorageSettings
+from setupAPI.models import PDFImage
+from PIL import Image
+from io import BytesIO
+from typing import Optional,Tuple
+
+CONTENT_TYPES = {"png": "image/png", "webp": "image/webp", "jpeg": "image/jpeg", "tiff_g4": "image/tiff"}
+LEGACY_DPI = 200 #Pages stored before the dpi was recorded were all rendered at 200 DPI.
+
+def _convert(img: Image.Image, color_mode: str) -> Image.Image:
+    if color_mode == "bilevel":
+        return img.convert("L").convert("1") #Floyd-Steinberg dithering keeps stamps and signatures legible.
+    if color_mode == "grayscale":
+        return img.convert("L")
+    return img.convert("RGB") if img.mode not in ("RGB", "L") else img
+
+def encode_page(img: Image.Image, settings: ImageStorageSettings) -> Tuple[bytes, str]:
+    """ Encode a rendered page with the storage settings, returns (bytes, content type). """
+    img = _convert(img, settings.color_mode)
+    out = BytesIO()
+    if settings.format == "tiff_g4":
+        img.save(out, format="TIFF", compression="group4")
+    elif settings.format == "webp":
+        img = img.convert("L") if img.mode == "1" else img #WebP has no 1 bit mode.
+        img.save(out, format="WEBP", quality=settings.quality, lossless=settings.lossless, method=6)
+    elif settings.format == "jpeg":
+        img = img.convert("L") if img.mode == "1" else img
+        img.save(out, format="JPEG", quality=settings.quality, optimize=True)
+    else:
+        img.save(out, format="PNG", optimize=True)
+    return out.getvalue(), CONTENT_TYPES[settings.format]
+
+def encode_display(img: Image.Image, settings: ImageStorageSettings, source_dpi: int) -> Optional[Tuple[bytes, str]]:
+    """ Encode the lower resolution display copy as WebP, None when no display_dpi is configured. """
+    if settings.display_dpi is None or settings.display_dpi >= source_dpi:
+        return None
+    scale = settings.display_dpi / source_dpi
+    img = _convert(img, "rgb" if settings.color_mode == "rgb" else "grayscale") #Bilevel pages are downsampled in grayscale, 1 bit scaling breaks strokes.
+    img = img.resize((max(1, round(img.width * scale)), max(1, round(img.height * scale))), Image.Resampling.LANCZOS)
+    out = BytesIO()
+    img.save(out, format="WEBP", quality=settings.quality, method=6)
+    return out.getvalue(), "image/webp"
+
+def store_page(pdf_img: PDFImage, img: Image.Image, settings: ImageStorageSettings, source_dpi: int, replace: bool = False) -> int:
+    """ Encode a page (and its display copy) into the GridFS fields of pdf_img, returns the bytes stored. Call save() afterwards. """
+    data, content_type = encode_page(img, settings)
+    if replace:
+        pdf_img.file.replace(data, content_type=content_type)
+    else:
+        pdf_img.file.put(data, content_type=content_type)
+    stored = len(data)
+
+    display = encode_display(img, settings, source_dpi)
+    if pdf_img.display_file:
+        pdf_img.display_file.delete() #Stale copy from an earlier encoding.
+    if display is not None:
+        pdf_img.display_file.put(display[0], content_type=display[1])
+        stored += len(display[0])
+    pdf_img.encoding = settings.encoding
+    pdf_img.dpi = source_dpi
+    return stored
+
+def storage_report() -> dict:
+    """ GridFS usage of page images grouped by content type, plus how many pages use each encoding. """
+    db = PDFImage._get_db()
+    by_type = {
+        group["_id"] or "unknown": {"files": group["files"], "bytes": group["bytes"]}
+        for group in db["fs.files"].aggregate([{"$group": {"_id": "$contentType", "files": {"$sum": 1}, "bytes": {"$sum": "$length"}}}])
+    }
+    encodings = {
+        group["_id"] or "png:rgb (legacy)": group["pages"]
+        for group in PDFImage._get_collection().aggregate([{"$group": {"_id": "$encoding", "pages": {"$sum": 1}}}])
+    }
+    return {
+        "total_bytes": sum(t["bytes"] for t in by_type.values()),
+        "by_content_type": by_type,
+        "pages_by_encoding": encodings,
+        "display_copies": PDFImage.objects(display_file__exists=True, display_file__ne=None).count(),
+    }
@@ -0,0 +1,110 @@
+from weaviate import WeaviateClient
+from weaviate.classes.query import MetadataQuery
+from setupAPI.config import VectorIndexSettings
+from setupAPI.utils import Utils
+from typing import Dict,List,Optional
+import logging,time,requests
+
+logger = logging.getLogger(__name__)
+
+class IndexReport():
+    """
+    Recall/latency comparison of vector index settings on our own queries.
+    Every configuration is built as a temporary copy of the source collection (stored vectors are reused, nothing is re-embedded),
+    recall@k is measured against an uncompressed flat index which is an exact brute force search.
+    """
+    def __init__(self, client: WeaviateClient, source: str = "Vectorbase"):
+        self.client = client
+        self.source = source
+        self.utils = Utils()
+
+    @staticmethod
+    def _embed_queries(queries: List[str]) -> List[List[float]]:
+        """ Method to embed all report queries in a single request to the embedding server. """
+        response = requests.post(Utils.embedding_server(),params={'embed_type':'query'},json={"text":queries},timeout=60)
+        response.raise_for_status()
+        return response.json()["vectors"]
+
+    @staticmethod
+    def _percentile(values: List[float], pct: float) -> float:
+        """ Method to get nearest rank percentile of a list of latencies. """
+        ordered = sorted(values)
+        index = min(len(ordered) - 1, max(0, round(pct / 100 * len(ordered)) - 1))
+        return ordered[index]
+
+    def _build(self, name: str, index_settings: VectorIndexSettings, max_objects: Optional[int]) -> str:
+        """ Method to create a temporary collection with the given index settings and fill it from the source collection. """
+        collection_name = f"{self.source}_report_{name}"
+        if self.client.collections.exists(collection_name):
+            self.client.collections.delete(collection_name)
+        self.client.collections.create(
+            name=collection_name,
+            properties=self.utils._vectorbase_properties(),
+            vector_config=index_settings.to_vector_config(),
+        )
+        self.utils.copy_collection(self.client, source=self.source, target=collection_name, max_objects=max_objects)
+        return collection_name
+
+    def _search(self, collection_name: str, vectors: List[List[float]], limit: int):
+        """ Method to run every query vector against a collection, returns result ids and latency (ms) per query. """
+        collection = self.client.collections.get(collection_name)
+        ids, latencies = [], []
+        for vector in vectors:
+            start = time.perf_counter()
+            response = collection.query.near_vector(near_vector=vector, limit=limit, return_metadata=MetadataQuery(distance=True))
+            latencies.append((time.perf_counter() - start) * 1000)
+            ids.append([str(o.uuid) for o in response.objects])
+        return ids, latencies
+
+    def run(self, queries: List[str], configs: Dict[str, VectorIndexSettings], limit: int = 5, max_objects: Optional[int] = None) -> dict:
+        """
+        Method to build the report.
+        args -> queries : natural language queries to evaluate with.
+                configs : named index settings to compare.
+                limit : k used for recall@k, same as the document_search top-k.
+                max_objects : sample size copied into each temporary collection, None copies the whole collection.
+        Note: PQ/SQ only start compressing after training_limit objects, so use a sample larger than that when comparing them.
+        """
+        if not queries:
+            raise ValueError("At least one query is required for the index report.")
+
+        vectors = self._embed_queries(queries)
+        created = []
+        try:
+            exact_name = self._build("exact", VectorIndexSettings(index_type="flat"), max_objects)
+            created.append(exact_name)
+            exact_ids, exact_latencies = self._search(exact_name, vectors, limit)
+
+            report = {
+                "queries": len(queries),
+                "limit": limit,
+                "objects": len(self.client.collections.get(exact_name)),
+                "configs": {
+                    "exact": {
+                        "settings": VectorIndexSettings(index_type="flat").model_dump(exclude_none=True),
+                        "recall": 1.0,
+                        "latency_ms_p50": self._percentile(exact_latencies, 50),
+                        "latency_ms_p95": self._percentile(exact_latencies, 95),
+                    }
+                }
+            }
+
+            for name, index_settings in configs.items():
+                collection_name = self._build(name, index_settings, max_objects)
+                created.append(collection_name)
+                ids, latencies = self._search(collection_name, vectors, limit)
+                hits = sum(len(set(found) & set(expected)) for found, expected in zip(ids, exact_ids))
+                total = sum(len(expected) for expected in exact_ids)
+                report["configs"][name] = {
+                    "settings": index_settings.model_dump(exclude_none=True),
+                    "recall": hits / total if total else 0.0,
+                    "latency_ms_p50": self._percentile(latencies, 50),
+                    "latency_ms_p95": self._percentile(latencies, 95),
+                }
+                logger.debug("Index report", extra={"config": name, **{key: value for key, value in report["configs"][name].items() if key != "settings"}})
+
+        finally:
+            for collection_name in created: #Temporary copies hold a full set of vectors each, never leave them behind.
+                self.client.collections.delete(collection_name)
+
+        return report
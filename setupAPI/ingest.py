@@ -0,0 +1,320 @@
+"""
+Bulk ingestion of PDFs from disk without the Flask upload routes, pages are rendered, OCRed, stored in MongoDB, embedded
+and written to the vector store as one streaming pipeline.
+
+    python -m setupAPI.ingest archive/ --ocr-workers 8
+    python -m setupAPI.ingest --manifest archive/manifest.jsonl --court "supreme court of india"
+
+A manifest is a .jsonl file ({"path": ..., "court": ..., "year": ..., "document_type": ...} per line) or a .csv file with
+the same columns, relative paths are resolved against the manifest's directory. Fields not given are inferred like uploads.
+Pages embedded here are marked on ExtractedText, /populate-weaviate does not embed them a second time.
+"""
+from setupAPI.config import Config
+from setupAPI.utils import Utils
+from setupAPI.vector_store import get_vector_store
+from setupAPI.extraction import render_page
+from setupAPI.models import PDFImage, ExtractedText
+from structured_logging.logger import configure_logging,shutdown_logging
+from dotenv import load_dotenv
+from tqdm import tqdm
+from functools import partial
+from queue import Queue
+from typing import Iterable,Iterator,List,Optional
+import argparse,csv,hashlib,json,mmap,os,threading,time
+import fitz
+
+class _Document():
+    """ A PDF opened by path, memory mapped so pages are read from the page cache instead of a copy of the file. """
+    def __init__(self, path: str, metadata: dict):
+        self.path = path
+        self.name = os.path.basename(path)
+        self.metadata = metadata
+        self.image_ids: dict = {}
+        self.new_ids: List[str] = []
+        self.lock = threading.Lock()
+        self._file = open(path, "rb")
+        self._map = mmap.mmap(self._file.fileno(), 0, access=mmap.ACCESS_READ)
+        self._view = memoryview(self._map)
+        self.sha256 = hashlib.sha256(self._view).hexdigest() #Identifies the document, names repeat across folders.
+        self.doc = fitz.open(stream=self._view, filetype="pdf")
+        self.pages = len(self.doc)
+        self.remaining = self.pages
+
+    def close(self):
+        self.doc.close()
+        self._view.release() #The map cannot be closed while a view of it exists.
+        self._map.close()
+        self._file.close()
+
+
+class IngestStats():
+    """ Counters and busy time per stage, shared by the pipeline threads. """
+    def __init__(self):
+        self.lock = threading.Lock()
+        self.counts = {"documents": 0, "failed_documents": 0, "pages": 0, "processed": 0, "skipped": 0, "failed_pages": 0, "embedded": 0, "failed_embeddings": 0}
+        self.busy = {"render": 0.0, "ocr": 0.0, "embed": 0.0, "store": 0.0}
+
+    def add(self, **counts):
+        with self.lock:
+            for key, value in counts.items():
+                self.counts[key] += value
+
+    def timed(self, stage: str, started: float):
+        with self.lock:
+            self.busy[stage] += time.perf_counter() - started
+
+
+class BulkIngester():
+    """
+    Streaming ingestion pipeline, stages are connected by bounded queues so a slow stage holds back the ones before it:
+        render (1 thread, MuPDF is not thread safe) -> OCR + MongoDB (ocr_workers) -> embed (embed_workers, batches of embed_batch) -> vector store (1 thread).
+    Pages are embedded once their whole document is stored, so metadata inferred from the opening pages is included.
+    """
+    def __init__(self, utils: Utils, store=None, ocr_workers: int = 4, render_ahead: Optional[int] = None, embed_batch: int = 32, embed_workers: int = 2):
+        self.utils = utils
+        self.store = store #None only stores pages in MongoDB, /populate-weaviate embeds them later.
+        self.ocr_workers = ocr_workers
+        self.embed_batch = embed_batch
+        self.embed_workers = embed_workers
+        self.pages: Queue = Queue(maxsize=render_ahead or ocr_workers * 2) #Rendered bitmaps are ~11 MB each, bound how many wait.
+        self.batches: Queue = Queue(maxsize=embed_workers * 2)
+        self.vectors: Queue = Queue(maxsize=4)
+        self.pending: List[dict] = []
+        self.pending_lock = threading.Lock()
+        self.stats = IngestStats()
+        self.bars = {}
+        self.seen = set() #sha256 of the documents of this run, copies of a file are ingested once.
+
+    def _ingested(self, source_hash: str) -> bool:
+        """ Method to check if an earlier run finished a document, with a vector store every stored page must also be embedded. """
+        ids = [p.id for p in PDFImage.objects(source_hash=source_hash).only("id")]
+        if not ids:
+            return False
+        if self.store is None:
+            return True
+        unindexed = ExtractedText.objects(image__in=ids, indexed_at=None).only("text") #Runs interrupted before _finish stored pages without embedding them.
+        return all(self.utils._is_noisy(t.text) for t in unindexed)
+
+    def _render(self, jobs: Iterable[dict], resume: bool):
+        for job in jobs:
+            try:
+                document = _Document(job["path"], self.utils._normalize_metadata(job))
+            except Exception as e:
+                tqdm.write(f"Failed to open {job['path']}: {e}")
+                self.stats.add(failed_documents=1)
+                continue
+            if document.sha256 in self.seen or (resume and self._ingested(document.sha256)):
+                document.close()
+                continue
+            self.seen.add(document.sha256)
+            self.stats.add(documents=1, pages=document.pages)
+            for bar in self.bars.values():
+                bar.total += document.pages
+                bar.refresh()
+            if not document.pages:
+                document.close()
+                continue
+            for i in range(document.pages):
+                started = time.perf_counter()
+                try:
+                    img = render_page(document.doc, i, self.utils.image_storage.ocr_dpi)
+                except Exception as e: #A corrupt page fails alone, the rest of the document and the run go on.
+                    tqdm.write(f"Failed to render page {i} of {document.name}: {e}")
+                    self.stats.add(failed_pages=1)
+                    self.bars["rendered"].update(1)
+                    self.bars["ocr"].update(1)
+                    self._page_done(document)
+                    continue
+                finally:
+                    self.stats.timed("render", started)
+                self.bars["rendered"].update(1)
+                self.pages.put((document, i, img))
+
+    def _ocr(self):
+        while (task := self.pages.get()) is not None:
+            document, i, img = task
+            started = time.perf_counter()
+            try:
+                image_id, duplicate = self.utils._process_page(i, img, document.name, document.metadata, partial(render_page, document.doc, i), source_hash=document.sha256)
+                with document.lock:
+                    document.image_ids[i] = image_id
+                    if not duplicate:
+                        document.new_ids.append(image_id)
+                self.stats.add(**{"skipped" if duplicate else "processed": 1})
+            except Exception as e:
+                tqdm.write(f"Failed page {i} of {document.name}: {e}")
+                self.stats.add(failed_pages=1)
+            del img
+            self.stats.timed("ocr", started)
+            self.bars["ocr"].update(1)
+            self._page_done(document)
+
+    def _page_done(self, document: _Document):
+        """ Method to count a page as handled (processed, skipped or failed), the last one finishes the document. """
+        with document.lock:
+            document.remaining -= 1
+            finished = document.remaining == 0
+        if finished:
+            try:
+                self._finish(document)
+            except Exception as e:
+                tqdm.write(f"Failed to finish {document.name}: {e}")
+                self.stats.add(failed_documents=1)
+
+    def _finish(self, document: _Document):
+        """
+        Method to close a fully processed document, fill its inferred metadata and queue its pages that are not embedded yet.
+        Besides new pages that includes pages an interrupted run stored under this document, found as duplicates now.
+        """
+        document.close()
+        image_ids = [document.image_ids[i] for i in sorted(document.image_ids)]
+        self.utils._fill_inferred_metadata(image_ids, document.metadata, update_ids=document.new_ids)
+        if self.store is None or not image_ids:
+            return
+        own_ids = [p.id for p in PDFImage.objects(id__in=image_ids, source_hash=document.sha256).only("id")] #Duplicates of other documents are embedded with those.
+        items = [
+            self.utils._text_item(t)
+            for t in ExtractedText.objects(image__in=own_ids, indexed_at=None)
+            if not self.utils._is_noisy(t.text)
+        ]
+        with self.pending_lock:
+            self.pending.extend(items)
+            while len(self.pending) >= self.embed_batch:
+                batch, self.pending = self.pending[:self.embed_batch], self.pending[self.embed_batch:]
+                self.batches.put(batch)
+
+    def _embed(self):
+        while (batch := self.batches.get()) is not None:
+            started = time.perf_counter()
+            try:
+                vectors = self.utils.embed_texts([item["text_data"] for item in batch])
+                self.vectors.put((batch, vectors))
+            except Exception as e:
+                tqdm.write(f"Failed to embed {len(batch)} pages: {e}")
+                self.stats.add(failed_embeddings=len(batch))
+            self.stats.timed("embed", started)
+
+    def _store(self, items: List[dict], vectors: list):
+        started = time.perf_counter()
+        try:
+            self.utils.add_to_store(self.store, items, vectors)
+            self.stats.add(embedded=len(items))
+            self.bars["embedded"].update(len(items))
+        except Exception as e:
+            tqdm.write(f"Failed to store {len(items)} vectors: {e}")
+            self.stats.add(failed_embeddings=len(items))
+        self.stats.timed("store", started)
+
+    def _write(self):
+        """ Method to write embedded batches, buffered up to the store's write_rows (the numpy store rewrites its files on every add). """
+        items, vectors = [], []
+        while (task := self.vectors.get()) is not None:
+            batch, batch_vectors = task
+            items.extend(batch)
+            vectors.extend(batch_vectors)
+            if len(items) >= self.store.write_rows:
+                self._store(items, vectors)
+                items, vectors = [], []
+        if items:
+            self._store(items, vectors)
+
+    def run(self, jobs: Iterable[dict], resume: bool = False) -> dict:
+        """ Method to ingest every job ({"path", "court", "year", "document_type"}) and return the throughput summary. """
+        started = time.perf_counter()
+        self.bars = {"rendered": tqdm(total=0, desc="rendered", unit="page", position=0), "ocr": tqdm(total=0, desc="ocr", unit="page", position=1)}
+        if self.store is not None:
+            self.bars["embedded"] = tqdm(total=0, desc="embedded", unit="page", position=2)
+
+        ocr_threads = [threading.Thread(target=self._ocr, daemon=True) for _ in range(self.ocr_workers)]
+        embed_threads = [threading.Thread(target=self._embed, daemon=True) for _ in range(self.embed_workers)]
+        writer = threading.Thread(target=self._write, daemon=True)
+        for thread in ocr_threads + embed_threads + [writer]:
+            thread.start()
+        try:
+            self._render(jobs, resume)
+        finally:
+            for _ in ocr_threads: #Workers finish the pages already rendered, also after an interrupt.
+                self.pages.put(None)
+            for thread in ocr_threads:
+                thread.join()
+            with self.pending_lock:
+                if self.pending:
+                    self.batches.put(self.pending)
+                    self.pending = []
+            for _ in embed_threads:
+                self.batches.put(None)
+            for thread in embed_threads:
+                thread.join()
+            self.vectors.put(None)
+            writer.join()
+            for bar in self.bars.values():
+                bar.close()
+
+        elapsed = time.perf_counter() - started
+        summary = dict(self.stats.counts)
+        summary["seconds"] = round(elapsed, 1)
+        summary["pages_per_second"] = round(summary["pages"] / elapsed, 2) if elapsed else 0.0
+        summary["stage_seconds"] = {stage: round(busy, 1) for stage, busy in self.stats.busy.items()} #Busy time summed over the threads of a stage.
+        return summary
+
+
+def iter_jobs(paths: List[str], manifest: Optional[str], defaults: dict) -> Iterator[dict]:
+    """ Method to list the PDFs to ingest from directories/files and an optional manifest, defaults fill missing metadata. """
+    for path in paths:
+        if os.path.isdir(path):
+            for root, _, files in sorted(os.walk(path)):
+                for filename in sorted(files):
+                    if filename.lower().endswith(".pdf"):
+                        yield {**defaults, "path": os.path.join(root, filename)}
+        else:
+            yield {**defaults, "path": path}
+    if manifest:
+        base = os.path.dirname(os.path.abspath(manifest))
+        with open(manifest, newline="", encoding="utf-8") as f:
+            rows = csv.DictReader(f) if manifest.lower().endswith(".csv") else (json.loads(line) for line in f if line.strip())
+            for row in rows:
+                row = {key: value for key, value in row.items() if value not in (None, "")}
+                yield {**defaults, **row, "path": os.path.join(base, row["path"])}
+
+def main():
+    parser = argparse.ArgumentParser(description="Ingest PDFs from disk into MongoDB and the vector store.")
+    parser.add_argument("paths", nargs="*", help="PDF files or directories (searched recursively).")
+    parser.add_argument("--manifest", help="A .jsonl or .csv file of documents with their metadata.")
+    parser.add_argument("--court")
+    parser.add_argument("--year", type=int)
+    parser.add_argument("--document-type")
+    parser.add_argument("--ocr-workers", type=int, default=os.cpu_count() or 4, help="Threads running OCR and MongoDB writes.")
+    parser.add_argument("--render-ahead", type=int, default=None, help="Rendered pages waiting for OCR, default 2 per OCR worker.")
+    parser.add_argument("--embed-batch", type=int, default=32)
+    parser.add_argument("--embed-workers", type=int, default=2, help="Concurrent requests to the embedding server.")
+    parser.add_argument("--no-embed", action="store_true", help="Only store pages in MongoDB, run /populate-weaviate later.")
+    parser.add_argument("--resume", action="store_true", help="Skip files an earlier run stored and embedded (only stored with --no-embed).")
+    parser.add_argument("--verbose", action="store_true", help="Log every page (DEBUG level), LOG_LEVEL and LOG_LEVELS apply otherwise.")
+    args = parser.parse_args()
+    if not args.paths and not args.manifest:
+        parser.error("pass PDF paths, directories or --manifest")
+
+    load_dotenv()
+    configure_logging("ingest", level="DEBUG" if args.verbose else None)
+    config = Config()
+    store = None if args.no_embed else get_vector_store(config.vector_backend, config.weaviate_client)
+    ingester = BulkIngester(
+        Utils(),
+        store,
+        ocr_workers=args.ocr_workers,
+        render_ahead=args.render_ahead,
+        embed_batch=args.embed_batch,
+        embed_workers=args.embed_workers,
+    )
+    defaults = {key: value for key, value in (("court", args.court), ("year", args.year), ("document_type", args.document_type)) if value}
+    jobs = iter_jobs(args.paths, args.manifest, defaults)
+    try:
+        summary = ingester.run(jobs, resume=args.resume)
+    finally:
+        if config.weaviate_client is not None:
+            config.weaviate_client.close()
+        shutdown_logging()
+    print(json.dumps(summary, indent=2))
+
+if __name__ == "__main__":
+    main()
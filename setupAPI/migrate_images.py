@@ -0,0 +1,89 @@
+"""
+Re-encode page images already stored in GridFS with the configured storage encoding and report the bytes saved.
+
+    python -m setupAPI.migrate_images --dry-run
+    python -m setupAPI.migrate_images --color-mode bilevel --format tiff_g4 --display-dpi 100
+
+Settings default to the PAGE_* environment variables, pages already stored with the target encoding are skipped.
+Use --dry-run first, it encodes a sample without writing and estimates the savings.
+"""
+from setupAPI.config import ImageStorageSettings
+from setupAPI.image_storage import LEGACY_DPI,store_page,encode_page,encode_display,storage_report
+from setupAPI.models import PDFImage
+from structured_logging.logger import configure_logging
+from mongoengine import connect,Q
+from dotenv import load_dotenv
+from PIL import Image
+from typing import Optional
+import argparse,json,logging,os,time
+
+logger = logging.getLogger(__name__)
+
+def migrate_images(settings: ImageStorageSettings, dry_run: bool = False, limit: Optional[int] = None) -> dict:
+    """ Re-encode every page whose encoding differs from the settings (or lacks the configured display copy), returns a savings report. """
+    stale = Q(encoding__ne=settings.encoding)
+    if settings.display_dpi is not None:
+        stale |= Q(display_file=None)
+    pages = PDFImage.objects(stale).no_cache()
+    if limit:
+        pages = pages.limit(limit)
+
+    report = {"pages": 0, "failed": 0, "bytes_before": 0, "bytes_after": 0, "dry_run": dry_run, "encoding": settings.encoding}
+    started = time.perf_counter()
+    for page in pages:
+        try:
+            before = page.file.length + (page.display_file.length if page.display_file else 0)
+            img = Image.open(page.file.get())
+            img.load()
+            source_dpi = page.dpi or LEGACY_DPI
+            if dry_run:
+                after = len(encode_page(img, settings)[0])
+                display = encode_display(img, settings, source_dpi)
+                after += len(display[0]) if display else 0
+            else:
+                after = store_page(page, img, settings, source_dpi=source_dpi, replace=True)
+                page.save()
+        except Exception:
+            logger.exception("Failed to migrate page", extra={"page": page.filename})
+            report["failed"] += 1
+            continue
+        report["pages"] += 1
+        report["bytes_before"] += before
+        report["bytes_after"] += after
+        if report["pages"] % 100 == 0:
+            logger.info("Migration progress", extra={"pages": report["pages"], "bytes_saved": report["bytes_before"] - report["bytes_after"]})
+
+    report["bytes_saved"] = report["bytes_before"] - report["bytes_after"]
+    report["saved_percent"] = round(100 * report["bytes_saved"] / report["bytes_before"], 1) if report["bytes_before"] else 0.0
+    report["seconds"] = round(time.perf_counter() - started, 1)
+    return report
+
+def main():
+    defaults = ImageStorageSettings.from_env()
+    parser = argparse.ArgumentParser(description="Re-encode stored page images and report the storage saved.")
+    parser.add_argument("--color-mode", choices=["rgb","grayscale","bilevel"], default=defaults.color_mode)
+    parser.add_argument("--format", choices=["png","webp","jpeg","tiff_g4"], default=defaults.format)
+    parser.add_argument("--quality", type=int, default=defaults.quality)
+    parser.add_argument("--lossless", action="store_true", default=defaults.lossless)
+    parser.add_argument("--display-dpi", type=int, default=defaults.display_dpi)
+    parser.add_argument("--limit", type=int, default=None, help="Migrate at most this many pages.")
+    parser.add_argument("--dry-run", action="store_true", help="Encode without writing, to estimate the savings.")
+    args = parser.parse_args()
+
+    settings = ImageStorageSettings(
+        color_mode=args.color_mode,
+        format=args.format,
+        quality=args.quality,
+        lossless=args.lossless,
+        ocr_dpi=defaults.ocr_dpi,
+        display_dpi=args.display_dpi,
+    )
+    load_dotenv()
+    configure_logging("migrate_images")
+    connect(db=os.getenv("MONGODB_DB","test"),host=os.getenv("MONGODB_URI"))
+    report = migrate_images(settings, dry_run=args.dry_run, limit=args.limit)
+    report["storage"] = storage_report()
+    print(json.dumps(report, indent=2))
+
+if __name__ == "__main__":
+    main()
@@ -6,8 +6,32 @@ class PDFImage(me.DynamicDocument):
     filename = me.StringField(required=True)  # Store filename
     file = me.FileField(required=True)  # Store image in GridFS
     image_id = me.UUIDField(required=True,default=uuid.uuid4,binary=False) # Generate a unique id for each image
+    source_name = me.StringField() # Original document name the page belongs to
+    source_hash = me.StringField() # sha256 of the original document file, same named files from different folders are told apart by it
+    court = me.StringField() # Structured document metadata, carried over to weaviate for filtered search
+    year = me.IntField()
+    document_type = me.StringField()
+    display_file = me.FileField() # Optional lower resolution copy for the UI
+    encoding = me.StringField() # Storage encoding of file as "<format>:<color mode>", unset for legacy full colour PNGs
+    dpi = me.IntField() # Render resolution of file
+    content_hash = me.StringField() # sha256 of the rendered pixels, pages with the same hash are not processed again
+    phash = me.StringField() # Optional 256 bit difference hash (hex) for near duplicate matching
+    phash_bands = me.ListField(me.StringField()) # phash split into 16 "<band>:<hex>" keys, candidates share at least one
+    linked_filenames = me.ListField(me.StringField()) # Page names of later uploads that were deduplicated to this page
+
+    meta = {
+        "indexes": [
+            {"fields": ["content_hash"], "sparse": True},
+            {"fields": ["source_hash"], "sparse": True},
+            {"fields": ["phash_bands"], "sparse": True},
+        ]
+    }
 
 class ExtractedText(me.DynamicDocument):
     image = me.ReferenceField(PDFImage)  # Link to image
     text = me.StringField(required=True)
     time_stamp = me.DateTimeField(default=lambda: datetime.now(timezone.utc))  # Store timestamp of extraction
+    confidence = me.FloatField() # Mean tesseract word confidence 0-100 with adaptive OCR, unset for blank pages, non adaptive OCR and older extractions
+    ocr_dpi = me.IntField() # Resolution the page was OCRed at
+    ocr_psm = me.IntField() # Tesseract page segmentation mode used
+    indexed_at = me.DateTimeField() # Set once the page is stored in the vector store, unset pages are embedded by /populate-weaviate and bulk ingest reruns
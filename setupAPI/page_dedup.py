@@ -0,0 +1,82 @@
+from setupAPI.config import PageDedupSettings
+from setupAPI.models import PDFImage, ExtractedText
+from PIL import Image,ImageOps
+from typing import List,Optional,Tuple
+import hashlib
+
+PHASH_SIZE = 16 #16x16 difference hash, 256 bits.
+PHASH_BANDS = 16 #Two hashes within 15 bits of each other share at least one of 16 bands exactly.
+PHASH_MIN_BITS = 32 #Near blank pages hash to (almost) all zeros and would match each other, they are only matched exactly.
+
+def content_hash(img: Image.Image) -> str:
+    """ sha256 of the rendered pixels, identical pages from different bundles render to identical bitmaps. """
+    digest = hashlib.sha256(f"{img.mode}:{img.width}x{img.height}:".encode())
+    digest.update(img.tobytes())
+    return digest.hexdigest()
+
+def perceptual_hash(img: Image.Image) -> Optional[str]:
+    """
+    Difference hash of the printed area of a page as hex, robust to re-encoding, margins and small scan differences.
+    None for pages with too little content to tell apart.
+    """
+    gray = img.convert("L")
+    bbox = ImageOps.invert(gray).point(lambda v: 255 if v > 32 else 0).getbbox() #Ignore near white scan noise.
+    if bbox is None:
+        return None
+    small = gray.crop(bbox).resize((PHASH_SIZE + 1, PHASH_SIZE), Image.Resampling.BILINEAR)
+    pixels = small.tobytes()
+    bits = 0
+    for y in range(PHASH_SIZE):
+        row = pixels[y * (PHASH_SIZE + 1):(y + 1) * (PHASH_SIZE + 1)]
+        for x in range(PHASH_SIZE):
+            bits = (bits << 1) | (row[x] > row[x + 1])
+    if bits.bit_count() < PHASH_MIN_BITS:
+        return None
+    return f"{bits:0{PHASH_SIZE * PHASH_SIZE // 4}x}"
+
+def phash_bands(phash: str) -> List[str]:
+    width = len(phash) // PHASH_BANDS
+    return [f"{band}:{phash[band * width:(band + 1) * width]}" for band in range(PHASH_BANDS)]
+
+def _hamming(a: str, b: str) -> int:
+    return (int(a, 16) ^ int(b, 16)).bit_count()
+
+def _has_text(page: PDFImage) -> bool:
+    """ A page only counts as known once its OCR text was stored, an interrupted ingest is processed again. """
+    return ExtractedText.objects(image=page).only("id").first() is not None
+
+def fingerprint(img: Image.Image, settings: PageDedupSettings) -> Tuple[Optional[str], Optional[str]]:
+    """ Method to get the (content_hash, phash) of a rendered page, None for the hashes that are disabled. """
+    if not settings.enabled:
+        return None, None
+    return content_hash(img), perceptual_hash(img) if settings.perceptual else None
+
+def find_duplicate(digest: Optional[str], phash: Optional[str], settings: PageDedupSettings) -> Optional[PDFImage]:
+    """ Method to find an already processed page with the same pixels, or the closest perceptual match within phash_max_distance. """
+    if digest is not None:
+        for page in PDFImage.objects(content_hash=digest).only("id", "image_id", "filename"):
+            if _has_text(page):
+                return page
+    if phash is not None:
+        candidates = PDFImage.objects(phash_bands__in=phash_bands(phash)).only("id", "image_id", "filename", "phash")
+        matches = sorted(
+            ((_hamming(phash, page.phash), page) for page in candidates if page.phash),
+            key=lambda match: match[0],
+        )
+        for distance, page in matches:
+            if distance > settings.phash_max_distance:
+                break
+            if _has_text(page):
+                return page
+    return None
+
+def link_duplicate(page: PDFImage, filename: str):
+    """ Method to record that a page of a new upload is a duplicate of page, its text and vectors are reused as they are. """
+    PDFImage.objects(id=page.id).update_one(add_to_set__linked_filenames=filename)
+
+def set_fingerprint(pdf_img: PDFImage, digest: Optional[str], phash: Optional[str]):
+    """ Method to store the hashes on a new page before it is saved. """
+    pdf_img.content_hash = digest
+    if phash is not None:
+        pdf_img.phash = phash
+        pdf_img.phash_bands = phash_bands(phash)
@@ -1,17 +1,43 @@
-from flask import Flask,request,jsonify
-from setupAPI.config import Config
+from flask import Flask,request,jsonify,g
+from setupAPI.config import Config,VectorIndexSettings
 from setupAPI.utils import Utils
+from setupAPI.index_report import IndexReport
+from setupAPI.vector_store import get_vector_store
+from setupAPI.image_storage import storage_report
+from setupAPI.models import ExtractedText
+from pydantic import ValidationError
+from structured_logging.logger import configure_logging,new_request_id
+import logging
 import traceback
 from mongoengine import connect
 import os
 from dotenv import load_dotenv
 
 load_dotenv()
+configure_logging("setup")
+logger = logging.getLogger(__name__)
 
 app = Flask(__name__)
 
 config = Config()
 utils = Utils()
+vector_store = get_vector_store(config.vector_backend, config.weaviate_client)
+
+def _require_weaviate():
+    """ Response for weaviate only routes when another vector backend is configured, None when weaviate is in use. """
+    if config.weaviate_client is None:
+        return jsonify({"error": f"Not available with the '{config.vector_backend.backend}' vector backend."}), 400
+    return None
+
+@app.before_request
+def _request_context():
+    """ Tag the log records of a request with its id, taken from X-Request-ID when the caller sends one. """
+    g.request_id = new_request_id(request.headers.get("X-Request-ID"))
+
+@app.after_request
+def _echo_request_id(response):
+    response.headers["X-Request-ID"] = g.get("request_id", "")
+    return response
 
 @app.route("/populate-mongodb",methods=["POST"]) #Test end point for dynamic testing, use Postman or thunder client or any API testing tool.
 def test():
@@ -19,17 +45,30 @@ def test():
     if len(files) == 0:
         return jsonify({"error": "No files uploaded"}), 400
     
+    # Optional document metadata applied to every uploaded file, used for filtered document search.
+    metadata = {key: request.form.get(key) for key in ("court", "year", "document_type") if request.form.get(key)}
+
     results = []
+    reports = []
     errors = []
     for file in files:
         try:
             data = file.read()
             filename = file.filename
             results.append(filename)
-            utils.pdf_to_mongodb(data=data,filename=filename)
+            report = utils.pdf_to_mongodb(data=data,filename=filename,metadata=metadata)
+            report.pop("image_ids")
+            reports.append(report)
         except Exception as e:
+            logger.exception("Failed to process uploaded file", extra={"document": file.filename})
             return jsonify({"error": str(e)}), 500
-    response = {"message": "OCR processing completed", "processed_files": results}
+    response = {
+        "message": "OCR processing completed",
+        "processed_files": results,
+        "files": reports,
+        "pages": sum(r["pages"] for r in reports),
+        "skipped_pages": sum(r["skipped"] for r in reports), #Already stored pages, not OCRed or embedded again.
+    }
     if errors:
         response["errors"] = errors
 
@@ -39,33 +78,91 @@ def test():
 @app.route("/populate-weaviate",methods=["POST"])
 def populate():
     try:
-        client = config.weaviate_client
         data = utils.get_data()
-        utils.store_data(data,client)
-        return jsonify({"message": f"Successfully populated Weaviate with {len(data)} entries."}), 200
+        utils.store_data(data,vector_store)
+        return jsonify({"message": f"Successfully populated {config.vector_backend.backend} with {len(data)} entries."}), 200
     except Exception as e:
         error_details = traceback.format_exc()
-        print("Error details:", error_details)
+        logger.exception("Request failed", extra={"route": request.path})
         return jsonify({"error": str(e), "details": error_details}), 500
 
 
 @app.route("/drop-weaviate-db", methods=["POST"])
 def admin_login():
     try:
-        client = config.weaviate_client
-        client.collections.delete("Vectorbase")
+        vector_store.drop()
+        ExtractedText.objects(indexed_at__ne=None).update(unset__indexed_at=True) #Bulk ingested pages can be populated again.
     except Exception as e:
-        print(f"Exception occured: {e}")
+        logger.exception("Failed to drop the vector store")
         return jsonify({"Error":e}),500
     return jsonify({"Message":"Deleted db"}),200
 
 
+@app.route("/migrate-weaviate", methods=["POST"])
+def migrate():
+    """
+    Move the Vectorbase collection to new vector index settings.
+    body -> VectorIndexSettings fields, e.g. {"index_type":"hnsw","quantizer":"rq","rescore_limit":64}, empty body reads settings from env.
+    """
+    if (error := _require_weaviate()) is not None:
+        return error
+    try:
+        body = request.get_json(silent=True)
+        index_settings = VectorIndexSettings(**body) if body else VectorIndexSettings.from_env()
+        moved = utils.migrate_weaviate_index(config.weaviate_client, index_settings)
+    except ValidationError as e:
+        return jsonify({"error": str(e)}), 400
+    except Exception as e:
+        error_details = traceback.format_exc()
+        logger.exception("Request failed", extra={"route": request.path})
+        return jsonify({"error": str(e), "details": error_details}), 500
+    return jsonify({"message": f"Migrated {moved} objects.", "settings": index_settings.model_dump(exclude_none=True)}), 200
+
+
+@app.route("/weaviate-index-report", methods=["POST"])
+def index_report():
+    """
+    Compare recall/latency of vector index settings on our own queries.
+    body -> {"queries": [...], "configs": {"<name>": {VectorIndexSettings fields}}, "limit": 5, "max_objects": 20000}
+    """
+    if (error := _require_weaviate()) is not None:
+        return error
+    try:
+        body = request.get_json(force=True)
+        configs = {name: VectorIndexSettings(**value) for name, value in body.get("configs", {}).items()}
+        report = IndexReport(config.weaviate_client).run(
+            queries=body.get("queries", []),
+            configs=configs,
+            limit=body.get("limit", 5),
+            max_objects=body.get("max_objects"),
+        )
+    except (ValidationError, ValueError) as e:
+        return jsonify({"error": str(e)}), 400
+    except Exception as e:
+        error_details = traceback.format_exc()
+        logger.exception("Request failed", extra={"route": request.path})
+        return jsonify({"error": str(e), "details": error_details}), 500
+    return jsonify(report), 200
+
+
+@app.route("/image-storage-report", methods=["GET"])
+def image_storage_report():
+    """ GridFS bytes used by page images per content type and pages per storage encoding, run `python -m setupAPI.migrate_images` to re-encode. """
+    try:
+        report = storage_report()
+    except Exception as e:
+        error_details = traceback.format_exc()
+        logger.exception("Request failed", extra={"route": request.path})
+        return jsonify({"error": str(e), "details": error_details}), 500
+    return jsonify({**report, "configured_encoding": utils.image_storage.encoding}), 200
+
+
 if __name__ == "__main__": #This is only for local development and in production, must use a lifcycle manager like @app.before_first_request() in flask.
     try:
-        connect(host=os.getenv("MONGODB_URI")) #MongoDB connection before running wsgi server for flask.
-        client = config.weaviate_client
-        utils.create_weaviate_schema(client) #Create weavite db before running wsgi server for flask.
+        connect(db=os.getenv("MONGODB_DB","test"),host=os.getenv("MONGODB_URI")) #MongoDB connection before running wsgi server for flask.
+        if config.weaviate_client is not None:
+            utils.create_weaviate_schema(config.weaviate_client) #Create weavite db before running wsgi server for flask.
     except Exception as e:
-        print(f"Exception occured leading server start-up failure -> {e}")
+        logger.exception("Server start-up failed")
 
     app.run(host="0.0.0.0",port=5000,debug=True) #Run app.
@@ -1,38 +1,60 @@
 from concurrent.futures import ThreadPoolExecutor
+from functools import partial
 import fitz
 from PIL import Image
-from io import BytesIO
 from setupAPI.models import PDFImage, ExtractedText
-import pytesseract
-from typing import List
-import re,requests,uuid
+from setupAPI.config import VectorIndexSettings,ImageStorageSettings,PageDedupSettings
+from setupAPI.image_storage import store_page
+from setupAPI.page_dedup import fingerprint,find_duplicate,link_duplicate,set_fingerprint
+from setupAPI.extraction import OcrSettings,render_page,render_pages,ocr_page
+from structured_logging.logger import propagation_headers
+from typing import Callable,List,Optional,Tuple
+import hashlib,logging,os,re,requests,uuid
 import weaviate.classes.config as wc
 from weaviate import WeaviateClient
 from tqdm import tqdm
 from datetime import datetime, timedelta, timezone
 
+logger = logging.getLogger(__name__)
+
+# Upper case title lines of the opening pages (spaces and punctuation removed, "J U D G M E N T" is common) to the document_type set.
+# Documents without such a line keep document_type unset rather than a guess that would hide them from filtered searches.
+DOCUMENT_TITLES = {"JUDGMENT": "judgment", "JUDGEMENT": "judgment", "ORDER": "order", "NOTIFICATION": "notification"}
+
 class Utils():
-    @staticmethod
-    def _process_page(i: int, img: Image, filename: str) -> str:
-        """ Method to insert read bytes from file data into mongoDB data-store and implementing OCR to save pdf text into mongoDB data-store """
-        img_byte_arr = BytesIO()
-        img.save(img_byte_arr, format="PNG")
-
-        print(f"[DEBUG] Saving page {i} to MongoDB...")
-        pdf_img = PDFImage(filename=f"{filename}_{i}.png")
-        pdf_img.file.put(img_byte_arr.getvalue(), content_type="image/png")
-        pdf_img.save()
+    def __init__(self):
+        self.image_storage = ImageStorageSettings.from_env()
+        self.page_dedup = PageDedupSettings.from_env()
+        self.ocr = OcrSettings.from_env()
 
-        image_data = img_byte_arr.getvalue()
-        img_pil = Image.open(BytesIO(image_data))
+    def _process_page(self, i: int, img: Image, filename: str, metadata: Optional[dict] = None, render: Optional[Callable[[int], Image.Image]] = None, source_hash: Optional[str] = None) -> Tuple[str, bool]:
+        """
+        Method to insert read bytes from file data into mongoDB data-store and implementing OCR to save pdf text into mongoDB data-store.
+        Pages already stored (same content hash) are only linked to the new filename, returns (PDFImage id, whether it was a duplicate).
+        render -> renders the page at another DPI, used by adaptive OCR.
+        source_hash -> sha256 of the whole PDF file, stored on new pages.
+        """
+        page_name = f"{filename}_{i}" #No image suffix, the storage format is in encoding and can change with setupAPI.migrate_images.
+        digest, phash = fingerprint(img, self.page_dedup)
+        duplicate = find_duplicate(digest, phash, self.page_dedup)
+        if duplicate is not None:
+            logger.debug("Duplicate page, reusing its text and vectors", extra={"page": page_name, "duplicate_of": duplicate.filename})
+            link_duplicate(duplicate, page_name)
+            return str(duplicate.id), True
+        # Identical pages processed concurrently in the same window (e.g. blank pages) can both be stored, later ones are linked.
 
-        print(f"[DEBUG] Extracting text from page {i}...")
-        extracted_text = pytesseract.image_to_string(img_pil)
+        pdf_img = PDFImage(filename=page_name, source_name=filename, source_hash=source_hash, **(metadata or {}))
+        set_fingerprint(pdf_img, digest, phash)
+        store_page(pdf_img, img, self.image_storage, source_dpi=self.image_storage.ocr_dpi) #Compact encoding for storage, OCR below still reads the full render.
+        pdf_img.save()
 
-        text_entry = ExtractedText(image=pdf_img, text=extracted_text)
+        ocr = ocr_page(img, self.image_storage.ocr_dpi, self.ocr, render=render)
+
+        text_entry = ExtractedText(image=pdf_img, text=ocr.text, confidence=ocr.confidence, ocr_dpi=ocr.dpi, ocr_psm=ocr.psm)
         text_entry.save()
+        logger.debug("Stored page", extra={"page": page_name, "chars": len(ocr.text), "ocr_dpi": ocr.dpi, "ocr_psm": ocr.psm, "confidence": ocr.confidence})
 
-        return str(pdf_img.id)
+        return str(pdf_img.id), False
 
     @staticmethod
     def _is_noisy(text):
@@ -48,109 +70,255 @@ class Utils():
         # Remove citation tags like [DATE], [/DATE], [LAW], [/LAW]
         return re.sub(r"\[/?(DATE|LAW)\]", "", text).strip()
 
+    @staticmethod
+    def _normalize_metadata(metadata: Optional[dict]) -> dict:
+        """ Method to normalize document metadata so filter values match regardless of how they were typed. """
+        normalized = {}
+        for key in ("court", "document_type"):
+            value = (metadata or {}).get(key)
+            if value:
+                normalized[key] = " ".join(str(value).split()).lower()
+        year = (metadata or {}).get("year")
+        if year:
+            normalized["year"] = int(year)
+        return normalized
+
+    @staticmethod
+    def _infer_metadata(text: str) -> dict:
+        """ Method to infer court, year and document type from the opening pages of a document when not passed on upload. """
+        metadata = {}
+        court = re.search(r"\b(supreme court of [a-z]+|high court of [a-z]+(?: (?!at\b|in\b)[a-z]+)?|(?!the\b)[a-z]+ high court|supreme court|district court)", text, re.IGNORECASE)
+        if court:
+            metadata["court"] = court.group(1)
+        years = re.findall(r"\b(19[5-9]\d|20[0-4]\d)\b", text)
+        if years:
+            metadata["year"] = max(set(years), key=years.count) #Most cited year on the opening pages is usually the judgment year.
+        for line in text.splitlines(): #Only a title line counts, "act" or "order" appear in the body of almost every judgment.
+            title = re.sub(r"[\s.:]", "", line)
+            if title in DOCUMENT_TITLES:
+                metadata["document_type"] = DOCUMENT_TITLES[title]
+                break
+        return Utils._normalize_metadata(metadata)
+
 
-    def pdf_to_mongodb(self, data: bytes, filename: str, max_workers=4, chunk_size=50) -> list:
-        """Convert PDF bytes into page images and upload to MongoDB using PyMuPDF."""
-        print("[DEBUG] Opening PDF with PyMuPDF...")
+    def pdf_to_mongodb(self, data: bytes, filename: str, max_workers=4, chunk_size=50, metadata: Optional[dict] = None) -> dict:
+        """
+        Convert PDF bytes into page images and upload to MongoDB using PyMuPDF.
+        metadata -> optional court/year/document_type for the document, fields not passed are inferred from the OCR text of the first pages.
+        Returns {"filename", "pages", "processed", "skipped", "image_ids"}, skipped pages were already stored and are not OCRed or embedded again.
+        """
+        metadata = self._normalize_metadata(metadata)
+        source_hash = hashlib.sha256(data).hexdigest()
         doc = fitz.open(stream=data, filetype="pdf")
         total_pages = len(doc)
         image_ids = []
+        new_ids = []
 
-        print(f"[DEBUG] Total pages detected: {total_pages}")
-        print("[DEBUG] Splitting into chunks...")
+        logger.info("Processing PDF", extra={"document": filename, "pages": total_pages})
 
         # Process in chunks
         for start in range(0, total_pages, chunk_size):
             end = min(start + chunk_size, total_pages)
-            print(f"[DEBUG] Processing pages {start} to {end - 1}")
-
-            # Convert each page to image (pixmap)
-            pages = []
-            for i in range(start, end):
-                page = doc.load_page(i)
-                pix = page.get_pixmap(dpi=200)   # good quality for OCR
-                img_bytes = pix.tobytes("png")   # raw PNG bytes
-                pages.append((i, img_bytes))
+            logger.debug("Processing chunk", extra={"document": filename, "first_page": start, "last_page": end - 1})
 
             # Map to _process_page using thread pool
             with ThreadPoolExecutor(max_workers=max_workers) as executor:
-                futures = [
-                    executor.submit(
-                        self._process_page,
-                        page_index,
-                        Image.open(BytesIO(img_bytes)),  # convert to PIL Image
-                        filename
-                    )
-                    for page_index, img_bytes in pages
-                ]
-
-                for future in futures:
-                    image_ids.append(future.result())
+                # Rendered pages are raw bitmaps (~11 MB each at 200 DPI), render a few pages ahead of the workers instead of the whole chunk.
+                window = max_workers * 2
+                for window_start in range(start, end, window):
+                    futures = [
+                        executor.submit(
+                            self._process_page,
+                            page_index,
+                            img,
+                            filename,
+                            metadata,
+                            partial(render_page, doc, page_index),
+                            source_hash=source_hash,
+                        )
+                        for page_index, img in render_pages(doc, window_start, min(window_start + window, end), dpi=self.image_storage.ocr_dpi)
+                    ]
+
+                    for future in futures:
+                        image_id, duplicate = future.result()
+                        image_ids.append(image_id)
+                        if not duplicate:
+                            new_ids.append(image_id)
 
         doc.close()
-        return image_ids
+        self._fill_inferred_metadata(image_ids, metadata, update_ids=new_ids)
+        skipped = len(image_ids) - len(new_ids)
+        logger.info("Processed PDF", extra={"document": filename, "pages": total_pages, "skipped": skipped})
+        return {"filename": filename, "pages": total_pages, "processed": len(new_ids), "skipped": skipped, "image_ids": image_ids}
+
+    def _fill_inferred_metadata(self, image_ids: List[str], metadata: dict, pages: int = 2, update_ids: Optional[List[str]] = None):
+        """
+        Method to set inferred metadata on all pages of a document for fields that were not passed on upload.
+        update_ids -> pages to update, defaults to image_ids, deduplicated pages keep the metadata of the document they were first stored with.
+        """
+        missing = {"court", "year", "document_type"} - metadata.keys()
+        update_ids = image_ids if update_ids is None else update_ids
+        if not update_ids or not missing:
+            return
+        opening_text = " ".join(t.text for t in ExtractedText.objects(image__in=image_ids[:pages]))
+        inferred = {key: value for key, value in self._infer_metadata(opening_text).items() if key in missing}
+        if inferred:
+            logger.debug("Inferred metadata", extra=inferred)
+            PDFImage.objects(id__in=update_ids).update(**{f"set__{key}": value for key, value in inferred.items()})
     
+    def _text_item(self, t: ExtractedText) -> dict:
+        """ Method to get the fields of an extracted page that are embedded and stored in the vector store. """
+        return {
+            'text_id' : str(t.id),
+            'text_data' : self._clean_tags(t.text),
+            'doc_data' : str(t.image.filename) if t.image else None,
+            'image_data' : str(t.image.image_id) if t.image else None,
+            'source_name' : t.image.source_name if t.image else None,
+            'court' : t.image.court if t.image else None,
+            'year' : t.image.year if t.image else None,
+            'document_type' : t.image.document_type if t.image else None,
+        }
+
     def get_data(self) -> List[dict]:
         """ Method to perform a read and retrieve data from MongoDB database for weaviate meta data to reference """
         one_hour_ago = datetime.now(timezone.utc) - timedelta(hours=1)
-        text = ExtractedText.objects(time_stamp__gte=one_hour_ago)
-        if not text:
-            print("No data found")
-        else:
-            print("Data found:", text)
-        data = [
-            {
-                'text_data' : self._clean_tags(t.text),
-                'doc_data' : str(t.image.filename) if t.image else None,
-                'image_data' : str(t.image.image_id) if t.image else None,
-            }
-            for t in text if not self._is_noisy(t.text)
-        ]
+        text = ExtractedText.objects(time_stamp__gte=one_hour_ago, indexed_at=None) #Pages ingested by setupAPI.ingest are already in the vector store.
+        logger.info("Pages to index", extra={"pages": text.count()})
+        data = [self._text_item(t) for t in text if not self._is_noisy(t.text)]
         return data
 
-    def store_data(self,data: List[dict], client: WeaviateClient):
-        """ Method to store data in weaviate database through batches"""
-        embeddings = client.collections.get("Vectorbase")
-        # batch system to dynamically set batch sizes for insertion of data as it is effecient to batch large amounts of data instead of passing it as an object.
-        with embeddings.batch.dynamic() as batch:
-            for i,item in tqdm(enumerate(data)):
-                query_params = {
-                    'embed_type':'document',
-                }
-                embedding_response = requests.post("http://localhost:8081/vectors",params=query_params,json={"text":[item['text_data']]})
-                vector = embedding_response.json()
-
-                doc_obj = {
-                    "text" : item['text_data'],
-                    "doc_name" : item['doc_data'],
-                    "image_id" : str(item['image_data']),
-                }
+    @staticmethod
+    def embedding_server() -> str:
+        """ Method to get the /vectors endpoint, WEAVIATE_SERVER like the main API and the MCP server, read per call so a later load_dotenv applies. """
+        return os.getenv("WEAVIATE_SERVER","http://localhost:8081/vectors")
 
-                batch.add_object(
-                    properties=doc_obj,
-                    vector=vector["vectors"][0],
-                    uuid = str(uuid.uuid4())
-                )
-        if len(embeddings.batch.failed_objects) > 0:
-            print(f"Failed to import {len(embeddings.batch.failed_objects)} objects")
+    def embed_texts(self, texts: List[str], embed_type: str = "document") -> List[List[float]]:
+        """ Method to embed a batch of texts in one request to the embedding server. """
+        query_params = {
+            'embed_type':embed_type,
+        }
+        embedding_response = requests.post(self.embedding_server(),params=query_params,headers=propagation_headers(),json={"text":texts})
+        embedding_response.raise_for_status()
+        return embedding_response.json()["vectors"]
 
     @staticmethod
-    def create_weaviate_schema(client: WeaviateClient):
-        """Create a weaviate database collection with a defined schema."""
+    def _vector_object(item: dict) -> dict:
+        doc_obj = {
+            "text" : item['text_data'],
+            "doc_name" : item['doc_data'],
+            "image_id" : str(item['image_data']),
+        }
+        for key in ("source_name", "court", "year", "document_type"): #Only set metadata that is known, missing values stay null in weaviate.
+            if item.get(key) is not None:
+                doc_obj[key] = item[key]
+        return doc_obj
+
+    def add_to_store(self, store, items: List[dict], vectors: List[List[float]]):
+        """ Method to write embedded pages to the vector store and mark them as indexed. """
+        store.add([self._vector_object(item) for item in items], vectors)
+        ExtractedText.objects(id__in=[item['text_id'] for item in items]).update(set__indexed_at=datetime.now(timezone.utc))
+
+    def store_data(self,data: List[dict], store, batch_size: int = 32):
+        """ Method to embed data and store it in the configured vector store (weaviate or numpy) in batches """
+        items, vectors = [], []
+        for start in tqdm(range(0, len(data), batch_size)):
+            chunk = data[start:start + batch_size]
+            # One embedding request per batch instead of per page.
+            vectors.extend(self.embed_texts([item['text_data'] for item in chunk]))
+            items.extend(chunk)
+            if len(items) >= store.write_rows: #The numpy store rewrites its files per add, buffer many batches per write.
+                self.add_to_store(store, items, vectors)
+                items, vectors = [], []
+        if items:
+            self.add_to_store(store, items, vectors)
+
+    @staticmethod
+    def _vectorbase_properties() -> List[wc.Property]:
+        """ Method to get the property schema shared by the Vectorbase collection and its migration copies. """
+        return [
+            wc.Property(name="text",data_type=wc.DataType.TEXT),
+            wc.Property(name="doc_name",data_type=wc.DataType.TEXT),
+            wc.Property(name="image_id",data_type=wc.DataType.TEXT),
+            # Metadata used as pre-filters for near vector search, filterable only (no BM25 index needed).
+            wc.Property(name="source_name",data_type=wc.DataType.TEXT,tokenization=wc.Tokenization.WORD,index_filterable=True,index_searchable=False),
+            wc.Property(name="court",data_type=wc.DataType.TEXT,tokenization=wc.Tokenization.WORD,index_filterable=True,index_searchable=False),
+            wc.Property(name="document_type",data_type=wc.DataType.TEXT,tokenization=wc.Tokenization.FIELD,index_filterable=True,index_searchable=False),
+            wc.Property(name="year",data_type=wc.DataType.INT,index_filterable=True,index_range_filters=True),
+        ]
+
+    @staticmethod
+    def create_weaviate_schema(client: WeaviateClient, index_settings: Optional[VectorIndexSettings] = None, name: str = "Vectorbase"):
+        """Create a weaviate database collection with a defined schema and vector index settings (read from env if not passed)."""
+        index_settings = index_settings or VectorIndexSettings.from_env()
         try:
             existing_collections = [col.name for col in client.collections.list_all()]
-            if "Vectorbase" in existing_collections:
-                print("Collection 'Vectorbase' already exists. Skipping creation.")
+            if name in existing_collections:
+                logger.info("Collection already exists, skipping creation", extra={"collection": name})
+                Utils._add_missing_properties(client, name)
 
             else:
                 client.collections.create(
-                    name="Vectorbase",
-                    properties=[
-                        wc.Property(name="text",data_type=wc.DataType.TEXT),
-                        wc.Property(name="doc_name",data_type=wc.DataType.TEXT),
-                        wc.Property(name="image_id",data_type=wc.DataType.TEXT),
-                    ],
-                vector_config= wc.Configure.Vectors.self_provided(),
+                    name=name,
+                    properties=Utils._vectorbase_properties(),
+                vector_config= index_settings.to_vector_config(),
+                )
+        except Exception:
+            logger.exception("Failed to create the weaviate schema", extra={"collection": name})
+
+    @staticmethod
+    def _add_missing_properties(client: WeaviateClient, name: str):
+        """ Method to add properties introduced after a collection was created, existing objects keep null values for them. """
+        collection = client.collections.get(name)
+        existing = {p.name for p in collection.config.get().properties}
+        for prop in Utils._vectorbase_properties():
+            if prop.name not in existing:
+                logger.info("Adding property", extra={"collection": name, "property": prop.name})
+                collection.config.add_property(prop)
+
+    @staticmethod
+    def copy_collection(client: WeaviateClient, source: str, target: str, max_objects: Optional[int] = None) -> int:
+        """ Method to copy objects along with their stored vectors from one collection to another, no re-embedding is done. """
+        source_collection = client.collections.get(source)
+        target_collection = client.collections.get(target)
+        copied = 0
+        with target_collection.batch.dynamic() as batch:
+            for obj in tqdm(source_collection.iterator(include_vector=True)):
+                if max_objects is not None and copied >= max_objects:
+                    break
+                batch.add_object(
+                    properties=obj.properties,
+                    vector=obj.vector["default"],
+                    uuid=obj.uuid
                 )
-        except Exception as e:
-            print(f"Exception Occured : {e}")
+                copied += 1
+        if len(target_collection.batch.failed_objects) > 0:
+            raise RuntimeError(f"Failed to copy {len(target_collection.batch.failed_objects)} objects from '{source}' to '{target}'")
+        return copied
+
+    def migrate_weaviate_index(self, client: WeaviateClient, index_settings: VectorIndexSettings, name: str = "Vectorbase") -> int:
+        """
+        Method to move an existing collection to new vector index settings.
+        Index type and quantizer can not be changed in place, so objects are staged into a copy, the collection is re-created and the copy is moved back.
+        """
+        staging = f"{name}_migration"
+        if client.collections.exists(staging):
+            raise RuntimeError(f"Staging collection '{staging}' already exists, a previous migration did not finish. Verify and drop it first.")
+
+        client.collections.create(
+            name=staging,
+            properties=self._vectorbase_properties(),
+            vector_config=VectorIndexSettings().to_vector_config(), #Uncompressed staging copy so no precision is lost in between.
+        )
+        staged = self.copy_collection(client, source=name, target=staging)
+        logger.info("Staged objects for migration", extra={"collection": name, "staging": staging, "objects": staged})
+
+        client.collections.delete(name)
+        client.collections.create(
+            name=name,
+            properties=self._vectorbase_properties(),
+            vector_config=index_settings.to_vector_config(),
+        )
+        moved = self.copy_collection(client, source=staging, target=name)
+        client.collections.delete(staging)
+        logger.info("Migrated collection", extra={"collection": name, "objects": moved, "settings": index_settings.model_dump(exclude_none=True)})
+        return moved
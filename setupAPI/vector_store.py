@@ -0,0 +1,43 @@
+from setupAPI.config import VectorBackendSettings
+from vector_store.numpy_store import NumpyVectorStore
+from weaviate import WeaviateClient
+from typing import List,Optional,Union
+import logging
+import uuid
+
+logger = logging.getLogger(__name__)
+
+class WeaviateVectorStore():
+    """ Vector store over the Vectorbase weaviate collection, same add/drop interface as NumpyVectorStore. """
+    write_rows = 1 #Inserts are incremental, callers add every batch as it is embedded.
+
+    def __init__(self, client: WeaviateClient, name: str = "Vectorbase"):
+        self.client = client
+        self.name = name
+
+    def add(self, objects: List[dict], vectors: List[List[float]]) -> List[str]:
+        """ Method to insert objects with their vectors through a dynamic batch, returns the generated uuids. """
+        collection = self.client.collections.get(self.name)
+        uuids = [str(uuid.uuid4()) for _ in objects]
+        # batch system to dynamically set batch sizes for insertion of data as it is effecient to batch large amounts of data instead of passing it as an object.
+        with collection.batch.dynamic() as batch:
+            for properties, vector, object_id in zip(objects, vectors, uuids):
+                batch.add_object(properties=properties, vector=vector, uuid=object_id)
+        if len(collection.batch.failed_objects) > 0:
+            logger.warning("Failed to import objects", extra={"failed": len(collection.batch.failed_objects), "collection": self.name})
+        return uuids
+
+    def drop(self):
+        self.client.collections.delete(self.name)
+
+
+def get_vector_store(settings: VectorBackendSettings, weaviate_client: Optional[WeaviateClient] = None) -> Union[WeaviateVectorStore, NumpyVectorStore]:
+    """ Build the vector store selected by the backend settings. """
+    if settings.backend == "numpy":
+        return NumpyVectorStore(
+            directory=settings.numpy_dir,
+            index_type=settings.numpy_index_type,
+            n_lists=settings.numpy_ivf_lists,
+            n_probe=settings.numpy_ivf_probe,
+        )
+    return WeaviateVectorStore(weaviate_client)
@@ -0,0 +1,4 @@
+from benchmarks.fakes import use_app_placeholders
+
+# app.settings requires the .env values at import, the tests never reach the services behind them.
+use_app_placeholders()
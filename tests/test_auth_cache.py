@@ -0,0 +1,109 @@
+from app.utils.auth_cache import AuthCache
+from app.utils import auth_cache as auth_cache_module
+from app.db_models.models import User
+import pytest
+
+class Clock():
+    def __init__(self):
+        self.now = 1_000_000.0
+
+    def __call__(self) -> float:
+        return self.now
+
+@pytest.fixture
+def clock(monkeypatch):
+    clock = Clock()
+    monkeypatch.setattr(auth_cache_module.time, "time", clock) #Before the cache is built, TLRUCache keeps its timer.
+    return clock
+
+@pytest.fixture
+def cache(clock):
+    return AuthCache(user_max_size=2, user_ttl=300, chat_max_size=2)
+
+def test_user_expires_after_ttl(cache, clock):
+    user = User(id=1, username="asha", password="x")
+    cache.set_user("asha", user)
+    clock.now += 299
+    assert cache.get_user("asha") is user
+    clock.now += 2
+    assert cache.get_user("asha") is None
+
+def test_token_expiry_caps_the_ttl(cache, clock):
+    cache.set_user("asha", User(id=1, username="asha", password="x"), token_expiry=clock.now + 60)
+    clock.now += 61
+    assert cache.get_user("asha") is None
+
+def test_later_token_expiry_does_not_extend_the_ttl(cache, clock):
+    cache.set_user("asha", User(id=1, username="asha", password="x"), token_expiry=clock.now + 3600)
+    clock.now += 301
+    assert cache.get_user("asha") is None
+
+def test_invalidate_user(cache):
+    cache.set_user("asha", User(id=1, username="asha", password="x"))
+    cache.invalidate_user("asha")
+    cache.invalidate_user("unknown") #No error for users that are not cached.
+    assert cache.get_user("asha") is None
+
+def test_users_are_bounded(cache):
+    for i in range(3):
+        cache.set_user(f"user{i}", User(id=i, username=f"user{i}", password="x"))
+    assert cache.get_stats()["users_cached"] == 2
+
+def test_chat_owner_lives_until_invalidated(cache, clock):
+    cache.set_chat_owner("chat-1", 7)
+    clock.now += 10 ** 6 #Ownership never changes, no TTL.
+    assert cache.get_chat_owner("chat-1") == 7
+    cache.invalidate_chat("chat-1")
+    assert cache.get_chat_owner("chat-1") is None
+
+def test_chat_owners_evict_least_recently_used(cache):
+    cache.set_chat_owner("chat-1", 1)
+    cache.set_chat_owner("chat-2", 2)
+    cache.get_chat_owner("chat-1")
+    cache.set_chat_owner("chat-3", 3)
+    assert cache.get_chat_owner("chat-2") is None
+    assert cache.get_chat_owner("chat-1") == 1
+
+def test_stats(cache):
+    cache.set_user("asha", User(id=1, username="asha", password="x"))
+    cache.get_user("asha")
+    cache.get_user("ravi")
+    cache.set_chat_owner("chat-1", 1)
+    cache.get_chat_owner("chat-1")
+    stats = cache.get_stats()
+    assert (stats["user_hits"], stats["user_misses"], stats["user_hit_rate"]) == (1, 1, 0.5)
+    assert (stats["chat_hits"], stats["chat_misses"], stats["chat_hit_rate"]) == (1, 0, 1.0)
+    assert (stats["users_cached"], stats["chats_cached"]) == (1, 1)
+
+class _Result():
+    def __init__(self, user):
+        self.user = user
+
+    def first(self):
+        return self.user
+
+class _Session():
+    """ Counts the user lookups get_current_user makes. """
+    def __init__(self, user):
+        self.user = user
+        self.queries = 0
+
+    async def exec(self, statement):
+        self.queries += 1
+        return _Result(self.user)
+
+def test_current_user_is_served_from_the_cache(monkeypatch):
+    from app.utils.security import security
+    from datetime import timedelta
+    import asyncio
+    cache = AuthCache(user_max_size=10, user_ttl=300, chat_max_size=10)
+    monkeypatch.setattr("app.utils.security.auth_cache", cache)
+    session = _Session(User(id=1, username="asha", password="x"))
+    token = security.create_access_token({"usr": "asha"}, expire_time=timedelta(minutes=5))
+
+    for _ in range(3):
+        assert asyncio.run(security.get_current_user(token, session)).username == "asha"
+    assert session.queries == 1
+    cache.invalidate_user("asha")
+    asyncio.run(security.get_current_user(token, session))
+    assert session.queries == 2
@@ -0,0 +1,31 @@
+from app.utils.db_util import decode_cursor,encode_cursor
+from fastapi import HTTPException
+from datetime import datetime
+import base64
+import pytest
+
+CREATED_AT = datetime(2025, 3, 1, 12, 30, 15, 123456)
+
+def _raw(text: str) -> str:
+    return base64.urlsafe_b64encode(text.encode()).decode()
+
+def test_round_trip():
+    assert decode_cursor(encode_cursor(CREATED_AT, "chat-7f3a")) == (CREATED_AT, "chat-7f3a")
+    assert decode_cursor(encode_cursor(CREATED_AT, 42), int) == (CREATED_AT, 42)
+
+def test_id_may_contain_the_separator():
+    assert decode_cursor(encode_cursor(CREATED_AT, "a|b")) == (CREATED_AT, "a|b")
+
+@pytest.mark.parametrize("cursor,id_type", [
+    ("not base64 !", str),
+    (_raw("no separator"), str),
+    (_raw("yesterday|42"), int),
+    (_raw(f"{CREATED_AT.isoformat()}|forty-two"), int), #Message ids are integers.
+    (base64.urlsafe_b64encode(b"\xff\xfe|1").decode(), str), #Not UTF-8.
+    ("", str),
+])
+def test_malformed_cursor_is_a_400(cursor, id_type):
+    with pytest.raises(HTTPException) as error:
+        decode_cursor(cursor, id_type)
+    assert error.value.status_code == 400
+    assert error.value.detail["code"] == "INVALID_CURSOR"
@@ -0,0 +1,125 @@
+from setupAPI import extraction
+from setupAPI.extraction import TooManyScannedPages,extract_pdf_text
+from PIL import Image,ImageDraw
+import fitz
+import threading
+import pytest
+
+TEXT = "IN THE SUPREME COURT OF INDIA. Criminal appellate jurisdiction, anticipatory bail under section 438."
+
+def _pdf(kinds: str) -> bytes:
+    """ A PDF with a text layer page for every "t" and an image only (scanned) page for every "s". """
+    doc = fitz.open()
+    for i, kind in enumerate(kinds):
+        page = doc.new_page()
+        if kind == "t":
+            page.insert_text((72, 72), f"{TEXT} Page {i}.")
+        else:
+            page.draw_rect(fitz.Rect(72, 72, 300, 90), color=(0, 0, 0), fill=(0, 0, 0))
+    return doc.tobytes()
+
+@pytest.fixture
+def ocr(monkeypatch):
+    """ Records the pages OCR'd and the most bitmaps alive at once. """
+    state = {"pages": [], "alive": 0, "peak": 0}
+    lock = threading.Lock()
+    render = extraction.render_page
+
+    def render_page(doc, i, dpi=200):
+        with lock:
+            state["alive"] += 1
+            state["peak"] = max(state["peak"], state["alive"])
+        return render(doc, i, dpi)
+
+    def ocr_image(img):
+        with lock:
+            state["pages"].append(img.size)
+            state["alive"] -= 1
+        return "scanned text"
+
+    monkeypatch.setattr(extraction, "render_page", render_page)
+    monkeypatch.setattr(extraction, "ocr_image", ocr_image)
+    return state
+
+def test_only_pages_without_a_text_layer_are_ocred(ocr):
+    texts = extract_pdf_text(_pdf("tsts"), dpi=72)
+    assert [text.strip().startswith("IN THE SUPREME COURT") for text in texts] == [True, False, True, False]
+    assert texts[1] == texts[3] == "scanned text"
+    assert len(ocr["pages"]) == 2
+
+def test_rendering_is_windowed(ocr):
+    texts = extract_pdf_text(_pdf("s" * 30), max_workers=2, dpi=72)
+    assert texts == ["scanned text"] * 30
+    assert ocr["peak"] <= 2 #One bitmap per worker, rendered in the job that OCRs it.
+
+def test_scanned_page_cap(ocr):
+    assert len(extract_pdf_text(_pdf("ttsss"), dpi=72, max_ocr_pages=3)) == 5
+    with pytest.raises(TooManyScannedPages) as error:
+        extract_pdf_text(_pdf("tssss"), dpi=72, max_ocr_pages=3)
+    assert (error.value.scanned, error.value.limit) == (4, 3)
+    assert len(ocr["pages"]) == 3 #Rejected before anything was rendered.
+
+def _lines_page(line_height: int, columns: int = 1, lines: int = 30) -> Image.Image:
+    """ A 200 DPI page of black bars standing in for text lines. """
+    img = Image.new("RGB", (1654, 2339), "white")
+    draw = ImageDraw.Draw(img)
+    width = (1400 - 60 * (columns - 1)) // columns
+    for column in range(columns):
+        left = 120 + column * (width + 60)
+        for line in range(lines):
+            top = 200 + line * line_height * 2
+            draw.rectangle((left, top, left + width, top + line_height), fill="black")
+    return img
+
+def _data(words: list, conf: float) -> dict:
+    return {"block_num": [1] * len(words), "par_num": [1] * len(words), "line_num": list(range(len(words))), "text": words, "conf": [conf] * len(words)}
+
+def test_non_adaptive_ocr_reads_text_only(monkeypatch):
+    calls = []
+    monkeypatch.setattr(extraction.pytesseract, "image_to_string", lambda img, **kwargs: calls.append(kwargs) or "Section 438\n\nbail")
+    monkeypatch.setattr(extraction.pytesseract, "image_to_data", lambda *args, **kwargs: pytest.fail("word data is only read by adaptive OCR"))
+    settings = extraction.OcrSettings(lang="eng+hin", psm=4)
+    result = extraction.ocr_page(_lines_page(20), 200, settings)
+    assert (result.text, result.confidence, result.dpi, result.psm) == ("Section 438\n\nbail", None, 200, 4)
+    assert calls == [{"lang": "eng+hin", "config": "--psm 4"}]
+
+def test_layout_analysis():
+    layout = extraction.analyse_layout(_lines_page(20).convert("L").reduce(2))
+    assert layout.lines == 30 and layout.columns == 1 and layout.uniform
+    assert layout.line_height == pytest.approx(10, abs=1)
+    assert extraction.analyse_layout(_lines_page(20, columns=2).convert("L").reduce(2)).columns == 2
+    assert extraction.analyse_layout(Image.new("RGB", (400, 600), "white")).lines == 0
+
+def test_adaptive_ocr_scales_to_the_text_size(monkeypatch):
+    sizes = []
+    def image_to_data(img, **kwargs):
+        sizes.append((img.width, kwargs["config"]))
+        return _data(["bail", "granted"], 92)
+    monkeypatch.setattr(extraction.pytesseract, "image_to_data", image_to_data)
+    result = extraction.ocr_page(_lines_page(40), 200, extraction.OcrSettings(adaptive=True))
+    assert result.dpi < 200 #Large text is read at a lower resolution.
+    assert (result.text, result.confidence, result.psm, result.retried) == ("bail\ngranted", 92.0, 6, False)
+    assert sizes == [(round(1654 * result.dpi / 200), "--psm 6")]
+
+def test_adaptive_ocr_retries_low_confidence_at_a_higher_dpi(monkeypatch):
+    confidences, renders = [40, 85], []
+    monkeypatch.setattr(extraction.pytesseract, "image_to_data", lambda img, **kwargs: _data(["bail"], confidences.pop(0)))
+    def render(dpi):
+        renders.append(dpi)
+        return _lines_page(20).resize((round(1654 * dpi / 200), round(2339 * dpi / 200)))
+    settings = extraction.OcrSettings(adaptive=True, min_confidence=75)
+    result = extraction.ocr_page(_lines_page(20), 200, settings, render=render)
+    assert len(renders) == 2 and renders[0] < renders[1] <= settings.max_dpi
+    assert (result.confidence, result.dpi, result.retried) == (85.0, renders[1], True)
+
+def test_worse_retry_keeps_the_first_read(monkeypatch):
+    confidences = [60, 50]
+    monkeypatch.setattr(extraction.pytesseract, "image_to_data", lambda img, **kwargs: _data(["bail"], confidences.pop(0)))
+    settings = extraction.OcrSettings(adaptive=True, min_confidence=75, min_dpi=100)
+    result = extraction.ocr_page(_lines_page(60, lines=15), 200, settings) #Read at 100 DPI, retried at 150 from the 200 DPI image.
+    assert (result.confidence, result.dpi, result.retried) == (60.0, 100, True)
+
+def test_blank_page_skips_ocr(monkeypatch):
+    monkeypatch.setattr(extraction.pytesseract, "image_to_data", lambda *args, **kwargs: pytest.fail("blank pages are not OCR'd"))
+    result = extraction.ocr_page(Image.new("RGB", (1654, 2339), "white"), 200, extraction.OcrSettings(adaptive=True))
+    assert (result.text, result.confidence) == ("", None)
@@ -0,0 +1,123 @@
+from app.routes import images
+from app.utils.page_images import PageImageStore
+from app.utils.security import security
+from app.db_models.models import User
+from cachetools import LRUCache
+from fastapi import FastAPI
+from fastapi.testclient import TestClient
+from PIL import Image
+from io import BytesIO
+import pytest
+import random
+
+def _png() -> bytes:
+    out = BytesIO()
+    Image.frombytes("RGB", (300, 400), random.Random(0).randbytes(300 * 400 * 3)).save(out, format="PNG") #Noise, so the file spans many chunks.
+    return out.getvalue()
+
+PNG = _png()
+
+class _GridOut():
+    """ In memory stand-in for the GridFS file of a page. """
+    def __init__(self, file_id: str, data: bytes):
+        self._id = file_id
+        self.data = data
+        self.length = len(data)
+        self.content_type = "image/png"
+        self.position = 0
+
+    async def seek(self, position: int):
+        self.position = position
+
+    async def read(self, size: int = -1) -> bytes:
+        end = self.length if size < 0 else self.position + size
+        chunk = self.data[self.position:end]
+        self.position += len(chunk)
+        return chunk
+
+class _Store(PageImageStore):
+    """ PageImageStore over in memory pages, streaming, ranges and thumbnails are the real ones. """
+    def __init__(self, pages: dict):
+        self.pages = pages
+        self.chunk_size = 1000 #Several chunks per image.
+        self.thumbnails = LRUCache(maxsize=10 * 1024 * 1024, getsizeof=lambda entry: len(entry[0]))
+        self.stats = {"thumbnail_hits": 0, "thumbnail_misses": 0}
+
+    async def open(self, image_id: str, full: bool = False):
+        data = self.pages.get(image_id)
+        return None if data is None else _GridOut(f"file-{image_id}", data)
+
+@pytest.fixture
+def client():
+    app = FastAPI()
+    app.include_router(images.router)
+    app.state.page_images = _Store({"page-1": PNG})
+    app.dependency_overrides[security.get_current_user] = lambda: User(id=1, username="asha", password="x")
+    return TestClient(app)
+
+def test_full_image_with_validators(client):
+    response = client.get("/api/images/page-1")
+    assert response.status_code == 200
+    assert response.content == PNG
+    assert response.headers["etag"] == '"file-page-1"'
+    assert response.headers["accept-ranges"] == "bytes"
+    assert response.headers["content-length"] == str(len(PNG))
+    assert "immutable" in response.headers["cache-control"]
+
+def test_unknown_image(client):
+    assert client.get("/api/images/missing").status_code == 404
+
+@pytest.mark.parametrize("if_none_match", ['"file-page-1"', 'W/"other", "file-page-1"', "*"])
+def test_if_none_match_is_a_304(client, if_none_match):
+    response = client.get("/api/images/page-1", headers={"If-None-Match": if_none_match})
+    assert response.status_code == 304
+    assert response.content == b""
+    assert response.headers["etag"] == '"file-page-1"'
+
+def test_stale_etag_gets_the_image(client):
+    assert client.get("/api/images/page-1", headers={"If-None-Match": '"file-old"'}).status_code == 200
+
+@pytest.mark.parametrize("range_header,start,end", [
+    ("bytes=0-99", 0, 99),
+    ("bytes=1500-", 1500, len(PNG) - 1),
+    ("bytes=-200", len(PNG) - 200, len(PNG) - 1),
+    ("bytes=10-999999", 10, len(PNG) - 1), #End is clamped to the file.
+])
+def test_range(client, range_header, start, end):
+    response = client.get("/api/images/page-1", headers={"Range": range_header})
+    assert response.status_code == 206
+    assert response.content == PNG[start:end + 1]
+    assert response.headers["content-range"] == f"bytes {start}-{end}/{len(PNG)}"
+    assert response.headers["content-length"] == str(end - start + 1)
+
+@pytest.mark.parametrize("range_header", [f"bytes={len(PNG)}-", "bytes=-0", "bytes=20-10"])
+def test_unsatisfiable_range_is_a_416(client, range_header):
+    response = client.get("/api/images/page-1", headers={"Range": range_header})
+    assert response.status_code == 416
+    assert response.headers["content-range"] == f"bytes */{len(PNG)}"
+
+@pytest.mark.parametrize("range_header", ["bytes=0-1,5-9", "lines=0-10", "bytes=-"])
+def test_unsupported_range_sends_the_whole_image(client, range_header):
+    response = client.get("/api/images/page-1", headers={"Range": range_header})
+    assert response.status_code == 200
+    assert response.content == PNG
+
+def test_if_range(client):
+    assert client.get("/api/images/page-1", headers={"Range": "bytes=0-9", "If-Range": '"file-page-1"'}).status_code == 206
+    response = client.get("/api/images/page-1", headers={"Range": "bytes=0-9", "If-Range": '"file-old"'})
+    assert response.status_code == 200 #Stale copy, the whole image instead of a range of the new one.
+    assert response.content == PNG
+
+def test_thumbnail_is_cached_per_rounded_width(client):
+    store = client.app.state.page_images
+    response = client.get("/api/images/page-1", params={"width": 100})
+    assert response.status_code == 200
+    assert response.headers["content-type"] == "image/webp"
+    assert response.headers["etag"] == '"file-page-1-w128"'
+    assert Image.open(BytesIO(response.content)).width == 128
+    client.get("/api/images/page-1", params={"width": 120}) #Same 128 pixel thumbnail.
+    assert store.stats == {"thumbnail_hits": 1, "thumbnail_misses": 1}
+    assert client.get("/api/images/page-1", params={"width": 120}, headers={"If-None-Match": '"file-page-1-w128"'}).status_code == 304
+
+def test_thumbnail_width_is_validated(client):
+    assert client.get("/api/images/page-1", params={"width": 8}).status_code == 422
@@ -0,0 +1,69 @@
+from setupAPI.ingest import BulkIngester,iter_jobs
+from setupAPI.models import PDFImage,ExtractedText
+from setupAPI.utils import Utils
+from setupAPI import extraction
+from vector_store.numpy_store import NumpyVectorStore
+import mongoengine as me
+import mongomock
+import mongomock.gridfs
+import numpy as np
+import fitz
+import shutil
+import pytest
+
+@pytest.fixture(autouse=True)
+def mongo(monkeypatch):
+    mongomock.gridfs.enable_gridfs_integration()
+    me.connect("ingest_test", host="mongodb://localhost", mongo_client_class=mongomock.MongoClient, uuidRepresentation="standard")
+    monkeypatch.setattr(extraction.pytesseract, "image_to_string", lambda img, **kwargs: f"Supreme Court of India judgment 2019, page text of {img.getbbox()}")
+    yield
+    me.disconnect()
+
+@pytest.fixture
+def utils(monkeypatch):
+    monkeypatch.setenv("PAGE_OCR_DPI", "72") #Small renders, the OCR is stubbed anyway.
+    utils = Utils()
+    utils.embed_texts = lambda texts, embed_type="document": np.random.default_rng(len(texts)).standard_normal((len(texts), 8)).tolist()
+    return utils
+
+def _pdf(path, lines: list):
+    path.parent.mkdir(parents=True, exist_ok=True)
+    doc = fitz.open()
+    for line in lines:
+        doc.new_page().insert_text((72, 72 + 20 * len(line)), line)
+    doc.save(str(path))
+
+def _run(utils, store, root, resume: bool = False) -> dict:
+    return BulkIngester(utils, store, ocr_workers=2).run(iter_jobs([str(root)], None, {}), resume=resume)
+
+def test_same_named_files_in_different_folders(tmp_path, utils):
+    _pdf(tmp_path / "archive" / "2019" / "order.pdf", ["a", "bb"])
+    _pdf(tmp_path / "archive" / "2020" / "order.pdf", ["ccc", "dddd", "eeeee"])
+    store = NumpyVectorStore(str(tmp_path / "index"))
+    summary = _run(utils, store, tmp_path / "archive")
+    assert (summary["documents"], summary["processed"], summary["embedded"]) == (2, 5, 5)
+    assert len(set(PDFImage.objects.distinct("source_hash"))) == 2
+    assert set(PDFImage.objects.distinct("source_name")) == {"order.pdf"}
+
+    summary = _run(utils, store, tmp_path / "archive", resume=True)
+    assert (summary["documents"], summary["embedded"]) == (0, 0)
+    assert store.count == 5
+
+def test_copies_are_ingested_once(tmp_path, utils):
+    _pdf(tmp_path / "archive" / "a" / "order.pdf", ["a", "bb"])
+    shutil.copy(tmp_path / "archive" / "a" / "order.pdf", tmp_path / "archive" / "b.pdf")
+    store = NumpyVectorStore(str(tmp_path / "index"))
+    summary = _run(utils, store, tmp_path / "archive")
+    assert (summary["documents"], summary["embedded"]) == (1, 2)
+    assert store.count == 2
+
+def test_resume_embeds_pages_an_interrupted_run_stored(tmp_path, utils):
+    _pdf(tmp_path / "archive" / "order.pdf", ["a", "bb", "ccc"])
+    _run(utils, None, tmp_path / "archive") #Like a run stopped after storing the pages.
+    assert ExtractedText.objects(indexed_at=None).count() == 3
+
+    store = NumpyVectorStore(str(tmp_path / "index"))
+    summary = _run(utils, store, tmp_path / "archive", resume=True)
+    assert (summary["documents"], summary["skipped"], summary["embedded"]) == (1, 3, 3)
+    assert ExtractedText.objects(indexed_at=None).count() == 0
+    assert _run(utils, store, tmp_path / "archive", resume=True)["documents"] == 0
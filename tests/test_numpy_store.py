@@ -0,0 +1,104 @@
+from vector_store.numpy_store import NumpyVectorStore
+import numpy as np
+import os
+import pytest
+
+def _vectors(n: int, dim: int = 32, seed: int = 0) -> np.ndarray:
+    return np.random.default_rng(seed).standard_normal((n, dim)).astype(np.float32)
+
+def _objects(n: int, offset: int = 0) -> list:
+    return [{"row": offset + i, "court": "delhi high court" if i % 2 else "supreme court of india", "year": 2000 + i % 20,
+             "document_type": "order" if i % 3 == 0 else "judgment", "source_name": f"case_{i % 5}.pdf"} for i in range(n)]
+
+def test_search_returns_nearest_first(tmp_path):
+    store = NumpyVectorStore(str(tmp_path))
+    vectors = _vectors(100)
+    uuids = store.add(_objects(100), vectors.tolist())
+    hits = store.search(vectors[17].tolist(), limit=3)
+    assert hits[0]["uuid"] == uuids[17]
+    assert hits[0]["properties"]["row"] == 17
+    assert hits[0]["distance"] == pytest.approx(0.0, abs=1e-5)
+    assert [hit["distance"] for hit in hits] == sorted(hit["distance"] for hit in hits)
+
+def test_adds_append_and_another_instance_reloads(tmp_path):
+    writer = NumpyVectorStore(str(tmp_path))
+    reader = NumpyVectorStore(str(tmp_path))
+    vectors = _vectors(60)
+    writer.add(_objects(40), vectors[:40].tolist())
+    assert reader.search(vectors[5].tolist(), limit=1)[0]["properties"]["row"] == 5
+    writer.add(_objects(20, offset=40), vectors[40:].tolist())
+    assert reader.search(vectors[55].tolist(), limit=1)[0]["properties"]["row"] == 55 #Picks up the new generation.
+    assert reader.count == 60
+
+def test_old_generations_are_removed(tmp_path):
+    store = NumpyVectorStore(str(tmp_path))
+    for i in range(4):
+        store.add(_objects(5, offset=i * 5), _vectors(5, seed=i).tolist())
+    generations = {name.split(".")[1] for name in os.listdir(tmp_path) if name.endswith(".vectors.npy")}
+    assert generations == {"3", "4"} #The previous one stays for readers that just read the manifest.
+
+def test_filters(tmp_path):
+    store = NumpyVectorStore(str(tmp_path))
+    vectors = _vectors(100)
+    store.add(_objects(100), vectors.tolist())
+    filters = {"court": "Delhi High Court".lower(), "year_from": 2005, "year_to": 2010, "document_type": "judgment"}
+    hits = store.search(vectors[0].tolist(), limit=100, filters=filters)
+    assert hits
+    for hit in hits:
+        properties = hit["properties"]
+        assert properties["court"] == "delhi high court" and 2005 <= properties["year"] <= 2010 and properties["document_type"] == "judgment"
+    assert store.search(vectors[0].tolist(), filters={"source_name": "case_3.pdf"})[0]["properties"]["source_name"] == "case_3.pdf"
+
+def test_dimension_mismatch(tmp_path):
+    store = NumpyVectorStore(str(tmp_path))
+    store.add(_objects(2), _vectors(2).tolist())
+    with pytest.raises(ValueError):
+        store.add(_objects(1), _vectors(1, dim=16).tolist())
+
+def test_drop(tmp_path):
+    store = NumpyVectorStore(str(tmp_path))
+    store.add(_objects(3), _vectors(3).tolist())
+    store.drop()
+    assert store.count == 0
+    assert store.search(_vectors(1)[0].tolist()) == []
+    assert [name for name in os.listdir(tmp_path) if name.endswith(".npy")] == []
+
+def test_ivf_recall_against_exact_search(tmp_path):
+    rng = np.random.default_rng(1)
+    centers = rng.standard_normal((40, 32))
+    vectors = (centers[rng.integers(0, 40, 4000)] + 0.3 * rng.standard_normal((4000, 32))).astype(np.float32) #Clustered like real embeddings.
+    exact = NumpyVectorStore(str(tmp_path / "exact"))
+    ivf = NumpyVectorStore(str(tmp_path / "ivf"), index_type="ivf", n_probe=8, min_ivf_size=1000)
+    exact.add(_objects(4000), vectors.tolist())
+    ivf.add(_objects(4000), vectors.tolist())
+    assert ivf.snapshot.lists is not None
+
+    queries = vectors[rng.choice(4000, 50, replace=False)] + 0.1 * rng.standard_normal((50, 32)).astype(np.float32)
+    found = expected = 0
+    for query in queries:
+        truth = {hit["properties"]["row"] for hit in exact.search(query.tolist(), limit=10)}
+        found += len(truth & {hit["properties"]["row"] for hit in ivf.search(query.tolist(), limit=10)})
+        expected += len(truth)
+    assert found / expected >= 0.9
+
+def test_ivf_lists_capped_at_the_sample(tmp_path):
+    store = NumpyVectorStore(str(tmp_path), index_type="ivf", n_lists=500, min_ivf_size=10)
+    vectors = _vectors(50)
+    store.add(_objects(50), vectors.tolist())
+    assert len(store.snapshot.centroids) == 50
+    assert store.search(vectors[3].tolist(), limit=1)[0]["properties"]["row"] == 3
+
+def _write_rows(directory: str, worker: int):
+    store = NumpyVectorStore(directory)
+    for i in range(10):
+        store.add([{"row": worker * 100 + i}], _vectors(1, seed=worker * 100 + i).tolist())
+
+def test_writers_in_other_processes_do_not_lose_rows(tmp_path):
+    import multiprocessing
+    workers = [multiprocessing.Process(target=_write_rows, args=(str(tmp_path), worker)) for worker in range(3)]
+    for worker in workers:
+        worker.start()
+    for worker in workers:
+        worker.join()
+    hits = NumpyVectorStore(str(tmp_path)).search(_vectors(1)[0].tolist(), limit=100)
+    assert sorted(hit["properties"]["row"] for hit in hits) == [worker * 100 + i for worker in range(3) for i in range(10)]
@@ -0,0 +1,119 @@
+from setupAPI.config import PageDedupSettings
+from setupAPI.models import PDFImage,ExtractedText
+from setupAPI.page_dedup import PHASH_BANDS,_hamming,content_hash,find_duplicate,fingerprint,link_duplicate,perceptual_hash,phash_bands,set_fingerprint
+from PIL import Image,ImageDraw
+from pydantic import ValidationError
+from io import BytesIO
+import mongoengine as me
+import mongomock
+import mongomock.gridfs
+import pytest
+import random
+
+@pytest.fixture(autouse=True)
+def mongo():
+    mongomock.gridfs.enable_gridfs_integration() #PDFImage.file is stored in GridFS.
+    me.connect("dedup_test", host="mongodb://localhost", mongo_client_class=mongomock.MongoClient, uuidRepresentation="standard")
+    yield
+    me.disconnect() #The next connect gets a new, empty mongomock client.
+
+def _page(seed: int) -> Image.Image:
+    """ A page of text like lines, a different seed gives a different layout. """
+    rng = random.Random(seed)
+    img = Image.new("RGB", (425, 550), "white")
+    draw = ImageDraw.Draw(img)
+    for y in range(60, 500, 18):
+        x = 50
+        while x < 370:
+            width = rng.randint(10, 50)
+            draw.rectangle((x, y, min(x + width, 375), y + 8), fill="black")
+            x += width + rng.randint(6, 12)
+    return img
+
+def _rescan(img: Image.Image) -> Image.Image:
+    """ The same page scanned again, lossy and slightly brighter. """
+    out = BytesIO()
+    img.point(lambda v: min(v + 20, 255)).save(out, format="JPEG", quality=40)
+    return Image.open(BytesIO(out.getvalue())).convert("RGB")
+
+def _store(img: Image.Image, settings: PageDedupSettings, with_text: bool = True) -> PDFImage:
+    digest, phash = fingerprint(img, settings)
+    page = PDFImage(filename="stored.pdf_0", file=b"png")
+    set_fingerprint(page, digest, phash)
+    page.save()
+    if with_text:
+        ExtractedText(image=page, text="page text").save()
+    return page
+
+EXACT = PageDedupSettings()
+PERCEPTUAL = PageDedupSettings(perceptual=True)
+
+def test_content_hash_is_exact():
+    page = _page(1)
+    assert content_hash(page) == content_hash(page.copy())
+    changed = page.copy()
+    changed.putpixel((0, 0), (0, 0, 0))
+    assert content_hash(changed) != content_hash(page)
+    assert content_hash(page.convert("L")) != content_hash(page) #Mode is part of the hash.
+
+def test_perceptual_hash_survives_a_rescan_but_tells_layouts_apart():
+    page = perceptual_hash(_page(1))
+    assert _hamming(page, perceptual_hash(_rescan(_page(1)))) <= 10
+    assert _hamming(page, perceptual_hash(_page(2))) > 15
+
+def test_blank_pages_have_no_perceptual_hash():
+    assert perceptual_hash(Image.new("RGB", (425, 550), "white")) is None
+    assert perceptual_hash(Image.new("RGB", (425, 550), (250, 250, 250))) is None #Near white scan noise.
+
+def test_bands_split_the_hash():
+    bands = phash_bands(perceptual_hash(_page(1)))
+    assert len(bands) == PHASH_BANDS
+    assert bands[3].startswith("3:")
+
+def test_fingerprint_follows_the_settings():
+    assert fingerprint(_page(1), PageDedupSettings(enabled=False)) == (None, None)
+    digest, phash = fingerprint(_page(1), EXACT)
+    assert digest is not None and phash is None
+    assert all(fingerprint(_page(1), PERCEPTUAL))
+
+def test_exact_duplicate_is_found():
+    page = _store(_page(1), EXACT)
+    assert find_duplicate(*fingerprint(_page(1), EXACT), EXACT).id == page.id
+    assert find_duplicate(*fingerprint(_page(2), EXACT), EXACT) is None
+
+def test_pages_without_text_are_not_duplicates():
+    _store(_page(1), EXACT, with_text=False) #An interrupted ingest stored the image but never its OCR text.
+    assert find_duplicate(*fingerprint(_page(1), EXACT), EXACT) is None
+
+def test_rescan_needs_perceptual_matching():
+    _store(_page(1), PERCEPTUAL)
+    assert find_duplicate(*fingerprint(_rescan(_page(1)), EXACT), EXACT) is None
+    assert find_duplicate(*fingerprint(_rescan(_page(1)), PERCEPTUAL), PERCEPTUAL) is not None
+    assert find_duplicate(*fingerprint(_page(2), PERCEPTUAL), PERCEPTUAL) is None
+
+def test_phash_max_distance_is_the_threshold():
+    _store(_page(1), PERCEPTUAL)
+    rescan = _rescan(_page(1))
+    distance = _hamming(perceptual_hash(_page(1)), perceptual_hash(rescan))
+    assert distance > 0 #Otherwise every threshold matches.
+    at = PageDedupSettings(perceptual=True, phash_max_distance=distance)
+    below = PageDedupSettings(perceptual=True, phash_max_distance=distance - 1)
+    assert find_duplicate(None, perceptual_hash(rescan), at) is not None
+    assert find_duplicate(None, perceptual_hash(rescan), below) is None
+
+def test_closest_perceptual_match_wins():
+    far = _store(_page(1), PERCEPTUAL)
+    near = _store(_rescan(_page(1)), PERCEPTUAL)
+    assert find_duplicate(None, perceptual_hash(_rescan(_page(1))), PERCEPTUAL).id == near.id
+    assert far.id != near.id
+
+@pytest.mark.parametrize("distance", [-1, 16])
+def test_phash_max_distance_is_bounded_by_the_bands(distance):
+    with pytest.raises(ValidationError):
+        PageDedupSettings(perceptual=True, phash_max_distance=distance)
+
+def test_link_duplicate_records_the_page_once():
+    page = _store(_page(1), EXACT)
+    link_duplicate(page, "other.pdf_3")
+    link_duplicate(page, "other.pdf_3")
+    assert PDFImage.objects.get(id=page.id).linked_filenames == ["other.pdf_3"]
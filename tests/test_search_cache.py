@@ -0,0 +1,85 @@
+from McpServer.utils.search_cache import SearchCache
+from McpServer.utils.query_structure import SearchResponse,SearchResult
+from McpServer.utils import search_cache as search_cache_module
+import asyncio
+import threading
+import pytest
+
+RESPONSE = SearchResponse(results=[SearchResult(title="Bail", link="https://example.org/bail", snippet="Section 438")])
+
+class Clock():
+    def __init__(self):
+        self.now = 1_000_000.0
+
+    def __call__(self) -> float:
+        return self.now
+
+@pytest.fixture
+def clock(monkeypatch):
+    clock = Clock()
+    monkeypatch.setattr(search_cache_module.time, "time", clock)
+    return clock
+
+@pytest.fixture
+def cache(tmp_path, clock):
+    cache = SearchCache(str(tmp_path), ttl=60, stale_ttl=600, size_limit=10 * 1024 * 1024)
+    yield cache
+    cache.cache.close()
+
+def test_queries_are_normalized(cache):
+    cache.set("Anticipatory  Bail", RESPONSE)
+    assert cache.get(" anticipatory bail ") == (RESPONSE, False)
+
+def test_fresh_stale_and_miss(cache, clock):
+    assert cache.get("bail") == (None, False)
+    cache.set("bail", RESPONSE)
+    clock.now += 61
+    assert cache.get("bail") == (RESPONSE, True)
+    assert cache.get_stats()["misses"] == 1 and cache.get_stats()["stale_hits"] == 1
+
+def test_async_access_runs_off_the_event_loop(cache):
+    threads = []
+    get = cache.cache.get
+    cache.cache.get = lambda *args, **kwargs: (threads.append(threading.get_ident()), get(*args, **kwargs))[1]
+
+    async def run():
+        await cache.aset("bail", RESPONSE)
+        return threading.get_ident(), await cache.aget("bail")
+
+    loop_thread, result = asyncio.run(run())
+    assert result == (RESPONSE, False)
+    assert threads and loop_thread not in threads
+
+def test_refresh_writes_back_once(cache, clock):
+    fetches = []
+
+    async def fetch(query: str) -> SearchResponse:
+        fetches.append(query)
+        await asyncio.sleep(0)
+        return SearchResponse(results=[])
+
+    async def run():
+        await cache.aset("bail", RESPONSE)
+        clock.now += 61
+        cache.refresh("bail", fetch)
+        cache.refresh("Bail", fetch) #Shares the refresh in flight.
+        await asyncio.gather(*cache._tasks)
+        return await cache.aget("bail")
+
+    assert asyncio.run(run()) == (SearchResponse(results=[]), False)
+    assert fetches == ["bail"]
+    assert cache.get_stats()["refreshes"] == 1
+
+def test_failed_refresh_keeps_the_stale_entry(cache, clock):
+    async def fetch(query: str) -> SearchResponse:
+        raise RuntimeError("quota exceeded")
+
+    async def run():
+        await cache.aset("bail", RESPONSE)
+        clock.now += 61
+        cache.refresh("bail", fetch)
+        await asyncio.gather(*cache._tasks)
+        return await cache.aget("bail")
+
+    assert asyncio.run(run()) == (RESPONSE, True)
+    assert cache.get_stats()["refresh_failures"] == 1
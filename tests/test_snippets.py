@@ -0,0 +1,43 @@
+from McpServer.utils.snippets import approx_tokens,extract_snippets
+
+FILLER = "The appeal was listed before the bench. Counsel for both sides were heard at length. The record was perused. "
+BAIL = "Anticipatory bail under section 438 was granted to the accused. "
+
+def _page(relevant_at: int, sentences: int = 12) -> str:
+    parts = [FILLER] * (sentences // 3)
+    parts.insert(relevant_at, BAIL)
+    return "".join(parts)
+
+def test_best_window_is_the_one_covering_the_query():
+    [snippet] = extract_snippets([_page(3)], "anticipatory bail section 438", max_tokens=40)
+    assert "Anticipatory bail" in snippet
+    assert approx_tokens(snippet) <= 40
+
+def test_total_output_stays_within_budget():
+    texts = [_page(i % 4) for i in range(5)]
+    for max_tokens in (10, 50, 200):
+        snippets = extract_snippets(texts, "anticipatory bail", max_tokens=max_tokens)
+        windows = [window for snippet in snippets for window in snippet.split(" … ") if window]
+        assert sum(approx_tokens(window) for window in windows) <= max_tokens
+
+def test_every_hit_gets_a_window_before_any_gets_a_second():
+    texts = [_page(0) + BAIL * 3, _page(2), _page(1)]
+    bail = approx_tokens(BAIL.strip())
+    snippets = extract_snippets(texts, "bail", max_tokens=bail * 4 - 1, window=1) #One window short of a second one for the best hit.
+    assert snippets == [BAIL.strip()] * 3
+    snippets = extract_snippets(texts, "bail", max_tokens=bail * 6, window=1)
+    assert snippets[0].count("Anticipatory bail") == 4
+    assert snippets[1:] == [BAIL.strip()] * 2
+
+def test_low_ranked_hits_only_get_leftover_budget():
+    snippets = extract_snippets([_page(0), _page(0)], "bail", max_tokens=5)
+    assert snippets[0].endswith(" …") #Too long for the budget, truncated instead of dropped.
+    assert snippets[1] == ""
+
+def test_extra_windows_must_match_the_query():
+    [snippet] = extract_snippets([_page(2)], "bail", max_tokens=10_000, window=1)
+    assert snippet.split(" … ") == [BAIL.strip()]
+
+def test_empty_input():
+    assert extract_snippets([], "bail", max_tokens=100) == []
+    assert extract_snippets([""], "bail", max_tokens=100) == [""]
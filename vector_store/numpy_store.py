@@ -0,0 +1,292 @@
+from contextlib import contextmanager
+from typing import Dict,List,Literal,Optional,Tuple
+import numpy as np
+import json,os,threading,uuid
+
+try:
+    import fcntl
+except ImportError: #Windows
+    fcntl = None
+    import msvcrt
+
+# In-process vector index persisted as .npy files, shared by the ingestion server (writes) and the MCP server (reads).
+# Vectors are stored L2 normalized so the inner product is the cosine similarity, distances are reported as 1 - cosine
+# like weaviate's default cosine distance. Files in a directory for a collection `name`, every write creates a new generation `g`:
+#   {name}.{g}.vectors.npy -> float32 (n, dim) matrix, opened memory mapped by readers.
+#   {name}.{g}.objects.json -> properties of every row, in row order.
+#   {name}.{g}.centroids.npy, {name}.{g}.lists.npy, {name}.{g}.offsets.npy -> IVF index, rows grouped by nearest centroid.
+#   {name}.manifest.json -> current generation, row count and index type, replaced last so readers only load complete generations.
+#   {name}.lock -> held by a writer from reading the manifest to replacing it, so writers in different processes do not lose each other's rows.
+# Memory mapped files are never overwritten (Windows refuses to replace them), generations before the previous one are removed once
+# no longer mapped. The previous one is kept for readers that read the manifest just before it was replaced.
+
+@contextmanager
+def _file_lock(path: str):
+    """ Exclusive lock on `path` across processes, flock on POSIX and msvcrt on Windows. """
+    with open(path, "a+b") as f:
+        if fcntl is not None:
+            fcntl.flock(f.fileno(), fcntl.LOCK_EX)
+        else:
+            f.seek(0)
+            while True:
+                try:
+                    msvcrt.locking(f.fileno(), msvcrt.LK_LOCK, 1)
+                    break
+                except OSError: #LK_LOCK gives up after 10 attempts a second apart, a long write holds it longer.
+                    pass
+        try:
+            yield
+        finally:
+            if fcntl is not None:
+                fcntl.flock(f.fileno(), fcntl.LOCK_UN)
+            else:
+                f.seek(0)
+                msvcrt.locking(f.fileno(), msvcrt.LK_UNLCK, 1)
+
+
+class _Snapshot():
+    """ One loaded version of the files, replaced as a whole on reload. """
+    def __init__(self):
+        self.generation = 0
+        self.count = 0
+        self.vectors: Optional[np.ndarray] = None
+        self.objects: List[dict] = []
+        self.years = np.empty(0, dtype=np.int64)
+        self.centroids: Optional[np.ndarray] = None
+        self.lists: Optional[np.ndarray] = None
+        self.offsets: Optional[np.ndarray] = None
+
+
+class NumpyVectorStore():
+    """
+    Exact or IVF vector search over memory mapped numpy files, for tests and small single tenant deployments.
+        index_type -> "exact" scans every row, "ivf" scans the n_probe lists closest to the query (built once the collection has min_ivf_size rows).
+        n_lists -> number of IVF lists, defaults to sqrt(rows).
+        write_rows -> rows callers should buffer per add(), every add rewrites all files and retrains IVF over every row.
+    Writes rewrite the files through atomic renames under a lock file, readers in other processes pick up a new snapshot on their next search.
+    """
+    def __init__(
+        self,
+        directory: str,
+        name: str = "Vectorbase",
+        index_type: Literal["exact","ivf"] = "exact",
+        n_lists: Optional[int] = None,
+        n_probe: int = 8,
+        min_ivf_size: int = 1024,
+        write_rows: int = 100_000,
+    ):
+        self.directory = directory
+        self.name = name
+        self.index_type = index_type
+        self.n_lists = n_lists
+        self.n_probe = n_probe
+        self.min_ivf_size = min_ivf_size
+        self.write_rows = write_rows
+        self._lock = threading.Lock()
+        self._version = None
+        self._clear()
+
+    @property
+    def count(self) -> int:
+        return self.snapshot.count
+
+    def _clear(self):
+        self.snapshot = _Snapshot()
+
+    def _path(self, part: str, generation: Optional[int] = None) -> str:
+        if generation is None:
+            return os.path.join(self.directory, f"{self.name}.{part}")
+        return os.path.join(self.directory, f"{self.name}.{generation}.{part}")
+
+    def _write(self, path: str, write):
+        """ Method to write a file next to its target and rename it in place, readers never see a partial file. """
+        tmp = f"{path}.tmp"
+        with open(tmp, "wb") as f:
+            write(f)
+        os.replace(tmp, path)
+
+    def _remove_generations(self, keep: Tuple[int, ...] = ()):
+        """ Method to delete files of every generation not in `keep`, files still mapped by a reader are left for a later write. """
+        for filename in os.listdir(self.directory):
+            parts = filename.split(".")
+            if not filename.startswith(f"{self.name}.") or len(parts) < 3 or not parts[-3].isdigit():
+                continue
+            if int(parts[-3]) in keep:
+                continue
+            try:
+                os.remove(os.path.join(self.directory, filename))
+            except OSError:
+                pass
+
+    def _refresh(self, attempts: int = 3):
+        """ Method to (re)load the latest snapshot if the manifest changed since the last load. """
+        for attempt in range(attempts):
+            try:
+                return self._load()
+            except FileNotFoundError:
+                if attempt == attempts - 1: #Removed by several writes in a row since the manifest was read.
+                    raise
+
+    def _load(self):
+        """ Method to load the generation named by the manifest, raises FileNotFoundError if a writer removed it meanwhile. """
+        try:
+            version = os.stat(self._path("manifest.json")).st_mtime_ns
+        except FileNotFoundError:
+            if self._version is not None:
+                self._version = None
+                self._clear()
+            return
+        if version == self._version:
+            return
+        with open(self._path("manifest.json")) as f:
+            manifest = json.load(f)
+        snapshot = _Snapshot()
+        snapshot.generation = generation = manifest["generation"]
+        snapshot.count = manifest["count"]
+        if snapshot.count:
+            snapshot.vectors = np.load(self._path("vectors.npy", generation), mmap_mode="r")
+            with open(self._path("objects.json", generation)) as f:
+                snapshot.objects = json.load(f)
+            snapshot.years = np.array([o["properties"].get("year") or -1 for o in snapshot.objects], dtype=np.int64)
+            if manifest.get("ivf"):
+                snapshot.centroids = np.load(self._path("centroids.npy", generation))
+                snapshot.lists = np.load(self._path("lists.npy", generation))
+                snapshot.offsets = np.load(self._path("offsets.npy", generation))
+        self.snapshot = snapshot #Swapped as a whole, searches in flight keep the snapshot they started with.
+        self._version = version
+
+    @staticmethod
+    def _normalize(vectors) -> np.ndarray:
+        vectors = np.asarray(vectors, dtype=np.float32)
+        if vectors.ndim == 1:
+            vectors = vectors[None, :]
+        norms = np.linalg.norm(vectors, axis=1, keepdims=True)
+        return vectors / np.maximum(norms, 1e-12)
+
+    def _train_ivf(self, vectors: np.ndarray, iterations: int = 10, sample_size: int = 100_000):
+        """ Method to build IVF lists with spherical k-means on a sample of the rows. """
+        rng = np.random.default_rng(0)
+        sample = vectors[rng.choice(len(vectors), min(sample_size, len(vectors)), replace=False)]
+        n_lists = min(self.n_lists or max(1, int(np.sqrt(len(vectors)))), len(sample)) #Centroids are picked from the sample without replacement.
+        centroids = sample[rng.choice(len(sample), n_lists, replace=False)].copy()
+        for _ in range(iterations):
+            assignment = np.argmax(sample @ centroids.T, axis=1)
+            for k in range(n_lists):
+                members = sample[assignment == k]
+                if len(members):
+                    centroids[k] = members.sum(axis=0)
+            centroids = self._normalize(centroids)
+
+        assignment = np.concatenate([
+            np.argmax(vectors[i:i + 65536] @ centroids.T, axis=1) for i in range(0, len(vectors), 65536) #Chunked to bound the (rows, lists) score matrix.
+        ])
+        lists = np.argsort(assignment, kind="stable").astype(np.int64)
+        offsets = np.concatenate([[0], np.cumsum(np.bincount(assignment, minlength=n_lists))]).astype(np.int64)
+        return centroids, lists, offsets
+
+    def add(self, objects: List[dict], vectors: List[List[float]]) -> List[str]:
+        """ Method to append objects (their properties) with their vectors, returns the generated uuids. """
+        if len(objects) != len(vectors):
+            raise ValueError("objects and vectors must have the same length")
+        if not objects:
+            return []
+        os.makedirs(self.directory, exist_ok=True)
+        with self._lock, _file_lock(self._path("lock")):
+            self._refresh()
+            current = self.snapshot
+            new_vectors = self._normalize(vectors)
+            if current.vectors is not None and current.vectors.shape[1] != new_vectors.shape[1]:
+                raise ValueError(f"Vector dimension {new_vectors.shape[1]} does not match the index dimension {current.vectors.shape[1]}")
+            vectors = new_vectors if current.vectors is None else np.concatenate([np.asarray(current.vectors), new_vectors])
+            new_objects = [{"uuid": str(uuid.uuid4()), "properties": properties} for properties in objects]
+            all_objects = current.objects + new_objects
+
+            generation = current.generation + 1
+            self._write(self._path("vectors.npy", generation), lambda f: np.save(f, vectors))
+            self._write(self._path("objects.json", generation), lambda f: f.write(json.dumps(all_objects).encode()))
+            ivf = self.index_type == "ivf" and len(vectors) >= self.min_ivf_size
+            if ivf:
+                centroids, lists, offsets = self._train_ivf(vectors)
+                self._write(self._path("centroids.npy", generation), lambda f: np.save(f, centroids))
+                self._write(self._path("lists.npy", generation), lambda f: np.save(f, lists))
+                self._write(self._path("offsets.npy", generation), lambda f: np.save(f, offsets))
+            manifest = {"generation": generation, "count": len(vectors), "dim": vectors.shape[1], "ivf": ivf}
+            self._write(self._path("manifest.json"), lambda f: f.write(json.dumps(manifest).encode()))
+            del current, vectors
+            self._refresh()
+            self._remove_generations(keep=(generation - 1, generation))
+            return [o["uuid"] for o in new_objects]
+
+    @staticmethod
+    def _filter_mask(snapshot: "_Snapshot", rows: np.ndarray, filters: Optional[Dict]) -> np.ndarray:
+        """
+        Method to apply metadata filters to candidate rows, mirrors the weaviate filters of the search tools.
+            court, source_name -> every word of the filter must be present (word tokenized), document_type -> exact match,
+            year_from, year_to -> inclusive range.
+        """
+        mask = np.ones(len(rows), dtype=bool)
+        if not filters:
+            return mask
+        if filters.get("year_from") is not None:
+            mask &= snapshot.years[rows] >= filters["year_from"]
+        if filters.get("year_to") is not None:
+            mask &= (snapshot.years[rows] <= filters["year_to"]) & (snapshot.years[rows] >= 0)
+        for key in ("court", "source_name", "document_type"):
+            value = filters.get(key)
+            if not value:
+                continue
+            value = value.lower()
+            for i in np.flatnonzero(mask):
+                prop = (snapshot.objects[rows[i]]["properties"].get(key) or "").lower()
+                matched = prop == value if key == "document_type" else set(value.split()) <= set(prop.split())
+                mask[i] = matched
+        return mask
+
+    @staticmethod
+    def _top_k(snapshot: "_Snapshot", query: np.ndarray, rows: np.ndarray, limit: int) -> List[dict]:
+        if not len(rows):
+            return []
+        scores = np.asarray(snapshot.vectors[rows] @ query)
+        if len(rows) > limit:
+            best = np.argpartition(-scores, limit)[:limit]
+        else:
+            best = np.arange(len(rows))
+        best = best[np.argsort(-scores[best], kind="stable")]
+        return [
+            {**snapshot.objects[rows[i]], "distance": float(1.0 - scores[i])}
+            for i in best
+        ]
+
+    def search(self, vector: List[float], limit: int = 5, filters: Optional[Dict] = None) -> List[dict]:
+        """ Method to get the nearest objects as {"uuid", "properties", "distance"}, best first. """
+        with self._lock:
+            self._refresh()
+            snapshot = self.snapshot
+        if not snapshot.count:
+            return []
+        query = self._normalize(vector)[0]
+        if snapshot.lists is not None:
+            probe = np.argsort(-(snapshot.centroids @ query))[:self.n_probe]
+            rows = np.concatenate([snapshot.lists[snapshot.offsets[k]:snapshot.offsets[k + 1]] for k in probe])
+            rows = rows[rows < snapshot.count]
+            rows = rows[self._filter_mask(snapshot, rows, filters)]
+            if len(rows) >= limit:
+                return self._top_k(snapshot, query, rows, limit)
+            # Too few filtered rows in the probed lists, fall back to an exact scan.
+        rows = np.arange(snapshot.count)
+        rows = rows[self._filter_mask(snapshot, rows, filters)]
+        return self._top_k(snapshot, query, rows, limit)
+
+    def drop(self):
+        """ Method to delete every file of the collection. """
+        with self._lock:
+            self._version = None
+            self._clear() #Release our own memory maps first.
+            if not os.path.isdir(self.directory):
+                return
+            with _file_lock(self._path("lock")):
+                try:
+                    os.remove(self._path("manifest.json"))
+                except FileNotFoundError:
+                    pass
+                self._remove_generations()